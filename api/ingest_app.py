@@ -0,0 +1,105 @@
+"""
+Direct HTTP ingestion endpoint for plugin submissions.
+
+The plugin POSTs a batch of submissions as newline-delimited JSON, optionally
+gzip-compressed, using the same field names it sends in webhook embeds:
+
+    POST /ingest
+    Content-Encoding: gzip
+    X-Account-Hash: <account hash>
+    X-Batch-Id: <optional unique id, makes retries safe>
+
+Every record must carry the account hash the request was authenticated with.
+A JSON object can't repeat the "type" key, so drops name their source in
+`source_type` instead of the embed's second "type" field.
+Valid records go through the same parser and ingestion queue as submissions
+received over Discord, and are spooled to disk before the response is sent. Served by hypercorn from main.py when INGEST_API_PORT is set.
+"""
+import os
+import zlib
+from typing import List
+import msgspec
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException, Request
+from hypercorn.config import Config
+from cache.dedup import SubmissionDeduplicator
+from submissions.parser import parse_record
+from submissions.queue import ACCEPTED, DUPLICATE, OVERFLOWED
+from utils.logger import Logger
+
+load_dotenv()
+
+logger = Logger()
+deduplicator = SubmissionDeduplicator()
+
+max_body_bytes = int(os.getenv("INGEST_API_MAX_BYTES", 1024 * 1024))
+max_records = int(os.getenv("INGEST_API_MAX_RECORDS", 500))
+
+app = FastAPI(title="DropTracker Ingest")
+config = Config()
+config.bind = [f"0.0.0.0:{os.getenv('INGEST_API_PORT', '8080')}"]
+config.accesslog = None
+
+
+def _decompress(body: bytes, content_encoding: str) -> bytes:
+    if "gzip" in content_encoding or body[:2] == b"\x1f\x8b":
+        # Bound the decompressed size too, so a small body can't expand without limit
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = decompressor.decompress(body, max_body_bytes * 10)
+        if decompressor.unconsumed_tail:
+            raise HTTPException(status_code=413, detail="Decompressed batch too large")
+        return data
+    return body
+
+
+@app.post("/ingest")
+async def ingest(request: Request,
+                 x_account_hash: str = Header(...),
+                 x_batch_id: str = Header(None)):
+    """Accept a batch of NDJSON submissions from a single account"""
+    from events import submission_queue
+
+    body = await request.body()
+    if len(body) > max_body_bytes:
+        raise HTTPException(status_code=413, detail="Batch too large")
+    try:
+        data = _decompress(body, request.headers.get("content-encoding", ""))
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip body")
+
+    lines = [line for line in data.splitlines() if line.strip()]
+    if len(lines) > max_records:
+        raise HTTPException(status_code=413, detail=f"At most {max_records} records per batch")
+
+    entries = []
+    errors: List[dict] = []
+    for index, line in enumerate(lines):
+        try:
+            record = msgspec.json.decode(line)
+        except msgspec.DecodeError:
+            errors.append({"line": index, "error": "invalid JSON"})
+            continue
+        submission = parse_record(record) if isinstance(record, dict) else None
+        if not submission:
+            errors.append({"line": index, "error": "missing type, player or acc_hash, or a malformed field"})
+            continue
+        if submission.acc_hash != x_account_hash:
+            errors.append({"line": index, "error": "acc_hash does not match X-Account-Hash"})
+            continue
+        dedup_key = deduplicator.make_key(f"http:{x_account_hash}:{x_batch_id}", index) if x_batch_id else None
+        entries.append((submission.acc_hash, submission, dedup_key))
+
+    # Every accepted record is on disk before this returns
+    results = await submission_queue.submit_many(entries) if entries else []
+    if OVERFLOWED in results:
+        # Queue stayed full; tell the plugin to back off. Records before the overflow
+        # were accepted, so a retry with the same X-Batch-Id skips them
+        raise HTTPException(status_code=503, detail="Ingestion queue is full",
+                            headers={"Retry-After": "5"})
+    accepted = results.count(ACCEPTED)
+    duplicates = results.count(DUPLICATE)
+
+    if errors:
+        logger.warning("ingest", f"Rejected {len(errors)} of {len(lines)} records from {x_account_hash}",
+                       details=str(errors[:10]))
+    return {"accepted": accepted, "duplicates": duplicates, "rejected": len(errors), "errors": errors}
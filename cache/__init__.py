@@ -1,13 +1,25 @@
-import redis
+import redis.asyncio as redis
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST"), 
-    port=os.getenv("REDIS_PORT"), 
-    db=os.getenv("REDIS_DB"), 
+## One pool shared by every coroutine in the process. A blocking pool makes callers
+## wait up to REDIS_POOL_TIMEOUT for a free connection instead of erroring, so wide
+## fan-outs (rankings, lootboards) simply queue behind REDIS_MAX_CONNECTIONS.
+redis_pool = redis.BlockingConnectionPool(
+    host=os.getenv("REDIS_HOST"),
+    port=os.getenv("REDIS_PORT"),
+    db=os.getenv("REDIS_DB"),
     #password=os.getenv("REDIS_PASSWORD"),
-    decode_responses=True
+    decode_responses=True,
+    max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+    timeout=float(os.getenv("REDIS_POOL_TIMEOUT", 5)),
+    # PING connections that have sat idle this long before reusing them
+    health_check_interval=int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)),
+    socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", 5)),
+    socket_keepalive=True,
+    retry_on_timeout=True
 )
+
+redis_client = redis.Redis(connection_pool=redis_pool)
@@ -0,0 +1,105 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from cache import redis_client
+
+load_dotenv()
+
+
+class SubmissionDeduplicator:
+    """
+    Suppresses submissions that have already been seen, keyed on the Discord
+    message ID and the embed's index within the message.
+
+    Keys are remembered in-process for `window` seconds, which catches webhook
+    retries and gateway replays cheaply. Keys not seen locally are claimed in
+    Redis with SET NX, so replays after a restart (or seen by another node) are
+    caught too. If Redis is unavailable we fail open and rely on the local window.
+
+    A claim can carry a `token` naming the delivery that made it, so that a
+    spooled submission replayed after a crash can tell its own claim apart from
+    one made by a redelivery (see `claimed_by`).
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(SubmissionDeduplicator, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.window = int(os.getenv("DEDUP_WINDOW", 86400))
+        self.max_local = int(os.getenv("DEDUP_MAX_LOCAL", 200000))
+        self.use_redis = os.getenv("DEDUP_REDIS", "1") == "1"
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # key -> expiry timestamp
+        self.checked = 0
+        self.suppressed = 0
+        self.redis_errors = 0
+        self._initialized = True
+
+    @staticmethod
+    def make_key(message_id, embed_index: int) -> str:
+        return f"{message_id}:{embed_index}"
+
+    async def is_duplicate(self, key: str, token: str = "1") -> bool:
+        """Record `key` as seen, returning True if it had already been seen within the window"""
+        now = time.time()
+        self.checked += 1
+        self._expire(now)
+        if key in self._seen:
+            self.suppressed += 1
+            return True
+        self._seen[key] = now + self.window
+        if len(self._seen) > self.max_local:
+            self._seen.popitem(last=False)
+
+        if self.use_redis:
+            try:
+                claimed = await redis_client.set(f"dedup:{key}", token, nx=True, ex=self.window)
+                if not claimed:
+                    self.suppressed += 1
+                    return True
+            except Exception:
+                self.redis_errors += 1
+        return False
+
+    async def claimed_by(self, key: str) -> Optional[str]:
+        """The token `key` was claimed with in Redis, or None if it's unclaimed (or Redis is unavailable)"""
+        if not self.use_redis:
+            return None
+        try:
+            return await redis_client.get(f"dedup:{key}")
+        except Exception:
+            self.redis_errors += 1
+            return None
+
+    async def release(self, key: str) -> None:
+        """Forget `key`, e.g. when the submission it marked could not be accepted after all"""
+        self._seen.pop(key, None)
+        if self.use_redis:
+            try:
+                await redis_client.delete(f"dedup:{key}")
+            except Exception:
+                self.redis_errors += 1
+
+    def _expire(self, now: float) -> None:
+        # Entries are inserted in expiry order, so only the front can be stale
+        while self._seen:
+            key, expiry = next(iter(self._seen.items()))
+            if expiry > now:
+                break
+            self._seen.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "checked": self.checked,
+            "suppressed": self.suppressed,
+            "tracked": len(self._seen),
+            "redis_errors": self.redis_errors
+        }
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+from typing import Dict, Optional, Set
+from dotenv import load_dotenv
+from sqlalchemy import select
+from models.base import engine
+from models import ItemList
+
+load_dotenv()
+
+
+class ItemCatalogue:
+    """
+    In-process copy of the `items` table: item names, noted flags and the set of
+    valid item IDs.
+
+    Serves name lookups, wiki links and ingestion-time validation of item IDs
+    without any database round trips. Item IDs are the game's own, not an
+    insertion sequence, and items can be renamed, so the catalogue is fully
+    reloaded once it's `refresh_interval` seconds old. `refresh` only fetches
+    rows above the highest ID already loaded, a cheap way to pick up new items
+    by hand.
+
+    Loading is a blocking query; callers on the event loop run it with
+    `asyncio.to_thread`.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ItemCatalogue, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._names: Dict[int, str] = {}
+        self._noted: Set[int] = set()
+        self.max_item_id = 0
+        self.loaded_at = 0
+        self.refresh_interval = int(os.getenv("ITEM_REFRESH_INTERVAL", 900))
+        self._initialized = True
+
+    def load(self) -> int:
+        """Fully (re)load the catalogue, returning the number of items loaded"""
+        names, noted = {}, set()
+        max_item_id = self._read_rows(names, noted, 0)
+        self._names, self._noted = names, noted
+        self.max_item_id = max_item_id
+        self.loaded_at = int(time.time())
+        return len(names)
+
+    def refresh(self) -> int:
+        """Load items with IDs above the highest loaded one, returning how many were added"""
+        if not self.loaded_at:
+            return self.load()
+        before = len(self._names)
+        self.max_item_id = self._read_rows(self._names, self._noted, self.max_item_id)
+        self.loaded_at = int(time.time())
+        return len(self._names) - before
+
+    def _read_rows(self, names: Dict[int, str], noted: Set[int], after_id: int) -> int:
+        # Its own pooled connection rather than the shared session, which isn't safe to use off the loop's thread
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(ItemList.item_id, ItemList.item_name, ItemList.noted).where(ItemList.item_id > after_id)
+            ).all()
+        max_item_id = after_id
+        for item_id, item_name, is_noted in rows:
+            names[item_id] = item_name
+            if is_noted:
+                noted.add(item_id)
+            max_item_id = max(max_item_id, item_id)
+        return max_item_id
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded_at:
+            self.load()
+
+    def is_valid(self, item_id: int) -> bool:
+        self._ensure_loaded()
+        return item_id in self._names
+
+    def get_name(self, item_id: int) -> Optional[str]:
+        self._ensure_loaded()
+        return self._names.get(item_id)
+
+    def is_noted(self, item_id: int) -> bool:
+        self._ensure_loaded()
+        return item_id in self._noted
+
+    def get_wiki_url(self, item_id: int) -> Optional[str]:
+        from utils.misc import build_wiki_url
+        item_name = self.get_name(item_id)
+        return build_wiki_url(item_name) if item_name else None
+
+    def is_stale(self) -> bool:
+        return int(time.time()) - self.loaded_at >= self.refresh_interval
+
+    def memory_usage(self) -> int:
+        """Approximate memory held by the catalogue, in bytes"""
+        size = sys.getsizeof(self._names) + sys.getsizeof(self._noted)
+        for item_id, item_name in self._names.items():
+            size += sys.getsizeof(item_id) + sys.getsizeof(item_name)
+        return size
+
+    def __len__(self) -> int:
+        return len(self._names)
@@ -0,0 +1,210 @@
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+from cache import redis_client
+from models import Group, Player, PlayerMonthTotal
+from models.associations import user_group_association
+from models.base import unit_of_work
+from utils.logger import Logger
+from utils.singleflight import SingleFlight
+
+load_dotenv()
+
+logger = Logger()
+
+
+class LootLeaderboards:
+    """
+    Per-partition loot leaderboards, kept as Redis sorted sets scored by loot value:
+
+        leaderboard:<YYYYMM>                   every player with loot that month
+        leaderboard:<YYYYMM>:group:<group_id>  the members of one group
+
+beside a running total of the month's loot across every player:
+
+        leaderboard:<YYYYMM>:total
+
+    Drops are added with ZINCRBY in the same pipeline as the rest of the player's
+    cached stats (see PlayerStatsCache._queue_drop_update), so ranks and top-N
+    lists are single O(log n) commands instead of a sort over every player, and
+    the global total is a single GET instead of a sum over the whole board.
+
+    A partition's boards are built from the `player_month_totals` rollup the
+    first time they're read, marked by `leaderboard:<YYYYMM>:built`. Increments
+    that arrive before then only land in boards that the build replaces. The
+    marker expires after `rebuild_interval` seconds, so the next read after that
+    rebuilds the boards from the rollups. This reconciles any drift, e.g. from
+    an increment lost to a failed pipeline or racing a rebuild. Anything that
+    writes rollups behind the ingest pipeline's back (the backfill) must call
+    `invalidate` for the partitions it touched.
+
+    Group membership, and each group's member count, is cached in memory for
+    `membership_ttl` seconds so that neither ingest nor drop notifications query
+    `user_group_association` for every batch.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LootLeaderboards, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.membership_ttl = int(os.getenv("LEADERBOARD_MEMBERSHIP_TTL", 300))
+        self.rebuild_interval = int(os.getenv("LEADERBOARD_REBUILD_INTERVAL", 3600))
+        # Concurrent first reads of a partition share one rebuild
+        self._builds = SingleFlight()
+        self._groups: Dict[int, Tuple[float, Tuple[int, ...]]] = {}  # player_id -> (expiry, group ids)
+        self._member_counts: Dict[Optional[int], Tuple[float, int]] = {}  # group_id -> (expiry, members)
+        self._initialized = True
+
+    @staticmethod
+    def get_key(partition: int, group_id: Optional[int] = None) -> str:
+        if group_id is None:
+            return f"leaderboard:{partition}"
+        return f"leaderboard:{partition}:group:{group_id}"
+
+    @staticmethod
+    def _built_key(partition: int) -> str:
+        return f"leaderboard:{partition}:built"
+
+    @staticmethod
+    def _total_key(partition: int) -> str:
+        return f"leaderboard:{partition}:total"
+
+    async def get_player_groups(self, player_ids: Iterable[int]) -> Dict[int, Tuple[int, ...]]:
+        """The group IDs of each player, loading any that aren't cached in one query"""
+        now = time.monotonic()
+        groups = {}
+        missing = []
+        for player_id in set(player_ids):
+            cached = self._groups.get(player_id)
+            if cached and cached[0] > now:
+                groups[player_id] = cached[1]
+            else:
+                missing.append(player_id)
+        if missing:
+            loaded = defaultdict(list)
+            async with unit_of_work(read_only=True) as db:
+                rows = await db.execute(
+                    select(user_group_association.c.player_id, user_group_association.c.group_id)
+                    .where(user_group_association.c.player_id.in_(missing))
+                )
+                for player_id, group_id in rows:
+                    loaded[player_id].append(group_id)
+            for player_id in missing:
+                groups[player_id] = tuple(loaded[player_id])
+                self._groups[player_id] = (now + self.membership_ttl, groups[player_id])
+        return groups
+
+    def invalidate_player(self, player_id: int, group_id: Optional[int] = None) -> None:
+        """Forget a player's cached group membership, and the group's member count, after they join or leave it"""
+        self._groups.pop(player_id, None)
+        self._member_counts.pop(group_id, None)
+        self._member_counts.pop(None, None)
+
+    async def get_member_count(self, group_id: Optional[int] = None) -> int:
+        """How many players belong to a group, or are tracked at all without one"""
+        now = time.monotonic()
+        cached = self._member_counts.get(group_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        if group_id is None:
+            query = select(func.count()).select_from(Player)
+        else:
+            query = select(func.count()).select_from(user_group_association)\
+                .where(user_group_association.c.group_id == group_id)
+        async with unit_of_work(read_only=True) as db:
+            count = (await db.execute(query)).scalar()
+        self._member_counts[group_id] = (now + self.membership_ttl, count)
+        return count
+
+    def queue_increment(self, pipe, partition: int, player_id: int, value: int, group_ids: Iterable[int] = ()) -> None:
+        """Queue a change in a player's loot value onto the global board and total and their groups' boards"""
+        pipe.zincrby(self.get_key(partition), value, player_id)
+        pipe.incrby(self._total_key(partition), value)
+        for group_id in group_ids:
+            pipe.zincrby(self.get_key(partition, group_id), value, player_id)
+
+    @staticmethod
+    def _totals_query(partition: int):
+        """Select every player's loot value in a partition"""
+        return (select(PlayerMonthTotal.player_id, PlayerMonthTotal.total_value)
+                .where(PlayerMonthTotal.partition == partition))
+
+    async def rebuild(self, partition: int) -> None:
+        """Rebuild a partition's global and group boards from the monthly rollups"""
+        # From the primary: a lagging replica would widen the window in which the
+        # replaced boards swallow increments made since the rollups were read
+        async with unit_of_work() as db:
+            totals = dict((await db.execute(self._totals_query(partition))).all())
+            group_ids = (await db.execute(select(Group.group_id))).scalars().all()
+            members = (await db.execute(
+                select(user_group_association.c.group_id, user_group_association.c.player_id)
+                .where(user_group_association.c.player_id.in_(
+                    select(PlayerMonthTotal.player_id).where(PlayerMonthTotal.partition == partition)
+                ))
+            )).all()
+        group_totals = defaultdict(dict)
+        for group_id, player_id in members:
+            group_totals[group_id][player_id] = totals[player_id]
+
+        # MULTI/EXEC, so readers see either the old boards or the complete new ones
+        pipe = redis_client.pipeline()
+        pipe.delete(self.get_key(partition), *(self.get_key(partition, group_id) for group_id in group_ids))
+        if totals:
+            pipe.zadd(self.get_key(partition), totals)
+        pipe.set(self._total_key(partition), sum(totals.values()))
+        for group_id, group_members in group_totals.items():
+            pipe.zadd(self.get_key(partition, group_id), group_members)
+        pipe.set(self._built_key(partition), int(time.time()), ex=self.rebuild_interval)
+        await pipe.execute()
+        logger.info("leaderboards", f"Rebuilt the {partition} leaderboards ({len(totals)} players, "
+                                    f"{len(group_totals)} groups)")
+
+    async def invalidate(self, partitions: Iterable[int]) -> None:
+        """Have the next read of each partition rebuild its boards from the rollups"""
+        partitions = list(partitions)
+        if partitions:
+            await redis_client.delete(*(self._built_key(partition) for partition in partitions))
+
+    async def _ensure_built(self, partition: int) -> None:
+        if not await redis_client.exists(self._built_key(partition)):
+            await self._builds.do(partition, lambda: self.rebuild(partition))
+
+    async def get_top(self, partition: int, count: Optional[int] = None,
+                      group_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        """The top `count` (or all) players of a board as (player_id, total_value), highest first"""
+        await self._ensure_built(partition)
+        entries = await redis_client.zrevrange(self.get_key(partition, group_id), 0,
+                                               -1 if count is None else count - 1, withscores=True)
+        return [(int(player_id), int(value)) for player_id, value in entries]
+
+    async def get_total(self, partition: int) -> int:
+        """The month's loot value across every player"""
+        await self._ensure_built(partition)
+        return int(await redis_client.get(self._total_key(partition)) or 0)
+
+    async def get_rank(self, player_id: int, partition: int,
+                       group_id: Optional[int] = None) -> Tuple[int, int, int]:
+        """
+        A player's position on a board as (rank, total_value, ranked_players).
+        Players without any loot on the board are placed just after the last ranked player.
+        """
+        await self._ensure_built(partition)
+        key = self.get_key(partition, group_id)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zrevrank(key, player_id)
+        pipe.zscore(key, player_id)
+        pipe.zcard(key)
+        rank, value, ranked_players = await pipe.execute()
+        if rank is None:
+            return (ranked_players + 1, 0, ranked_players)
+        return (rank + 1, int(value), ranked_players)
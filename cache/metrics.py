@@ -210,7 +210,7 @@ class MetricsTracker:
         cache_key = f"metrics:{metric_type}:cached_data"
         
         # Try to get cached data first
-        cached_data = redis_client.get(cache_key)
+        cached_data = await redis_client.get(cache_key)
         if cached_data:
             return json.loads(cached_data)
         
@@ -271,7 +271,7 @@ class MetricsTracker:
         }
         
         # Cache the result for 1 minute
-        redis_client.setex(cache_key, 60, json.dumps(metrics_data))
+        await redis_client.setex(cache_key, 60, json.dumps(metrics_data))
         return metrics_data
     
     def _calculate_average(self, count: int, start_time: datetime) -> float:
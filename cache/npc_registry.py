@@ -0,0 +1,85 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import select
+from models.base import engine
+from models import NpcList
+
+load_dotenv()
+
+
+class NpcRegistry:
+    """
+    In-process index of the `npc_list` table, keyed by case-normalised NPC name.
+
+    The table is loaded once and then refreshed periodically (or on demand from
+    the admin commands), so resolving a drop's source never touches the database.
+    Names that aren't in the table are remembered as misses until the next refresh.
+    Loading is a blocking query; callers on the event loop run it with
+    `asyncio.to_thread`.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(NpcRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._misses: Dict[str, int] = {}  # normalised name -> times seen since last refresh
+        self.max_misses = 1000
+        self.loaded_at = 0
+        self.refresh_interval = int(os.getenv("NPC_REFRESH_INTERVAL", 1800))
+        self._initialized = True
+
+    @staticmethod
+    def normalize(npc_name: str) -> str:
+        return " ".join(npc_name.lower().split())
+
+    def load(self) -> int:
+        """(Re)load every NPC from the database, returning the number loaded"""
+        # A pooled connection of its own, so this can run in a worker thread
+        with engine.connect() as connection:
+            rows = connection.execute(select(NpcList.npc_id, NpcList.npc_name)).all()
+        ids = {}
+        names = {}
+        for npc_id, npc_name in rows:
+            ids[self.normalize(npc_name)] = npc_id
+            names[npc_id] = npc_name
+        # Swap the new maps in whole so lookups never see a half-built index
+        self._ids, self._names = ids, names
+        self._misses = {}
+        self.loaded_at = int(time.time())
+        return len(ids)
+
+    def get_id(self, npc_name: str) -> Optional[int]:
+        """Resolve an NPC name to its ID without touching the database"""
+        if not self.loaded_at:
+            self.load()
+        key = self.normalize(npc_name)
+        npc_id = self._ids.get(key)
+        if npc_id is None and (key in self._misses or len(self._misses) < self.max_misses):
+            self._misses[key] = self._misses.get(key, 0) + 1
+        return npc_id
+
+    def get_name(self, npc_id: int) -> Optional[str]:
+        if not self.loaded_at:
+            self.load()
+        return self._names.get(npc_id)
+
+    def is_stale(self) -> bool:
+        return int(time.time()) - self.loaded_at >= self.refresh_interval
+
+    def get_misses(self, limit: int = 25) -> List[Tuple[str, int]]:
+        """Most frequently seen unknown NPC names since the last refresh"""
+        return sorted(self._misses.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+    def __len__(self) -> int:
+        return len(self._ids)
@@ -0,0 +1,116 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class PlayerIdentity(NamedTuple):
+    """The verified identity of a player, as stored in the `players` table"""
+    player_id: int
+    player_name: str
+    normalized_name: str
+    wom_id: Optional[int]
+    account_hash: str
+
+
+class PlayerIdentityCache:
+    """
+    LRU cache of verified player identities, keyed by account hash with
+    secondary lookups by player_id and wom_id.
+
+    Lets `check_player` verify known players in memory. Hashes that failed
+    verification are cached negatively for `negative_ttl` seconds so repeated
+    submissions from them don't hit the database or WiseOldMan each time.
+    Anything that renames a player must call `invalidate`.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PlayerIdentityCache, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.max_size = int(os.getenv("PLAYER_CACHE_SIZE", 50000))
+        self.negative_ttl = int(os.getenv("PLAYER_NEGATIVE_TTL", 300))
+        self._by_hash: "OrderedDict[str, PlayerIdentity]" = OrderedDict()
+        self._hash_by_player_id: Dict[int, str] = {}
+        self._hash_by_wom_id: Dict[int, str] = {}
+        self._negative: Dict[str, float] = {}  # account hash -> expiry timestamp
+        self.hits = 0
+        self.misses = 0
+        self._initialized = True
+
+    def get(self, account_hash: str) -> Optional[PlayerIdentity]:
+        identity = self._by_hash.get(account_hash)
+        if identity is None:
+            self.misses += 1
+            return None
+        self._by_hash.move_to_end(account_hash)
+        self.hits += 1
+        return identity
+
+    def get_by_player_id(self, player_id: int) -> Optional[PlayerIdentity]:
+        account_hash = self._hash_by_player_id.get(player_id)
+        return self.get(account_hash) if account_hash else None
+
+    def get_by_wom_id(self, wom_id: int) -> Optional[PlayerIdentity]:
+        account_hash = self._hash_by_wom_id.get(wom_id)
+        return self.get(account_hash) if account_hash else None
+
+    def put(self, identity: PlayerIdentity) -> None:
+        self.invalidate(account_hash=identity.account_hash)
+        self._negative.pop(identity.account_hash, None)
+        self._by_hash[identity.account_hash] = identity
+        self._hash_by_player_id[identity.player_id] = identity.account_hash
+        if identity.wom_id:
+            self._hash_by_wom_id[identity.wom_id] = identity.account_hash
+        while len(self._by_hash) > self.max_size:
+            _, evicted = self._by_hash.popitem(last=False)
+            self._drop_secondary(evicted)
+
+    def invalidate(self, player_id: Optional[int] = None, account_hash: Optional[str] = None) -> None:
+        """Forget a player, e.g. after their name or account hash changes"""
+        if account_hash is None and player_id is not None:
+            account_hash = self._hash_by_player_id.get(player_id)
+        if account_hash is None:
+            return
+        identity = self._by_hash.pop(account_hash, None)
+        if identity:
+            self._drop_secondary(identity)
+
+    def _drop_secondary(self, identity: PlayerIdentity) -> None:
+        if self._hash_by_player_id.get(identity.player_id) == identity.account_hash:
+            del self._hash_by_player_id[identity.player_id]
+        if identity.wom_id and self._hash_by_wom_id.get(identity.wom_id) == identity.account_hash:
+            del self._hash_by_wom_id[identity.wom_id]
+
+    def put_negative(self, account_hash: str) -> None:
+        now = time.time()
+        if len(self._negative) >= self.max_size:
+            self._negative = {key: expiry for key, expiry in self._negative.items() if expiry > now}
+        self._negative[account_hash] = now + self.negative_ttl
+
+    def is_negative(self, account_hash: str) -> bool:
+        expiry = self._negative.get(account_hash)
+        if expiry is None:
+            return False
+        if expiry <= time.time():
+            del self._negative[account_hash]
+            return False
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._by_hash),
+            "negative": len(self._negative),
+            "hits": self.hits,
+            "misses": self.misses
+        }
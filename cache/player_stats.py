@@ -1,18 +1,30 @@
 from datetime import datetime
+import os
 import time
-from sqlalchemy import func
+from collections import defaultdict
+from itertools import groupby
+from sqlalchemy import func, select
+from redis.exceptions import WatchError
 from cache import redis_client
-from models.base import session
-from models import Player
-from typing import Dict, Optional, List, TYPE_CHECKING, Tuple
+from cache.leaderboards import LootLeaderboards
+from models.base import session, unit_of_work
+from models import Group, Player, PlayerMonthTotal, PlayerMonthItem, PlayerMonthNpc
+from models.associations import user_group_association
+from typing import Dict, Iterable, Optional, List, TYPE_CHECKING, Tuple
 import json
 from utils.misc import get_partition
 from typing import TYPE_CHECKING
 from utils.logger import Logger
 import asyncio
-from models.submissions.drop import Drop
 
 logger = Logger()
+leaderboards = LootLeaderboards()
+
+rebuild_chunk_size = int(os.getenv("REBUILD_CHUNK_SIZE", 1000))
+## Players read (or rebuilt) per pipeline by get_many_player_stats
+stats_chunk_size = int(os.getenv("STATS_CHUNK_SIZE", 250))
+## Hash field suffixes of the per-partition breakdowns, in rollup column order
+BREAKDOWN_FIELDS = {'items': ('quantity', 'value'), 'bosses': ('drops', 'value')}
 
 
 class PlayerStatsCache:
@@ -49,12 +61,64 @@ class PlayerStatsCache:
     
     async def update_player_stats(self, drop: 'Drop') -> None:
         """Update all player stats in Redis when a new drop is received"""
+        groups = await leaderboards.get_player_groups([self.player_id])
+        pipe = redis_client.pipeline()
+        self._queue_drop_update(pipe, drop, int(time.time()), groups[self.player_id])
+        await pipe.execute()
+    
+    @classmethod
+    async def update_many(cls, drops: Iterable['Drop']) -> None:
+        """Apply a whole batch of new drops, for any number of players, in one pipeline"""
+        current_time = int(time.time())
+        groups = await leaderboards.get_player_groups(drop.player_id for drop in drops)
+        pipe = redis_client.pipeline(transaction=False)
+        for drop in drops:
+            cls.get_instance(drop.player_id)._queue_drop_update(pipe, drop, current_time, groups[drop.player_id])
+        await pipe.execute()
+    
+    def _get_submission_keys(self) -> Dict[str, str]:
+        """Get Redis keys for this player's non-drop submissions"""
+        base_key = f"player:{self.player_id}"
+        return {
+            'clog': f"{base_key}:clog",
+            'cas': f"{base_key}:cas",
+            'pbs': f"{base_key}:pbs"
+        }
+    
+    @classmethod
+    async def update_collection_logs(cls, entries: Iterable) -> None:
+        """Record a batch of new collection log slots in one pipeline"""
+        pipe = redis_client.pipeline(transaction=False)
+        for entry in entries:
+            keys = cls.get_instance(entry.player_id)._get_submission_keys()
+            pipe.hset(keys['clog'], str(entry.item_id), entry.npc_id)
+            if entry.reported_slots is not None:
+                pipe.hset(keys['clog'], "reported_slots", entry.reported_slots)
+        await pipe.execute()
+    
+    @classmethod
+    async def update_combat_achievements(cls, entries: Iterable) -> None:
+        """Record a batch of completed combat achievement tasks in one pipeline"""
+        pipe = redis_client.pipeline(transaction=False)
+        for entry in entries:
+            keys = cls.get_instance(entry.player_id)._get_submission_keys()
+            pipe.sadd(keys['cas'], entry.task_name)
+        await pipe.execute()
+    
+    @classmethod
+    async def update_personal_bests(cls, entries: Iterable) -> None:
+        """Record a batch of personal bests, keyed by NPC, in one pipeline"""
+        pipe = redis_client.pipeline(transaction=False)
+        for entry in entries:
+            keys = cls.get_instance(entry.player_id)._get_submission_keys()
+            pipe.hset(keys['pbs'], str(entry.npc_id), entry.personal_best)
+        await pipe.execute()
+    
+    def _queue_drop_update(self, pipe, drop: 'Drop', current_time: int, group_ids: Iterable[int] = ()) -> None:
+        """Queue the stat increments for a single drop, and its leaderboard scores, onto a pipeline"""
         # Get both total and partition-specific keys
         total_keys = self._get_cache_keys()
         partition_keys = self._get_cache_keys(drop.date_added)
-        current_time = int(time.time())
-        
-        pipe = redis_client.pipeline()
         
         # Update total stats
         pipe.hincrby(total_keys['total'], "total_value", drop.value)
@@ -77,13 +141,17 @@ class PlayerStatsCache:
                 boss_key = f"{drop.npc_id}"
                 pipe.hincrby(partition_keys['bosses'], f"{boss_key}:drops", 1)
                 pipe.hincrby(partition_keys['bosses'], f"{boss_key}:value", drop.value)
-        
-        await pipe.execute()
+            
+            # Update the month's global and group leaderboards, and the groups' aggregates
+            partition, _ = get_partition(drop.date_added)
+            leaderboards.queue_increment(pipe, partition, self.player_id, drop.value, group_ids)
+            GroupStatsCache.queue_drop_update(pipe, partition, drop, group_ids, current_time)
     
     async def remove_drop(self, drop: 'Drop') -> None:
         """Remove a specific drop from both total and partition-specific cache"""
         total_keys = self._get_cache_keys()
         partition_keys = self._get_cache_keys(drop.date_added)
+        groups = await leaderboards.get_player_groups([self.player_id])
         
         pipe = redis_client.pipeline()
         
@@ -106,6 +174,11 @@ class PlayerStatsCache:
             pipe.hincrby(partition_keys['bosses'], f"{boss_key}:drops", -1)
             pipe.hincrby(partition_keys['bosses'], f"{boss_key}:value", -drop.value)
         
+        # Remove from the month's leaderboards and group aggregates
+        partition, _ = get_partition(drop.date_added)
+        leaderboards.queue_increment(pipe, partition, self.player_id, -drop.value, groups[self.player_id])
+        GroupStatsCache.queue_drop_update(pipe, partition, drop, groups[self.player_id], int(time.time()), sign=-1)
+        
         await pipe.execute()
     
     async def invalidate_cache(self) -> None:
@@ -113,132 +186,126 @@ class PlayerStatsCache:
         keys = self._get_cache_keys()
         await redis_client.delete(*keys.values())
     
-    async def rebuild_cache(self) -> None:
-        """Rebuild all cache data from the database, including partitioned data"""
-        await self.invalidate_cache()
-        
-        # Fetch all drops for the player
-        drops = session.query(Drop).filter(Drop.player_id == self.player_id).all()
-        
-        # Initialize tracking dictionaries
-        total_stats = {"value": 0, "drops": 0}
-        partitioned_stats = {}
-        
-        for drop in drops:
-            # Update total stats
-            total_stats["value"] += drop.value
-            total_stats["drops"] += 1
-            
-            # Get partition key
-            partition = f"{drop.date_added.year}:{drop.date_added.month:02d}"
-            
-            # Initialize partition if needed
-            if partition not in partitioned_stats:
-                partitioned_stats[partition] = {
-                    "stats": {"value": 0, "drops": 0},
-                    "items": {},
-                    "bosses": {}
-                }
-            
-            # Update partition stats
-            part_stats = partitioned_stats[partition]
-            part_stats["stats"]["value"] += drop.value
-            part_stats["stats"]["drops"] += 1
-            
-            # Update item stats
-            if drop.item_id not in part_stats["items"]:
-                part_stats["items"][drop.item_id] = {"quantity": 0, "value": 0}
-            part_stats["items"][drop.item_id]["quantity"] += drop.quantity
-            part_stats["items"][drop.item_id]["value"] += drop.value
-            
-            # Update boss stats
-            if drop.npc_id:
-                if drop.npc_id not in part_stats["bosses"]:
-                    part_stats["bosses"][drop.npc_id] = {"drops": 0, "value": 0}
-                part_stats["bosses"][drop.npc_id]["drops"] += 1
-                part_stats["bosses"][drop.npc_id]["value"] += drop.value
-        
-        # Store everything in Redis
-        pipe = redis_client.pipeline()
-        
-        # Store total stats
+    @staticmethod
+    def _rollup_query(rollup, player_ids: List[int]):
+        """Select the monthly rollups of some players, in player and then partition order"""
+        return (select(*rollup.__table__.columns)
+                .where(rollup.player_id.in_(player_ids))
+                .order_by(rollup.player_id, rollup.partition))
+    
+    def _partition_keys(self, partition: int) -> Dict[str, str]:
+        return self._get_cache_keys(datetime(partition // 100, partition % 100, 1))
+    
+    def _queue_rebuild_totals(self, pipe, totals: List, ttl: Optional[int]) -> None:
+        """Replace the all-time and per-partition totals, clearing each partition's breakdowns first"""
+        current_time = int(time.time())
         total_keys = self._get_cache_keys()
+        pipe.delete(total_keys['total'])
         pipe.hset(total_keys['total'], mapping={
-            "total_value": total_stats["value"],
-            "total_drops": total_stats["drops"],
-            "last_updated": int(time.time())
+            "total_value": sum(row.total_value for row in totals),
+            "total_drops": sum(row.total_drops for row in totals),
+            "last_updated": current_time
         })
-        
-        # Store partitioned stats
-        for partition, stats in partitioned_stats.items():
-            year, month = partition.split(":")
-            partition_date = datetime(int(year), int(month), 1)
-            partition_keys = self._get_cache_keys(partition_date)
-            
-            # Store partition general stats
+        if ttl:
+            pipe.expire(total_keys['total'], ttl)
+        for row in totals:
+            partition_keys = self._partition_keys(row.partition)
+            pipe.delete(partition_keys['stats'], partition_keys['items'], partition_keys['bosses'])
             pipe.hset(partition_keys['stats'], mapping={
-                "total_value": stats["stats"]["value"],
-                "total_drops": stats["stats"]["drops"],
-                "last_updated": int(time.time())
+                "total_value": row.total_value,
+                "total_drops": row.total_drops,
+                "last_updated": current_time
             })
-            
-            # Store partition item stats
-            for item_id, item_stats in stats["items"].items():
-                pipe.hset(partition_keys['items'], f"{item_id}:quantity", item_stats["quantity"])
-                pipe.hset(partition_keys['items'], f"{item_id}:value", item_stats["value"])
-            
-            # Store partition boss stats
-            for npc_id, boss_stats in stats["bosses"].items():
-                pipe.hset(partition_keys['bosses'], f"{npc_id}:drops", boss_stats["drops"])
-                pipe.hset(partition_keys['bosses'], f"{npc_id}:value", boss_stats["value"])
-            
-            # Set TTL for partition keys
-            for key in partition_keys.values():
-                pipe.expire(key, self.cache_ttl)
-        
-        # Set TTL for total keys
-        for key in total_keys.values():
-            pipe.expire(key, self.cache_ttl)
+            if ttl:
+                pipe.expire(partition_keys['stats'], ttl)
+    
+    def _queue_rebuild_breakdown(self, pipe, key: str, rows: List, ttl: Optional[int]) -> None:
+        """Write one chunk of item or boss rollup rows, as one HSET per partition it covers"""
+        count_field, value_field = BREAKDOWN_FIELDS[key]
+        for partition, partition_rows in groupby(rows, key=lambda row: row[0]):
+            mapping = {}
+            for _, entry_id, count, value in partition_rows:
+                mapping[f"{entry_id}:{count_field}"] = count
+                mapping[f"{entry_id}:{value_field}"] = value
+            partition_key = self._partition_keys(partition)[key]
+            pipe.hset(partition_key, mapping=mapping)
+            if ttl:
+                pipe.expire(partition_key, ttl)
     
+    async def rebuild_cache(self) -> None:
+        """Rebuild all cache data from the database, including partitioned data"""
+        await self.rebuild_many([self.player_id])
+    
+    @classmethod
+    async def rebuild_many(cls, player_ids: List[int]) -> None:
+        """Rebuild the cached stats of several players with one query per rollup and one pipeline"""
+        # The pipeline is a MULTI/EXEC, so readers never see a half-rebuilt cache. That means
+        # every command is buffered until execute(): memory grows with the rollup rows of all
+        # of `player_ids` (months x items/bosses, not drops), so callers rebuild large sets of
+        # players a chunk at a time. From the primary, like LootLeaderboards.rebuild: a lagging
+        # replica would replace the totals with ones missing the increments made since.
+        pipe = redis_client.pipeline()
+        async with unit_of_work() as db:
+            totals = (await db.execute(cls._rollup_query(PlayerMonthTotal, player_ids))).all()
+            player_totals = {player_id: list(rows) for player_id, rows in groupby(totals, key=lambda row: row.player_id)}
+            for player_id in player_ids:
+                # Players without any drops still get (zeroed) totals, so they aren't rebuilt on every read
+                cache = cls.get_instance(player_id)
+                cache._queue_rebuild_totals(pipe, player_totals.get(player_id, []), cache.cache_ttl)
+            for key, rollup in (('items', PlayerMonthItem), ('bosses', PlayerMonthNpc)):
+                # Server-side cursor, fetched `rebuild_chunk_size` rows at a time
+                query = cls._rollup_query(rollup, player_ids).execution_options(yield_per=rebuild_chunk_size)
+                result = await db.stream(query)
+                async for rows in result.partitions():
+                    for player_id, player_rows in groupby(rows, key=lambda row: row.player_id):
+                        cache = cls.get_instance(player_id)
+                        cache._queue_rebuild_breakdown(pipe, key, [row[1:] for row in player_rows], cache.cache_ttl)
         await pipe.execute()
     
     async def get_player_stats(self, partition_date: Optional[datetime] = None) -> Optional[Dict]:
         """Get complete player stats from cache or compute from database"""
         keys = self._get_cache_keys(partition_date)
         
-        # Try cache first
-        cached_total = redis_client.hgetall(keys['total'])
-        cached_stats = redis_client.hgetall(keys['stats'])
-        cached_items = redis_client.hgetall(keys['items'])
-        cached_bosses = redis_client.hgetall(keys['bosses'])
+        # Try cache first, fetching every key in one round trip
+        fetched = [name for name in ('total', 'stats', 'items', 'bosses') if name in keys]
+        pipe = redis_client.pipeline(transaction=False)
+        for name in fetched:
+            pipe.hgetall(keys[name])
+        cached = dict(zip(fetched, await pipe.execute()))
         
-        if cached_total:  # Only check total as it's always present
-            result = {
-                "total": {
-                    "total_value": int(cached_total["total_value"]),
-                    "total_drops": int(cached_total["total_drops"]),
-                    "last_updated": int(cached_total["last_updated"])
-                }
-            }
-            
-            if partition_date:
-                result["partition"] = {
-                    "general": {
-                        "total_value": int(cached_stats.get("total_value", 0)),
-                        "total_drops": int(cached_stats.get("total_drops", 0)),
-                        "last_updated": int(cached_stats.get("last_updated", 0))
-                    },
-                    "items": self._parse_cached_items(cached_items),
-                    "bosses": self._parse_cached_bosses(cached_bosses)
-                }
-            
-            return result
+        if cached['total']:  # Only check total as it's always present
+            return self._parse_cached_stats(cached)
         
         # Cache miss - rebuild cache and return
         await self.rebuild_cache()
         return await self.get_player_stats(partition_date)
     
-    def _parse_cached_items(self, cached_items: Dict) -> Dict:
+    @classmethod
+    def _parse_cached_stats(cls, cached: Dict[str, Dict]) -> Dict:
+        """Parse the raw cached hashes of one player ('total', plus 'stats'/'items'/'bosses' for a partition)"""
+        cached_total = cached['total']
+        result = {
+            "total": {
+                "total_value": int(cached_total.get("total_value", 0)),
+                "total_drops": int(cached_total.get("total_drops", 0)),
+                "last_updated": int(cached_total.get("last_updated", 0))
+            }
+        }
+        if 'stats' in cached:
+            cached_stats = cached['stats']
+            result["partition"] = {
+                "general": {
+                    "total_value": int(cached_stats.get("total_value", 0)),
+                    "total_drops": int(cached_stats.get("total_drops", 0)),
+                    "last_updated": int(cached_stats.get("last_updated", 0))
+                },
+                "items": cls._parse_cached_items(cached['items']),
+                "bosses": cls._parse_cached_bosses(cached['bosses'])
+            }
+        return result
+    
+    @staticmethod
+    def _parse_cached_items(cached_items: Dict) -> Dict:
         """Parse raw cached item data into structured format"""
         items = {}
         for key, value in cached_items.items():
@@ -248,7 +315,8 @@ class PlayerStatsCache:
             items[item_id][stat_type] = int(value)
         return items
     
-    def _parse_cached_bosses(self, cached_bosses: Dict) -> Dict:
+    @staticmethod
+    def _parse_cached_bosses(cached_bosses: Dict) -> Dict:
         """Parse raw cached boss data into structured format"""
         bosses = {}
         for key, value in cached_bosses.items():
@@ -258,122 +326,265 @@ class PlayerStatsCache:
             bosses[npc_id][stat_type] = int(value)
         return bosses
     
-    def rebuild_cache_sync(self) -> None:
-        """Synchronous version of rebuild_cache for SQLAlchemy events"""
-        try:
-            drops = session.query(Drop).filter(Drop.player_id == self.player_id).all()
-            
-            total_stats = {"value": 0, "drops": 0}
-            partitioned_stats = {}
-            
-            for drop in drops:
-                # Update total stats
-                total_stats["value"] += drop.value
-                total_stats["drops"] += 1
-                
-                # Get partition using utility function
-                _, partition = get_partition(drop.date_added)
-                
-                if partition not in partitioned_stats:
-                    partitioned_stats[partition] = {
-                        "stats": {"value": 0, "drops": 0},
-                        "items": {},
-                        "bosses": {}
-                    }
-                
-                part_stats = partitioned_stats[partition]
-                part_stats["stats"]["value"] += drop.value
-                part_stats["stats"]["drops"] += 1
-                
-                # Update item and boss stats
-                if drop.item_id not in part_stats["items"]:
-                    part_stats["items"][drop.item_id] = {"quantity": 0, "value": 0}
-                part_stats["items"][drop.item_id]["quantity"] += drop.quantity
-                part_stats["items"][drop.item_id]["value"] += drop.value
-                
-                if drop.npc_id:
-                    if drop.npc_id not in part_stats["bosses"]:
-                        part_stats["bosses"][drop.npc_id] = {"drops": 0, "value": 0}
-                    part_stats["bosses"][drop.npc_id]["drops"] += 1
-                    part_stats["bosses"][drop.npc_id]["value"] += drop.value
-            
-            # Store in Redis
-            pipe = redis_client.pipeline()
-            
-            # Store total stats
-            total_keys = self._get_cache_keys()
-            pipe.hset(total_keys['total'], mapping={
-                "total_value": total_stats["value"],
-                "total_drops": total_stats["drops"],
-                "last_updated": int(time.time())
-            })
-            
-            # Store partitioned stats
-            for partition, stats in partitioned_stats.items():
-                year, month = partition.split(":")
-                partition_date = datetime(int(year), int(month), 1)
-                partition_keys = self._get_cache_keys(partition_date)
-                
-                pipe.hset(partition_keys['stats'], mapping={
-                    "total_value": stats["stats"]["value"],
-                    "total_drops": stats["stats"]["drops"],
-                    "last_updated": int(time.time())
-                })
-                
-                for item_id, item_stats in stats["items"].items():
-                    pipe.hset(partition_keys['items'], 
-                        f"{item_id}:quantity", item_stats["quantity"])
-                    pipe.hset(partition_keys['items'], 
-                        f"{item_id}:value", item_stats["value"])
-                
-                for npc_id, boss_stats in stats["bosses"].items():
-                    pipe.hset(partition_keys['bosses'], 
-                        f"{npc_id}:drops", boss_stats["drops"])
-                    pipe.hset(partition_keys['bosses'], 
-                        f"{npc_id}:value", boss_stats["value"])
-            
-            pipe.execute()
-            
-        except Exception as e:
-            logger.error("rebuild_cache_sync", f"Error rebuilding cache for player {self.player_id}: {e}")
+async def _fetch_many_player_stats(player_ids: List[int], partition_date: datetime) -> Dict[int, Dict]:
+    """Read the cached stats of many players, `stats_chunk_size` players per pipelined round trip"""
+    results = {}
+    for start in range(0, len(player_ids), stats_chunk_size):
+        chunk = player_ids[start:start + stats_chunk_size]
+        pipe = redis_client.pipeline(transaction=False)
+        for player_id in chunk:
+            keys = PlayerStatsCache.get_instance(player_id)._get_cache_keys(partition_date)
+            for name in ('total', 'stats', 'items', 'bosses'):
+                pipe.hgetall(keys[name])
+        replies = await pipe.execute()
+        for index, player_id in enumerate(chunk):
+            cached = dict(zip(('total', 'stats', 'items', 'bosses'), replies[index * 4:index * 4 + 4]))
+            if cached['total']:
+                results[player_id] = PlayerStatsCache._parse_cached_stats(cached)
+    return results
+
+async def get_many_player_stats(player_ids: Iterable[int], partition: int) -> Dict[int, Dict]:
+    """
+    Get the stats of many players for one partition (YYYYMM), in the same shape as
+    `PlayerStatsCache.get_player_stats`, keyed by player ID.
+    
+    Cached stats are read in pipelined chunks. Players missing from the cache are
+    rebuilt together from the rollup tables and read back in one more pass, so a
+    group of hundreds of players costs a handful of round trips.
+    """
+    player_ids = list(dict.fromkeys(player_ids))
+    partition_date = datetime(partition // 100, partition % 100, 1)
+    results = await _fetch_many_player_stats(player_ids, partition_date)
+    missing = [player_id for player_id in player_ids if player_id not in results]
+    if missing:
+        for start in range(0, len(missing), stats_chunk_size):
+            await PlayerStatsCache.rebuild_many(missing[start:start + stats_chunk_size])
+        results.update(await _fetch_many_player_stats(missing, partition_date))
+    return {player_id: results[player_id] for player_id in player_ids if player_id in results}
+
 
 class GroupStatsCache:
-    def __init__(self):
-        self.cache_ttl = 3600  # 1 hour cache TTL
+    """
+    Per-group monthly aggregates of every member's drops, kept beside each player's own:
+    
+        group:<group_id>:partition:<YYYYMM>:stats   total_value, total_drops, last_updated
+        group:<group_id>:partition:<YYYYMM>:items   <item_id>:quantity, <item_id>:value
+        group:<group_id>:partition:<YYYYMM>:bosses  <npc_id>:drops, <npc_id>:value
+    
+    Drops are added in the same pipeline as the player's stats, for every group the
+    player belongs to. A member joining or leaving applies their monthly rollups as a
+    delta to the months that are already built (see apply_membership).
+    
+    A group's month is built from the rollups on first read and rebuilt once its
+    `built` marker expires after `cache_ttl`, which also reconciles any drift, e.g.
+    from another process's membership cache lagging behind a join.
+    """
+    cache_ttl = 3600  # 1 hour between rebuilds from the rollups
+    
+    @staticmethod
+    def _get_cache_keys(group_id: int, partition: int) -> Dict[str, str]:
+        """Get Redis cache keys for a group's month"""
+        base_key = f"group:{group_id}:partition:{partition}"
+        return {
+            'stats': f"{base_key}:stats",
+            'items': f"{base_key}:items",
+            'bosses': f"{base_key}:bosses",
+            'built': f"{base_key}:built"
+        }
+    
+    @classmethod
+    def queue_drop_update(cls, pipe, partition: int, drop: 'Drop', group_ids: Iterable[int],
+                          current_time: int, sign: int = 1) -> None:
+        """Queue the increments for one drop (or, with sign=-1, its removal) onto each of its player's groups"""
+        for group_id in group_ids:
+            keys = cls._get_cache_keys(group_id, partition)
+            pipe.hincrby(keys['stats'], "total_value", sign * drop.value)
+            pipe.hincrby(keys['stats'], "total_drops", sign)
+            pipe.hset(keys['stats'], "last_updated", current_time)
+            pipe.hincrby(keys['items'], f"{drop.item_id}:quantity", sign * drop.quantity)
+            pipe.hincrby(keys['items'], f"{drop.item_id}:value", sign * drop.value)
+            if drop.npc_id:
+                pipe.hincrby(keys['bosses'], f"{drop.npc_id}:drops", sign)
+                pipe.hincrby(keys['bosses'], f"{drop.npc_id}:value", sign * drop.value)
+            # A month that isn't built (or whose build expired) would otherwise be recreated
+            # here without a TTL; it's never read unbuilt, and rebuild() replaces it anyway
+            for name in ('stats', 'items', 'bosses'):
+                pipe.expire(keys[name], cls.cache_ttl)
+    
+    @staticmethod
+    def _members(group_id: int):
+        return select(user_group_association.c.player_id).where(
+            user_group_association.c.group_id == group_id, user_group_association.c.player_id.isnot(None))
+    
+    @classmethod
+    def _totals_query(cls, group_id: int, partition: int):
+        """Select the summed loot value and drop count of a group's current members in a partition"""
+        return (select(func.coalesce(func.sum(PlayerMonthTotal.total_value), 0),
+                       func.coalesce(func.sum(PlayerMonthTotal.total_drops), 0))
+                .where(PlayerMonthTotal.partition == partition,
+                       PlayerMonthTotal.player_id.in_(cls._members(group_id))))
+    
+    @classmethod
+    def _breakdown_query(cls, key: str, group_id: int, partition: int):
+        """Select a group's per-item ('items') or per-NPC ('bosses') sums in a partition"""
+        rollup, entry_column = {'items': (PlayerMonthItem, PlayerMonthItem.item_id),
+                                'bosses': (PlayerMonthNpc, PlayerMonthNpc.npc_id)}[key]
+        count_column, value_column = (rollup.__table__.c[name] for name in BREAKDOWN_FIELDS[key])
+        return (select(entry_column, func.sum(count_column), func.sum(value_column))
+                .where(rollup.partition == partition, rollup.player_id.in_(cls._members(group_id)))
+                .group_by(entry_column))
+    
+    @classmethod
+    async def rebuild(cls, group_id: int, partition: int) -> None:
+        """Rebuild a group's month from its current members' rollups"""
+        # Marks the build with when it read the membership, for apply_membership. From the
+        # primary, so a lagging replica can't hide a membership change committed before it.
+        read_at = time.time()
+        async with unit_of_work() as db:
+            total_value, total_drops = (await db.execute(cls._totals_query(group_id, partition))).one()
+            breakdowns = {
+                key: (await db.execute(cls._breakdown_query(key, group_id, partition))).all()
+                for key in ('items', 'bosses')
+            }
+        
+        keys = cls._get_cache_keys(group_id, partition)
+        pipe = redis_client.pipeline()
+        pipe.delete(keys['stats'], keys['items'], keys['bosses'])
+        pipe.hset(keys['stats'], mapping={
+            "total_value": total_value,
+            "total_drops": total_drops,
+            "last_updated": int(time.time())
+        })
+        for key, rows in breakdowns.items():
+            count_field, value_field = BREAKDOWN_FIELDS[key]
+            mapping = {}
+            for entry_id, count, value in rows:
+                mapping[f"{entry_id}:{count_field}"] = count
+                mapping[f"{entry_id}:{value_field}"] = value
+            if mapping:
+                pipe.hset(keys[key], mapping=mapping)
+        # Expire with the marker, so a month nobody reads doesn't linger
+        for name in ('stats', 'items', 'bosses'):
+            pipe.expire(keys[name], cls.cache_ttl)
+        pipe.set(keys['built'], read_at, ex=cls.cache_ttl)
+        await pipe.execute()
+    
+    @classmethod
+    async def invalidate(cls, partitions: Iterable[int]) -> None:
+        """Have the next read of every group's month in `partitions` rebuild it from the rollups"""
+        partitions = list(partitions)
+        if not partitions:
+            return
+        async with unit_of_work(read_only=True) as db:
+            group_ids = (await db.execute(select(Group.group_id))).scalars().all()
+        built_keys = [cls._get_cache_keys(group_id, partition)['built']
+                      for group_id in group_ids for partition in partitions]
+        if built_keys:
+            await redis_client.delete(*built_keys)
+    
+    @classmethod
+    async def get_group_stats(cls, group_id: int, partition: int) -> Dict:
+        """Get a group's stats for a month, in the shape of a player's `partition` stats"""
+        keys = cls._get_cache_keys(group_id, partition)
+        for attempt in range(2):
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.exists(keys['built'])
+            for name in ('stats', 'items', 'bosses'):
+                pipe.hgetall(keys[name])
+            built, cached_stats, cached_items, cached_bosses = await pipe.execute()
+            if built or attempt:
+                break
+            await cls.rebuild(group_id, partition)
+        return {
+            "general": {
+                "total_value": int(cached_stats.get("total_value", 0)),
+                "total_drops": int(cached_stats.get("total_drops", 0)),
+                "last_updated": int(cached_stats.get("last_updated", 0))
+            },
+            "items": PlayerStatsCache._parse_cached_items(cached_items),
+            "bosses": PlayerStatsCache._parse_cached_bosses(cached_bosses)
+        }
+    
+    @classmethod
+    async def apply_membership(cls, player_id: int, group_id: int, joined: bool = True,
+                               changed_at: Optional[float] = None) -> None:
+        """
+        Add (or remove) a player's monthly rollups to a group's aggregates and leaderboards.
+        
+        Only months that are built are changed, and only if their build read the membership
+        before `changed_at` (when it was committed); a later build already accounts for it,
+        and an unbuilt month picks it up when it's built. The delta is applied in a MULTI
+        that WATCHes the month's marker, and if a rebuild lands in between, the month is
+        simply marked for another rebuild rather than risking counting the player twice.
+        """
+        sign = 1 if joined else -1
+        changed_at = changed_at or time.time()
+        async with unit_of_work(read_only=True) as db:
+            totals = (await db.execute(PlayerStatsCache._rollup_query(PlayerMonthTotal, [player_id]))).all()
+            breakdowns = {
+                'items': (await db.execute(PlayerStatsCache._rollup_query(PlayerMonthItem, [player_id]))).all(),
+                'bosses': (await db.execute(PlayerStatsCache._rollup_query(PlayerMonthNpc, [player_id]))).all()
+            }
+        partition_breakdowns = defaultdict(list)
+        for key, rows in breakdowns.items():
+            for _, partition, entry_id, count, value in rows:
+                partition_breakdowns[partition].append((key, entry_id, count, value))
+        
+        # The leaderboards score players absolutely, so these can't double count
+        pipe = redis_client.pipeline(transaction=False)
+        for row in totals:
+            board_key = leaderboards.get_key(row.partition, group_id)
+            if joined:
+                pipe.zadd(board_key, {player_id: row.total_value})
+            else:
+                pipe.zrem(board_key, player_id)
+        await pipe.execute()
+        
+        for row in totals:
+            keys = cls._get_cache_keys(group_id, row.partition)
+            async with redis_client.pipeline() as pipe:
+                try:
+                    await pipe.watch(keys['built'])
+                    built_at = await pipe.get(keys['built'])
+                    if built_at is None or float(built_at) >= changed_at:
+                        await pipe.unwatch()
+                        continue
+                    pipe.multi()
+                    pipe.hincrby(keys['stats'], "total_value", sign * row.total_value)
+                    pipe.hincrby(keys['stats'], "total_drops", sign * row.total_drops)
+                    for key, entry_id, count, value in partition_breakdowns[row.partition]:
+                        count_field, value_field = BREAKDOWN_FIELDS[key]
+                        pipe.hincrby(keys[key], f"{entry_id}:{count_field}", sign * count)
+                        pipe.hincrby(keys[key], f"{entry_id}:{value_field}", sign * value)
+                    await pipe.execute()
+                except WatchError:
+                    await redis_client.delete(keys['built'])
+        # So this process's next drops from the player reach the group straight away
+        leaderboards.invalidate_player(player_id, group_id)
+    
+    @classmethod
+    def schedule_membership(cls, player_id: int, group_id: int, joined: bool = True) -> None:
+        """Apply a membership change in the background, from synchronous code such as the models"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not on the event loop (e.g. a script); the group's month is reconciled at its next rebuild
+            return
+        loop.create_task(cls.apply_membership(player_id, group_id, joined, time.time()))
 
 async def get_global_rankings(partition_date: Optional[datetime] = None) -> List[Tuple[int, int]]:
     """
-    Get global rankings of all players based on their total loot value
+    Get global rankings of all players based on their loot value in a month
     
     Returns:
     List[Tuple[int, int]]: List of (player_id, total_value) sorted by total_value descending
     """
-    if partition_date is None:
-        partition_date = datetime.now()
-        
-    # Get all player IDs from the database
-    players = session.query(Player.player_id).all()
-    player_totals = []
-    
-    # Gather all player stats concurrently
-    async def get_player_total(player_id: int) -> Tuple[int, int]:
-        cache = PlayerStatsCache(player_id)
-        stats = await cache.get_player_stats(partition_date)
-        if stats and "total" in stats:
-            return (player_id, stats["total"]["total_value"])
-        return (player_id, 0)
-    
-    # Use asyncio.gather to fetch all player stats concurrently
-    tasks = [get_player_total(player[0]) for player in players]
-    player_totals = await asyncio.gather(*tasks)
-    
-    # Sort by total value descending
-    rankings = sorted(player_totals, key=lambda x: x[1], reverse=True)
-    return rankings
+    partition, _ = get_partition(partition_date)
+    return await leaderboards.get_top(partition)
 
 async def get_player_rank(player_id: int, partition_date: Optional[datetime] = None) -> Tuple[int, int, int]:
     """
-    Get a player's global rank based on their total loot value
+    Get a player's global rank based on their loot value in a month
     
     Args:
         player_id: The player's ID
@@ -382,14 +593,5 @@ async def get_player_rank(player_id: int, partition_date: Optional[datetime] = N
     Returns:
         Tuple[int, int, int]: (rank, total_value, total_players)
     """
-    rankings = await get_global_rankings(partition_date)
-    
-    # Find player's position in rankings
-    for rank, (ranked_id, value) in enumerate(rankings, 1):
-        if ranked_id == player_id:
-            return (rank, value, len(rankings))
-            
-    # Player not found
-    return (len(rankings), 0, len(rankings))
-
-
+    partition, _ = get_partition(partition_date)
+    return await leaderboards.get_rank(player_id, partition)
@@ -1,5 +1,43 @@
+import bisect
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
+
+
+class Histogram:
+    """Fixed-bucket histogram for in-process size/latency reporting"""
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is the overflow bucket
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+    
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile (0-100), capped at the largest value seen"""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+    
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max
+        }
 
 
 class StatsTracker:
@@ -33,6 +71,7 @@ class StatsTracker:
             "pbs": [],
             "denied": []
         }
+        self.histograms: Dict[str, Histogram] = {}
         
         self._initialized = True
     
@@ -58,6 +97,12 @@ class StatsTracker:
         cutoff = current_time - 86400
         self.timestamps[stat_type] = [ts for ts in self.timestamps[stat_type] if ts > cutoff]
     
+    def histogram(self, name: str, buckets: Optional[Sequence[float]] = None) -> Histogram:
+        """Get or create a named histogram"""
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(buckets or [1, 5, 10, 50, 100, 500, 1000])
+        return self.histograms[name]
+    
     def get_runtime(self) -> int:
         """Return runtime in seconds"""
         return int(time.time()) - self.start_time
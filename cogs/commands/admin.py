@@ -7,7 +7,10 @@ from utils.message_builder import create_log_embed
 from utils.num import format_number
 
 from models import Webhook, Log
-from models.base import session
+from sqlalchemy import select
+from models.base import unit_of_work
+from cache.npc_registry import NpcRegistry
+from cache.item_catalogue import ItemCatalogue
 
 class AdminCommands(Extension):
     
@@ -34,8 +37,8 @@ class AdminCommands(Extension):
             webhook: interactions.Webhook = await new_channel.create_webhook(name=f"DropTracker Webhooks ({num})", avatar=avatar)
             webhook_url = webhook.url
             db_webhook = Webhook(webhook_url=str(webhook_url))
-            session.add(db_webhook)
-            session.commit()
+            async with unit_of_work() as db:
+                db.add(db_webhook)
             await ctx.send(f"A new webhook has been generated in <#{new_channel.id}> ({server}) with ID `{webhook.id}` (`{db_webhook.webhook_id}`)",ephemeral=True)
         except Exception as e:
             await ctx.send(f"Couldn't create a new webhook:{e}",ephemeral=True)
@@ -58,12 +61,49 @@ class AdminCommands(Extension):
                    ],
                    default_member_permissions=Permissions.ADMINISTRATOR)
     async def log_filter(self, ctx: SlashContext, source: str = None, level: str = None):
-        query = session.query(Log)
+        query = select(Log)
         if source:
-            query = query.filter(Log.source == source)
+            query = query.where(Log.source == source)
         if level:
-            query = query.filter(Log.level == level)
-        logs = query.all()
+            query = query.where(Log.level == level)
+        async with unit_of_work(read_only=True) as db:
+            logs = (await db.execute(query)).scalars().all()
         embeds = await create_log_embed(logs, source, level)
         return await ctx.send(embeds=embeds)
 
+    @slash_command(name="reload-npcs", description="Reload the in-memory NPC registry from the database",
+                   default_member_permissions=Permissions.ADMINISTRATOR)
+    async def reload_npcs(self, ctx: SlashContext):
+        npc_registry = NpcRegistry()
+        misses = npc_registry.get_misses(10)
+        try:
+            npc_count = await asyncio.to_thread(npc_registry.load)
+        except Exception as e:
+            return await ctx.send(f"Couldn't reload the NPC registry: {e}", ephemeral=True)
+        message = f"Reloaded `{npc_count}` NPCs."
+        if misses:
+            unknown = "\n".join(f"`{name}` ({count}x)" for name, count in misses)
+            message += f"\nUnknown sources seen before the reload:\n{unknown}"
+        return await ctx.send(message, ephemeral=True)
+
+    @slash_command(name="reload-items", description="Load newly added items into the in-memory item catalogue",
+                   options=[
+                       SlashCommandOption(
+                           name="full",
+                           description="Reload every item, picking up renames and lower IDs, not only higher IDs",
+                           type=OptionType.BOOLEAN,
+                           required=False
+                       )
+                   ],
+                   default_member_permissions=Permissions.ADMINISTRATOR)
+    async def reload_items(self, ctx: SlashContext, full: bool = False):
+        item_catalogue = ItemCatalogue()
+        try:
+            loaded = await asyncio.to_thread(item_catalogue.load if full else item_catalogue.refresh)
+        except Exception as e:
+            return await ctx.send(f"Couldn't reload the item catalogue: {e}", ephemeral=True)
+        return await ctx.send(
+            f"Loaded `{loaded}` items; the catalogue now holds `{len(item_catalogue)}` items "
+            f"using `{item_catalogue.memory_usage() / 1024 / 1024:.1f}MB`.",
+            ephemeral=True
+        )
@@ -2,7 +2,8 @@ from typing import List
 import interactions
 from interactions import Extension, SlashContext, slash_command, check
 from models import Player, Group, User
-from models.base import session
+from sqlalchemy import select
+from models.base import unit_of_work
 from utils.message_builder import build_default
 from utils.misc import get_command_id
 from cache import redis_client
@@ -11,13 +12,14 @@ def is_authed():
     # TODO: Check if the user is authed for the group they're attempting to 'edit'
     return True
 
-def is_registered(ctx: SlashContext):
+async def is_registered(ctx: SlashContext):
     try:
         user: interactions.Member = ctx.author
     except:
         print("Context author is null")
         return False
-    user = session.query(User).filter(User.user_id == user.id).first()
+    async with unit_of_work() as db:
+        user = (await db.execute(select(User).where(User.user_id == user.id))).scalars().first()
     if not user:
         return False
     return True
@@ -29,12 +31,11 @@ class UserCommands(Extension):
 
     @slash_command(name="register", description="Register your account in the DropTracker database")
     async def register(self, ctx: SlashContext) -> None:
-        if is_registered(ctx):
+        if await is_registered(ctx):
             embed = build_default(":warning: Error :warning:", f"Your account is already registered in the DropTracker database.")
             return await ctx.send(embed=embed)
-        user = User(user_id=ctx.author.id)
-        session.add(user)
-        session.commit()
+        async with unit_of_work() as db:
+            db.add(User(user_id=ctx.author.id))
         embed = build_default(":tada: Account Registered :tada:", f"Your account has been registered successfully!")
         return await ctx.send(embed=embed)
 
@@ -43,19 +44,22 @@ class GroupCommands(Extension):
     @slash_command(name="create-group", description="Register your group in the DropTracker database (requires a WOM ID)",
                    default_member_permissions=interactions.Permissions.ADMINISTRATOR)
     async def create_group(self, ctx: SlashContext, group_name: str, wom_id: int):
-        if not is_registered(ctx):
+        if not await is_registered(ctx):
             embed = build_default(":warning: Error :warning:", f"You must first be <{get_command_id(ctx.bot, 'register')}>ed in order to create a group.")
             embed.add_field(name="",value=f"If you believe this is a mistake, please [reach out in our Discord](https://droptracker.io/).",inline=False)
             return await ctx.send(embed=embed)
-        group = session.query(Group).filter(Group.guild_id == ctx.guild_id, Group.wom_id == wom_id).first()
+        async with unit_of_work() as db:
+            group = (await db.execute(
+                select(Group).where(Group.guild_id == ctx.guild_id, Group.wom_id == wom_id)
+            )).scalars().first()
         if group:
             embed = build_default(":warning: Error :warning:", f"A group associated to this discord server ({ctx.guild_id}) or Wise Old Man ID ({wom_id}) already exists, named `{group.group_name}`.")
             return await ctx.send(embed=embed)
         try:
             guild_id = str(ctx.guild_id)
             group = Group(group_name=group_name, wom_id=wom_id, guild_id=guild_id)
-            session.add(group)
-            session.commit()
+            async with unit_of_work() as db:
+                db.add(group)
         except Exception as e:
             print(f"Error creating group: {e}")
             embed = build_default(":warning: Error :warning:", f"An error occurred while creating your group. Please try again later.")
@@ -10,12 +10,13 @@ import aiohttp
 from PIL import Image, ImageFont, ImageDraw
 from interactions import Embed
 from utils.message_builder import generate_lootboard_embed
-from utils.misc import get_group_player_ids, get_partition, get_player_cache
-from cache import redis_client
+from utils.misc import get_group_player_ids, get_partition
+from cache.player_stats import GroupStatsCache, get_many_player_stats, leaderboards
 from utils import logger, wiseoldman
 from utils.num import format_number
 from models import Player, Group, GroupConfiguration
-from models.base import session
+from sqlalchemy import select
+from models.base import unit_of_work
 
 logger = logger.Logger()
 class LootboardGenerator:
@@ -32,20 +33,21 @@ class LootboardGenerator:
         """Generate a lootboard for a group"""
         # Get group data
         group = None
-        if group_id:
-            group = session.query(Group).filter(Group.group_id == group_id).first()
-        elif wom_group_id:
-            group = session.query(Group).filter(Group.wom_id == wom_group_id).first()
-            
-        # Get player IDs
+        async with unit_of_work(read_only=True) as db:
+            if group_id:
+                group = (await db.execute(select(Group).where(Group.group_id == group_id))).scalars().first()
+            elif wom_group_id:
+                group = (await db.execute(select(Group).where(Group.wom_id == wom_group_id))).scalars().first()
+
+            if not group:
+                # Get all players if no group specified
+                player_ids = list((await db.execute(select(Player.player_id))).scalars())
+
+        # Get lootboard data; a group's comes straight from its maintained aggregates
         if group:
-            player_ids = await get_group_player_ids(group.wom_id)
+            data = await get_group_lootboard_data(group.group_id)
         else:
-            # Get all players if no group specified
-            player_ids = [p.player_id for p in session.query(Player.player_id).all()]
-            
-        # Get lootboard data
-        data = await get_lootboard_data(player_ids)
+            data = await get_lootboard_data(player_ids)
         
         # Generate and save board
         return await self._generate_board_image(data, group)
@@ -54,8 +56,7 @@ class LootboardGenerator:
         """Generate the actual board image"""
         bg_img, draw = self._load_background_image("assets/img/lootboards/dark.png")
         
-        # Calculate total loot
-        total_loot = sum(data['player_totals'].values())
+        total_loot = data['total_loot']
         
         # Draw all sections
         bg_img = await self._draw_headers(bg_img, draw, group, total_loot)
@@ -160,16 +161,8 @@ class LootboardGenerator:
             for i, row in enumerate(reader):
                 locations[i] = row
         
-        # Combine all items from all players
-        all_items = defaultdict(lambda: {'quantity': 0, 'value': 0})
-        for player_items in data['player_items'].values():
-            for item in player_items:
-                item_id = item['item_id']
-                all_items[item_id]['quantity'] += item['quantity']
-                all_items[item_id]['value'] += item['value']
-        
         # Sort items by total value and take top 32
-        sorted_items = sorted(all_items.items(), 
+        sorted_items = sorted(data['items'].items(), 
                              key=lambda x: x[1]['value'], 
                              reverse=True)[:32]
         
@@ -215,12 +208,16 @@ class LootboardGenerator:
         
         name_x, name_y = 141, 228
         first_name = True
+
+        # Get all of the player names from the database at once
+        async with unit_of_work(read_only=True) as db:
+            player_names = dict((await db.execute(
+                select(Player.player_id, Player.player_name).where(
+                    Player.player_id.in_([player_id for player_id, _ in top_players]))
+            )).all())
         
         for i, (player_id, total) in enumerate(top_players):
-            # Get player name from database
-            player_obj = session.query(Player.player_name).filter(
-                Player.player_id == player_id).first()
-            player_name = player_obj.player_name if player_obj else "Unknown"
+            player_name = player_names.get(player_id, "Unknown")
             
             # Format texts
             rank_text = f'{i + 1}'
@@ -271,43 +268,35 @@ async def get_lootboard_data(player_ids: List[int], partition: int = None) -> Di
         'top_players': [
             (player_id, total_value),
             ...
-        ]
+        ],
+        'items': {
+            item_id: {'quantity': total_qty, 'value': total_stack_value}
+        },
+        'total_loot': total_value
     }
     """
-    partition, _ = get_partition(datetime.now())
-        
-    # Convert partition to datetime object
-    year = partition // 100
-    month = partition % 100
-    partition_date = datetime(year, month, 1)
+    if partition is None:
+        partition, _ = get_partition(datetime.now())
         
     player_items = defaultdict(list)
     player_totals = defaultdict(int)
     
-    # Fetch data for each player
+    # Fetch every player's stats for the month in pipelined chunks
+    player_stats = await get_many_player_stats(player_ids, partition)
+    
     for player_id in player_ids:
-        cache = get_player_cache(player_id)
-        if not cache:
+        stats = player_stats.get(player_id)
+        if not stats:
             continue
-            
-        # Pass datetime object instead of partition number
-        partition_keys = cache._get_cache_keys(partition_date)
-        
-        # Get all items for this player in this partition
-        items_data = redis_client.hgetall(partition_keys['items'])
         
         # Temporary storage for item data before sorting
         temp_items = defaultdict(lambda: {'quantity': 0, 'value': 0})
         
         # Process each item
-        for key, value in items_data.items():
-            item_id, stat_type = key.split(':')
-            
-            if stat_type == 'quantity':
-                temp_items[item_id]['quantity'] = int(value)
-            elif stat_type == 'value':
-                temp_items[item_id]['value'] = int(value)
-                player_totals[player_id] += int(value)
+        for item_id, data in stats['partition']['items'].items():
+            temp_items[item_id]['quantity'] = data.get('quantity', 0)
+            temp_items[item_id]['value'] = data.get('value', 0)
+            player_totals[player_id] += data.get('value', 0)
         
         # Convert to sorted list
         items_list = []
@@ -331,10 +320,44 @@ async def get_lootboard_data(player_ids: List[int], partition: int = None) -> Di
         reverse=True
     )
     
+    # Combine all items from all players
+    all_items = defaultdict(lambda: {'quantity': 0, 'value': 0})
+    for items_list in player_items.values():
+        for item in items_list:
+            all_items[item['item_id']]['quantity'] += item['quantity']
+            all_items[item['item_id']]['value'] += item['value']
+    
     return {
         'player_items': dict(player_items),
         'player_totals': dict(player_totals),
-        'top_players': top_players
+        'top_players': top_players,
+        'items': dict(all_items),
+        'total_loot': sum(player_totals.values())
+    }
+
+async def get_group_lootboard_data(group_id: int, partition: int = None, top_count: int = 12) -> Dict:
+    """
+    Generate leaderboard data for a group for a specific month from the group's
+    aggregates and leaderboard, without reading any member's stats
+    
+    Returns the `items`, `total_loot`, `top_players` and `player_totals` (of the
+    top players only) of `get_lootboard_data`.
+    """
+    if partition is None:
+        partition, _ = get_partition(datetime.now())
+    
+    group_stats = await GroupStatsCache.get_group_stats(group_id, partition)
+    top_players = await leaderboards.get_top(partition, top_count, group_id=group_id)
+    items = {
+        int(item_id): {'quantity': data.get('quantity', 0), 'value': data.get('value', 0)}
+        for item_id, data in group_stats['items'].items()
+        if data.get('quantity', 0) > 0
+    }
+    return {
+        'player_totals': dict(top_players),
+        'top_players': top_players,
+        'items': items,
+        'total_loot': group_stats['general']['total_value']
     }
 
 
@@ -351,7 +374,8 @@ async def board_generator(group_wom_id, partition: int = None) -> str:
     str: The filepath to the generated lootboard image
     """
     if group_wom_id == 1:
-        group_members = [player.wom_id for player in session.query(Player.wom_id).all()]
+        async with unit_of_work(read_only=True) as db:
+            group_members = list((await db.execute(select(Player.wom_id))).scalars())
     else:   
         group_members = await get_group_player_ids(group_wom_id)
     total_players = len(group_members)
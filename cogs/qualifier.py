@@ -1,72 +1,112 @@
 import asyncio
-from models.base import session
-from typing import TYPE_CHECKING
+from collections import defaultdict
+from models import Player, Group, GroupConfiguration
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from models.base import unit_of_work
+from typing import TYPE_CHECKING, Dict, Iterable, List
 from utils import wiseoldman
 from utils.bot_instance import bot_manager
+from utils.logger import Logger
 from utils.message_builder import generate_drop_embed
 
 if TYPE_CHECKING:
-    from models import Drop, Player, CollectionLogEntry, Group, GroupConfiguration, PersonalBestEntry, CombatAchievementEntry, NotifiedSubmission
+    from models import Drop, CollectionLogEntry, PersonalBestEntry, CombatAchievementEntry, NotifiedSubmission
 
+logger = Logger()
 
+global_notify_value = 1000
+global_channel_id = 1217463930805293139
 
-def check_drop(drop: Drop):
 
-    async def check_drop_async(drop: Drop):
-        bot = bot_manager.get_bot()
-        if not bot:
+async def check_drops(drops: Iterable['Drop']):
+    """
+        Check a committed batch of drops against every group's notification threshold.
+        Group settings and player records are loaded once for the whole batch, and
+        drops below the lowest threshold in use are skipped without any further work.
+    """
+    bot = bot_manager.get_bot()
+    if not bot:
+        return
+    try:
+        async with unit_of_work() as db:
+            settings = (await db.execute(select(GroupConfiguration).where(
+                GroupConfiguration.config_key.in_(['minimum_value_to_notify', 'channel_id_to_send_drops'])
+            ))).scalars().all()
+        group_settings: Dict[int, Dict[str, str]] = defaultdict(dict)
+        for setting in settings:
+            group_settings[setting.group_id][setting.config_key] = setting.config_value
+
+        thresholds = [int(config['minimum_value_to_notify']) for config in group_settings.values()
+                      if 'minimum_value_to_notify' in config]
+        lowest_threshold = min(thresholds + [global_notify_value])
+
+        player_drops = defaultdict(list)
+        for drop in drops:
+            if drop.value >= lowest_threshold:
+                player_drops[drop.player_id].append(drop)
+        if not player_drops:
             return
-            
-        player: Player = drop.player
-        player_wom_id = player.wom_id
-        groups = await wiseoldman.fetch_player_groups(player_wom_id)
-        for group_id in groups:
-            group = session.query(Group).filter(Group.group_id == group_id).first()
-            if group:
-                group_settings = session.query(GroupConfiguration).filter(GroupConfiguration.group_id == group_id).all()
-                min_value_raw = [setting for setting in group_settings if setting.config_key == 'minimum_value_to_notify']
-                min_value_raw = min_value_raw[0]
-                min_value = min_value_raw.config_value
-                if drop.value >= min_value:
-                    """
-                        Send a notification to the group Discord channel
-                    """
-                    channel_id_raw = [setting for setting in group_settings if setting.config_key == 'channel_id_to_send_drops']
-                    channel_id_raw = channel_id_raw[0]
-                    channel_id = channel_id_raw.config_value
-                    
-                    channel = await bot.fetch_channel(channel_id)
-                    embed = generate_drop_embed(group_id, drop)
-                    if channel:
-                        await channel.send(embed=embed)
-        if drop.value >= 1000:
+
+        for player in await load_players(player_drops.keys()):
+            await check_player_drops(bot, player, player_drops[player.player_id], group_settings)
+    except Exception as e:
+        logger.error("check_drops", f"Error checking drop notifications: {e}", e)
+
+
+async def load_players(player_ids: Iterable[int]) -> List[Player]:
+    """Load the players to notify for, with everything their drop embeds read after the session closes"""
+    async with unit_of_work() as db:
+        return list((await db.execute(
+            select(Player).options(selectinload(Player.user)).where(Player.player_id.in_(list(player_ids)))
+        )).scalars().all())
+
+
+async def check_player_drops(bot, player: Player, drops: List['Drop'], group_settings: Dict[int, Dict[str, str]]):
+    """Send group and global notifications for a single player's qualifying drops"""
+    wom_group_ids = await wiseoldman.fetch_player_groups(player.player_name)
+    groups = []
+    if wom_group_ids:
+        async with unit_of_work() as db:
+            groups = (await db.execute(select(Group).where(Group.wom_id.in_(wom_group_ids)))).scalars().all()
+    for drop in drops:
+        for group in groups:
+            config = group_settings.get(group.group_id, {})
+            if 'minimum_value_to_notify' not in config or 'channel_id_to_send_drops' not in config:
+                continue
+            if drop.value >= int(config['minimum_value_to_notify']):
+                """
+                    Send a notification to the group Discord channel
+                """
+                channel = await bot.fetch_channel(config['channel_id_to_send_drops'])
+                if channel:
+                    embed = await generate_drop_embed(group.wom_id, drop, player, group.group_id)
+                    await channel.send(embed=embed)
+        if drop.value >= global_notify_value:
             """
                 Send a global notification to the Discord server
             """
-            channel = await bot.fetch_channel(1217463930805293139)
-            embed = generate_drop_embed(group_id, drop)
+            channel = await bot.fetch_channel(global_channel_id)
             if channel:
-                await channel.send(embed=embed) 
-        pass
-
-    asyncio.run(check_drop_async(drop))
+                embed = await generate_drop_embed(1, drop, player)
+                await channel.send(embed=embed)
 
-def check_collection(clog: CollectionLogEntry):
-    async def check_clog_async(clog: CollectionLogEntry):
+def check_collection(clog: 'CollectionLogEntry'):
+    async def check_clog_async(clog: 'CollectionLogEntry'):
         # Your async code here
         pass
 
     asyncio.run(check_clog_async(clog))
 
-def check_personal_best(pb: PersonalBestEntry):
-    async def check_pb_async(pb: PersonalBestEntry):
+def check_personal_best(pb: 'PersonalBestEntry'):
+    async def check_pb_async(pb: 'PersonalBestEntry'):
         # Your async code here
         pass
 
     asyncio.run(check_pb_async(pb))
 
-def check_combat_achievement(ca: CombatAchievementEntry):
-    async def check_ca_async(ca: CombatAchievementEntry):
+def check_combat_achievement(ca: 'CombatAchievementEntry'):
+    async def check_ca_async(ca: 'CombatAchievementEntry'):
         # Your async code here
         pass
 
@@ -6,25 +6,43 @@ from interactions.api.events import MessageCreate, InteractionCreate, Ready, Sta
 from interactions import ChannelType
 from cache.metrics import MetricsTracker
 from cache.stats import StatsTracker
+from cache.npc_registry import NpcRegistry
+from cache.item_catalogue import ItemCatalogue
+from cache.player_identity import PlayerIdentity, PlayerIdentityCache
+from cache.dedup import SubmissionDeduplicator
 from cogs.commands.general import UserCommands, GroupCommands
 from cogs.commands.admin import AdminCommands
 import asyncio
 from datetime import datetime, timedelta
 import time
-from models.base import Session, session
+from typing import Optional
+from models.base import unit_of_work
 from models import Player, Log
-from submissions.processor import DropProcessor
+from submissions.parser import Submission, parse_embed
+from submissions.processor import DropProcessor, CollectionLogProcessor, CombatAchievementProcessor, PersonalBestProcessor
+from submissions.queue import OVERFLOWED, SubmissionQueue
+from submissions.stream import StreamPublisher, NotificationRelay, ingest_mode
 from utils.logger import Logger
+from utils.singleflight import SingleFlight
 
 from utils.ip_update import CloudflareIPUpdater
 from utils.misc import get_player_cache, normalize_username
 from utils.wiseoldman import check_user_by_username
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
 
 # Create global stats tracker
 stats = StatsTracker()
 logger = Logger()
 drop_processor = DropProcessor()
+clog_processor = CollectionLogProcessor()
+ca_processor = CombatAchievementProcessor()
+pb_processor = PersonalBestProcessor()
+batch_processors = [drop_processor, clog_processor, ca_processor, pb_processor]
+player_identities = PlayerIdentityCache()
+player_verifications = SingleFlight()
+wom_lookups = SingleFlight()
+deduplicator = SubmissionDeduplicator()
 
 async def on_interaction_event(event: InteractionCreate):
     bot: interactions.Client = event.bot
@@ -43,9 +61,6 @@ async def on_message_event(event: MessageCreate):
         All incoming submissions are received through messages in Discord, using webhooks.
     """
     message = event.message
-    submitted_rsn = None
-    submitted_acc_hash = None
-    submitted_plugin_version = None
     if not message.webhook_id:
         ## We only need to look for messages with attached webhook ids.
         return
@@ -53,52 +68,69 @@ async def on_message_event(event: MessageCreate):
     if message.channel.parent_id and is_valid(int(message.channel.parent_id)):
         if hasattr(message, 'embeds'):
             embeds = message.embeds
-            for embed in embeds:
+            for embed_index, embed in enumerate(embeds):
                 if embed.author and embed.author.name == "DropTracker":
-                    # Check each field in the embed
-                    for field in embed.fields:
-                        if field.name == "player":
-                            submitted_rsn = field.value
-                        if field.name == "acc_hash":
-                            submitted_acc_hash = field.value
-                        if field.name == "player_name" and not submitted_rsn:
-                            submitted_rsn = field.value
-                        if field.name == "p_v_hash":
-                            submitted_plugin_version = field.value
-                    if not submitted_plugin_version:
+                    # Walk the embed's fields once; every later stage works from the parsed submission
+                    submission = parse_embed(embed)
+                    if not submission:
+                        async with unit_of_work() as db:
+                            db.add(Log(
+                                level="ERROR",
+                                source="on_message_event",
+                                message="Invalid submission embed (missing type, player or acc_hash, or a malformed field)",
+                                details=f"jump_url: {message.jump_url}"
+                            ))
+                        return
+                    if not submission.plugin_version:
                         ## TODO: Once the plugin updates are approved,
                         ## we can log submissions lacking a version and ignore them.
                         pass
-                    if not submitted_rsn or not submitted_acc_hash:
-                        new_log = Log(
-                            level="ERROR",
-                            source="on_message_event",
-                            message="No player or acc_hash found in embed",
-                            details=f"jump_url: {message.jump_url}"
-                        )
-                        session.add(new_log)
-                        session.commit()
-                        return
-                    if submitted_rsn.lower() == "maybe l die":
+                    if submission.player.lower() == "maybe l die":
                         print("Message url:", message.jump_url)
-                    player_updated = await check_player(submitted_rsn, submitted_acc_hash)
-                    if not player_updated:
-                        ## If the player update fails, ignore the entire submission.
-                        return
-                    for field in embed.fields:
-                        if field.name == "type":  # Look for a field named "type"
-                            match field.value:
-                                case "drop":
-                                    stats.increment("drops")
-                                    await drop_processor.process_drop(embed, player_updated)
-                                case "collection_log":
-                                    stats.increment("logs")
-                                case "combat_achievement":
-                                    stats.increment("achievements")
-                                case "npc_kill":
-                                    stats.increment("pbs")
-                                case _:
-                                    continue
+                    ## Hand the submission off to the ingestion queue; player verification
+                    ## and processing happen on the worker pool, off the gateway callback.
+                    ## Webhook retries and gateway replays deliver the same message again;
+                    ## the queue spools it, then drops it as a duplicate before any database or WOM work
+                    result = await submission_queue.submit(submission.acc_hash, submission,
+                                                           deduplicator.make_key(message.id, embed_index))
+                    if result == OVERFLOWED:
+                        # The queue released the dedup key, so a replay of this message is still accepted
+                        logger.warning("on_message_event", f"Ingestion queue full; dropped {submission.type} "
+                                                           f"from {submission.player} ({message.jump_url})")
+
+async def process_submission(submission: Submission):
+    """
+        Handles a single queued submission on an ingestion worker.
+        Submissions from the same account hash are always handled by the same worker, in order.
+    """
+    player_updated = await check_player(submission.player, submission.acc_hash)
+    if not player_updated:
+        ## If the player update fails, ignore the entire submission.
+        return
+    match submission.type:
+        case "drop":
+            stats.increment("drops")
+            await drop_processor.process(submission, player_updated)
+        case "collection_log":
+            stats.increment("logs")
+            await clog_processor.process(submission, player_updated)
+        case "combat_achievement":
+            stats.increment("achievements")
+            await ca_processor.process(submission, player_updated)
+        case "npc_kill":
+            stats.increment("pbs")
+            await pb_processor.process(submission, player_updated)
+
+def sync_processor_spools():
+    """Make the rows handed to the processors durable before their submissions leave the intake spool"""
+    for processor in batch_processors:
+        processor.spool.sync()
+
+if ingest_mode == "stream":
+    ## Publish to the Redis Streams bus; `python -m submissions.stream` workers do the processing
+    submission_queue = StreamPublisher()
+else:
+    submission_queue = SubmissionQueue(process_submission, sync_handled=sync_processor_spools)
 
 async def on_bot_ready(event: Startup):
     bot: interactions.Client = event.bot
@@ -107,6 +139,21 @@ async def on_bot_ready(event: Startup):
     logger.info("on_bot_ready", f"{bot.user.username} is ready with ID {bot.user.id}")
     metrics = MetricsTracker()
     await metrics.initialize()
+    npc_count = await asyncio.to_thread(NpcRegistry().load)
+    logger.info("on_bot_ready", f"Loaded {npc_count} NPCs into the registry")
+    item_catalogue = ItemCatalogue()
+    item_count = await asyncio.to_thread(item_catalogue.load)
+    logger.info("on_bot_ready",
+        f"Loaded {item_count} items into the catalogue ({item_catalogue.memory_usage() / 1024 / 1024:.1f}MB)")
+    for processor in batch_processors:
+        replayed = await processor.replay_spool()
+        if replayed:
+            logger.info("on_bot_ready", f"Replayed {replayed} spooled {processor.name} from the last run")
+    # Submissions received until now were spooled and held; they're queued behind the replay
+    await submission_queue.start()
+    if ingest_mode == "stream":
+        from cogs.qualifier import check_drops
+        asyncio.create_task(NotificationRelay().consume(check_drops))
     # Start the stats printing task
     asyncio.create_task(print_stats())
     if is_prod(): 
@@ -124,59 +171,101 @@ def is_prod():
 
 
 
-async def check_player(rsn: str, acc_hash: str) -> bool:
+async def check_player(rsn: str, acc_hash: str) -> Optional[PlayerIdentity]:
     """
     Check if a player exists and verify their account hash.
     If they don't exist, create them. If they do exist, verify hash.
+    Known players are verified from the identity cache without touching the database.
     """
-    local_session = Session()
+    normalized_rsn = normalize_username(rsn)
+    cached = player_identities.get(acc_hash)
+    if cached:
+        if cached.normalized_name == normalized_rsn and cached.player_name == rsn:
+            return cached
+        # Name or formatting differs from what we last saw; let the database decide
+        player_identities.invalidate(account_hash=acc_hash)
+    elif player_identities.is_negative(acc_hash):
+        return None
+
+    # Concurrent submissions for the same unverified player share one lookup, WOM call and insert
+    return await player_verifications.do(
+        (acc_hash, normalized_rsn),
+        lambda: _verify_player(rsn, normalized_rsn, acc_hash)
+    )
+
+async def _verify_player(rsn: str, normalized_rsn: str, acc_hash: str) -> Optional[PlayerIdentity]:
+    """Verify a player against the database, creating them from WOM data if they're new"""
     try:
-        normalized_rsn = normalize_username(rsn)
-        # First check if player exists by account hash
-        existing_player = local_session.query(Player).filter(
-            Player.account_hash == acc_hash
-        ).first()
-        
-        if existing_player:
-            stored_name = normalize_username(existing_player.player_name)
-            if stored_name != normalized_rsn:
-                logger.error(
-                    "check_player",
-                    f"Authentication failed: Hash {acc_hash} belongs to different player. "
-                    f"Expected player: {existing_player.player_name}, Got: {rsn}"
-                )
-                return None
-            
-            # Update player name if case/format changed
-            if existing_player.player_name != rsn:
-                logger.info("check_player", 
-                    f"Updating player name format from {existing_player.player_name} to {rsn}")
-                existing_player.player_name = rsn
-                existing_player.date_updated = datetime.now()
-                local_session.commit()
-            return existing_player
-            
-        # Check WOM for player data
-        wom_player, wom_name, wom_id = await check_user_by_username(normalized_rsn)
+        async with unit_of_work() as db:
+            # First check if player exists by account hash
+            existing_player = (await db.execute(
+                select(Player).where(Player.account_hash == acc_hash)
+            )).scalars().first()
+
+            if existing_player:
+                stored_name = normalize_username(existing_player.player_name)
+                if stored_name != normalized_rsn:
+                    logger.error(
+                        "check_player",
+                        f"Authentication failed: Hash {acc_hash} belongs to different player. "
+                        f"Expected player: {existing_player.player_name}, Got: {rsn}"
+                    )
+                    return None
+
+                # Update player name if case/format changed
+                if existing_player.player_name != rsn:
+                    logger.info("check_player", 
+                        f"Updating player name format from {existing_player.player_name} to {rsn}")
+                    existing_player.player_name = rsn
+                    existing_player.date_updated = datetime.now()
+                    await db.commit()
+                return _remember_player(existing_player)
+
+        # Check WOM for player data, outside the unit of work so its rate limiter and the
+        # HTTP request don't hold a pooled connection
+        wom_player, wom_name, wom_id = await wom_lookups.do(
+            normalized_rsn, lambda: check_user_by_username(normalized_rsn)
+        )
         if not wom_player or not wom_id:
             logger.error("check_player", f"Could not find WOM data for {rsn}")
+            player_identities.put_negative(acc_hash)
             return None
-            
-        new_player = Player(
-            wom_id=wom_id,
-            player_name=rsn,  # Store original name
-            account_hash=acc_hash,
-            date_updated=datetime.now(),
-            date_added=datetime.now()
-        )
-        local_session.add(new_player)
-        local_session.commit()
-        logger.info("check_player", f"New player {rsn} added to database")
-        return new_player
-        
+
+        async with unit_of_work() as db:
+            new_player = Player(
+                wom_id=wom_id,
+                player_name=rsn,  # Store original name
+                account_hash=acc_hash,
+                date_updated=datetime.now(),
+                date_added=datetime.now()
+            )
+            db.add(new_player)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another process inserted this player first; use their row if it matches
+                await db.rollback()
+                existing_player = (await db.execute(
+                    select(Player).where(Player.account_hash == acc_hash)
+                )).scalars().first()
+                if existing_player and normalize_username(existing_player.player_name) == normalized_rsn:
+                    return _remember_player(existing_player)
+                raise
+            logger.info("check_player", f"New player {rsn} added to database")
+            return _remember_player(new_player)
+
     except Exception as e:
-        local_session.rollback()
         logger.error("check_player", f"Error processing player {rsn}", error=e)
         return None
-    finally:
-        local_session.close()
\ No newline at end of file
+
+def _remember_player(player: Player) -> PlayerIdentity:
+    """Build a detached identity for a verified player and add it to the identity cache"""
+    identity = PlayerIdentity(
+        player_id=player.player_id,
+        player_name=player.player_name,
+        normalized_name=normalize_username(player.player_name),
+        wom_id=int(player.wom_id) if player.wom_id else None,
+        account_hash=player.account_hash
+    )
+    player_identities.put(identity)
+    return identity
@@ -6,12 +6,15 @@ from interactions import IntervalTrigger, Task, listen
 from dotenv import load_dotenv
 import os
 from cache.metrics import MetricsTracker
-from events import on_message_event, on_interaction_event, on_bot_ready
+from events import on_message_event, on_interaction_event, on_bot_ready, submission_queue, drop_processor, clog_processor, ca_processor, pb_processor, deduplicator
 from utils.message_builder import create_metrics_embed, generate_lootboard_embed
 import multiprocessing
 from hypercorn.asyncio import serve
 from cogs.images import lootboard
 from utils.bot_instance import bot_manager
+from cache.npc_registry import NpcRegistry
+from cache.item_catalogue import ItemCatalogue
+from utils.partitions import maintain_partitions
 
 
 load_dotenv()
@@ -37,8 +40,14 @@ def run_discord_bot():
     @bot.listen(Startup)
     async def on_startup(e: Startup):
         update_metrics.start()
+        refresh_registries.start()
+        maintain_drop_partitions.start()
         await update_metrics()
+        await maintain_partitions()
         await on_bot_ready(e)
+        if os.getenv("INGEST_API_PORT"):
+            from api.ingest_app import app as ingest_app, config as ingest_config
+            asyncio.create_task(serve(ingest_app, ingest_config))
         await update_lootboard()
 
     @Task.create(IntervalTrigger(seconds=60))
@@ -50,6 +59,12 @@ def run_discord_bot():
             
             metrics = MetricsTracker()
             metrics_data = await metrics.get_all_metrics()
+            metrics_data["ingestion"] = submission_queue.get_stats()
+            metrics_data["ingestion"]["duplicates"] = deduplicator.suppressed
+            metrics_data["drop_writes"] = drop_processor.get_stats()
+            metrics_data["submission_writes"] = {
+                processor.name: processor.get_stats() for processor in (clog_processor, ca_processor, pb_processor)
+            }
             
             embed = create_metrics_embed(metrics_data)
             await message.edit(embed=embed)
@@ -57,6 +72,24 @@ def run_discord_bot():
         except Exception as e:
             print(f"Error updating metrics message: {e}")
 
+    @Task.create(IntervalTrigger(seconds=60))
+    async def refresh_registries():
+        try:
+            # Full reloads, so renamed items and items added below the highest ID are picked up
+            npc_registry = NpcRegistry()
+            if npc_registry.is_stale():
+                await asyncio.to_thread(npc_registry.load)
+            item_catalogue = ItemCatalogue()
+            if item_catalogue.is_stale():
+                await asyncio.to_thread(item_catalogue.load)
+        except Exception as e:
+            print(f"Error refreshing NPC/item registries: {e}")
+
+    @Task.create(IntervalTrigger(hours=24))
+    async def maintain_drop_partitions():
+        # Keeps next month's partition of `drops` ready ahead of time; a no-op unless on MySQL
+        await maintain_partitions()
+
     async def update_lootboard():
         image_path, total_players = await lootboard.board_generator(1)
         channel = await bot.fetch_channel(1210765311498788865)
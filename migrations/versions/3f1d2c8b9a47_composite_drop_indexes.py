@@ -0,0 +1,41 @@
+"""Composite covering indexes for drops
+
+Revision ID: 3f1d2c8b9a47
+Revises: 6beaaf6cff08
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1d2c8b9a47'
+down_revision: Union[str, None] = '6beaaf6cff08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Per-player rebuilds: WHERE player_id = ? [AND partition = ?], grouped by item/npc
+    op.create_index('ix_drops_player_partition', 'drops',
+                    ['player_id', 'partition', 'item_id', 'npc_id', 'value', 'quantity'], unique=False)
+    # Monthly lootboard items, boss totals and rankings: WHERE partition = ? GROUP BY item_id / npc_id / player_id
+    op.create_index('ix_drops_partition_item', 'drops', ['partition', 'item_id', 'quantity', 'value'], unique=False)
+    op.create_index('ix_drops_partition_npc', 'drops', ['partition', 'npc_id', 'value'], unique=False)
+    op.create_index('ix_drops_partition_player', 'drops', ['partition', 'player_id', 'value'], unique=False)
+    # Now prefixes of the composites above; dropping them saves a write per insert.
+    # (ix_drops_player_partition backs the player_id foreign key from here on.)
+    op.drop_index('ix_drops_player_id', table_name='drops')
+    op.drop_index('ix_drops_partition', table_name='drops')
+
+
+def downgrade() -> None:
+    op.create_index('ix_drops_partition', 'drops', ['partition'], unique=False)
+    op.create_index('ix_drops_player_id', 'drops', ['player_id'], unique=False)
+    op.drop_index('ix_drops_partition_player', table_name='drops')
+    op.drop_index('ix_drops_partition_npc', table_name='drops')
+    op.drop_index('ix_drops_partition_item', table_name='drops')
+    op.drop_index('ix_drops_player_partition', table_name='drops')
@@ -0,0 +1,74 @@
+"""RANGE-partition drops by month
+
+Revision ID: 8c4e1a7d2b90
+Revises: 3f1d2c8b9a47
+Create Date: 2026-10-18 11:02:17.554310
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e1a7d2b90'
+down_revision: Union[str, None] = '3f1d2c8b9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _next_month(partition: int) -> int:
+    year, month = divmod(partition, 100)
+    return (year + 1) * 100 + 1 if month == 12 else partition + 1
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'mysql':
+        # Native partitioning is MySQL-only; other backends keep the plain table
+        return
+    inspector = sa.inspect(bind)
+
+    # MySQL can't partition a table that has, or is referenced by, foreign keys
+    for fk in inspector.get_foreign_keys('notified'):
+        if fk['referred_table'] == 'drops':
+            op.drop_constraint(fk['name'], 'notified', type_='foreignkey')
+    for fk in inspector.get_foreign_keys('drops'):
+        op.drop_constraint(fk['name'], 'drops', type_='foreignkey')
+
+    # The partitioning column has to be part of every unique key, so it can't be NULL
+    op.execute("UPDATE drops SET `partition` = EXTRACT(YEAR_MONTH FROM COALESCE(date_added, NOW())) "
+               "WHERE `partition` IS NULL")
+    op.execute("ALTER TABLE drops MODIFY `partition` INT NOT NULL, "
+               "DROP PRIMARY KEY, ADD PRIMARY KEY (drop_id, `partition`)")
+
+    # One partition per month from the oldest drop through next month, then a catch-all
+    # that utils.partitions splits ahead of each new month
+    current = int(datetime.now().strftime('%Y%m'))
+    oldest = bind.execute(sa.text("SELECT MIN(`partition`) FROM drops")).scalar() or current
+    months = []
+    partition = min(oldest, current)
+    last = _next_month(current)
+    while partition <= last:
+        months.append(partition)
+        partition = _next_month(partition)
+    definitions = [f"PARTITION p{month} VALUES LESS THAN ({_next_month(month)})" for month in months]
+    definitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    op.execute(f"ALTER TABLE drops PARTITION BY RANGE (`partition`) ({', '.join(definitions)})")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'mysql':
+        return
+    op.execute("ALTER TABLE drops REMOVE PARTITIONING")
+    op.execute("ALTER TABLE drops DROP PRIMARY KEY, ADD PRIMARY KEY (drop_id), MODIFY `partition` INT NULL")
+    # Rows archived or dropped by utils.partitions leave dangling references behind
+    op.execute("UPDATE notified SET drop_id = NULL WHERE drop_id IS NOT NULL "
+               "AND drop_id NOT IN (SELECT drop_id FROM drops)")
+    op.create_foreign_key(None, 'drops', 'items', ['item_id'], ['item_id'])
+    op.create_foreign_key(None, 'drops', 'npc_list', ['npc_id'], ['npc_id'])
+    op.create_foreign_key(None, 'drops', 'players', ['player_id'], ['player_id'])
+    op.create_foreign_key(None, 'notified', 'drops', ['drop_id'], ['drop_id'])
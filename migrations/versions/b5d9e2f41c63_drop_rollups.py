@@ -0,0 +1,84 @@
+"""Monthly drop rollup tables
+
+Revision ID: b5d9e2f41c63
+Revises: 8c4e1a7d2b90
+Create Date: 2026-10-18 12:24:51.031877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d9e2f41c63'
+down_revision: Union[str, None] = '8c4e1a7d2b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    totals = op.create_table('player_month_totals',
+    sa.Column('player_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('partition', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('total_value', sa.BigInteger(), nullable=False),
+    sa.Column('total_drops', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('player_id', 'partition')
+    )
+    op.create_index('ix_player_month_totals_partition_value', 'player_month_totals',
+                    ['partition', 'total_value'], unique=False)
+    items = op.create_table('player_month_items',
+    sa.Column('player_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('partition', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('item_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('quantity', sa.BigInteger(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('player_id', 'partition', 'item_id')
+    )
+    op.create_index('ix_player_month_items_partition_item', 'player_month_items',
+                    ['partition', 'item_id'], unique=False)
+    npcs = op.create_table('player_month_npcs',
+    sa.Column('player_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('partition', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('npc_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('drops', sa.Integer(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('player_id', 'partition', 'npc_id')
+    )
+    op.create_index('ix_player_month_npcs_partition_npc', 'player_month_npcs',
+                    ['partition', 'npc_id'], unique=False)
+
+    # Backfill from the existing drops; from here on DropProcessor keeps them current
+    drops = sa.table('drops', sa.column('player_id'), sa.column('partition'), sa.column('item_id'),
+                     sa.column('npc_id'), sa.column('value'), sa.column('quantity'))
+    op.execute(totals.insert().from_select(
+        ['player_id', 'partition', 'total_value', 'total_drops'],
+        sa.select(drops.c.player_id, drops.c.partition,
+                  sa.func.coalesce(sa.func.sum(drops.c.value), 0), sa.func.count())
+        .group_by(drops.c.player_id, drops.c.partition)
+    ))
+    op.execute(items.insert().from_select(
+        ['player_id', 'partition', 'item_id', 'quantity', 'value'],
+        sa.select(drops.c.player_id, drops.c.partition, drops.c.item_id,
+                  sa.func.coalesce(sa.func.sum(drops.c.quantity), 0),
+                  sa.func.coalesce(sa.func.sum(drops.c.value), 0))
+        .where(drops.c.item_id.isnot(None))
+        .group_by(drops.c.player_id, drops.c.partition, drops.c.item_id)
+    ))
+    op.execute(npcs.insert().from_select(
+        ['player_id', 'partition', 'npc_id', 'drops', 'value'],
+        sa.select(drops.c.player_id, drops.c.partition, drops.c.npc_id,
+                  sa.func.count(), sa.func.coalesce(sa.func.sum(drops.c.value), 0))
+        .where(drops.c.npc_id.isnot(None))
+        .group_by(drops.c.player_id, drops.c.partition, drops.c.npc_id)
+    ))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_player_month_npcs_partition_npc', table_name='player_month_npcs')
+    op.drop_table('player_month_npcs')
+    op.drop_index('ix_player_month_items_partition_item', table_name='player_month_items')
+    op.drop_table('player_month_items')
+    op.drop_index('ix_player_month_totals_partition_value', table_name='player_month_totals')
+    op.drop_table('player_month_totals')
@@ -0,0 +1,30 @@
+"""Committed spool batch markers
+
+Revision ID: d2e8f6a13b57
+Revises: b5d9e2f41c63
+Create Date: 2026-10-18 18:02:37.412906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e8f6a13b57'
+down_revision: Union[str, None] = 'b5d9e2f41c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('spooled_batches',
+    sa.Column('batch_id', sa.String(length=64), nullable=False),
+    sa.Column('date_added', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('batch_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('spooled_batches')
@@ -0,0 +1,37 @@
+"""Drop the composite drops indexes no query uses
+
+Revision ID: e7a3c5d91f02
+Revises: d2e8f6a13b57
+Create Date: 2026-10-18 21:40:12.553018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c5d91f02'
+down_revision: Union[str, None] = 'd2e8f6a13b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every per-player and per-month aggregate is read from the rollups now, so the only
+    # query left on drops by anything but its key is the Player.drops lookup by player_id
+    op.create_index(op.f('ix_drops_player_id'), 'drops', ['player_id'], unique=False)
+    op.drop_index('ix_drops_partition_player', table_name='drops')
+    op.drop_index('ix_drops_partition_npc', table_name='drops')
+    op.drop_index('ix_drops_partition_item', table_name='drops')
+    op.drop_index('ix_drops_player_partition', table_name='drops')
+
+
+def downgrade() -> None:
+    op.create_index('ix_drops_player_partition', 'drops',
+                    ['player_id', 'partition', 'item_id', 'npc_id', 'value', 'quantity'], unique=False)
+    op.create_index('ix_drops_partition_item', 'drops', ['partition', 'item_id', 'quantity', 'value'], unique=False)
+    op.create_index('ix_drops_partition_npc', 'drops', ['partition', 'npc_id', 'value'], unique=False)
+    op.create_index('ix_drops_partition_player', 'drops', ['partition', 'player_id', 'value'], unique=False)
+    op.drop_index(op.f('ix_drops_player_id'), table_name='drops')
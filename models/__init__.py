@@ -2,7 +2,8 @@
 from .base import Base, Session, engine
 from .users import User, Player, UserConfiguration
 from .groups import Group, GroupConfiguration, GroupEmbed, Field, GroupPatreon, Guild
-from .submissions import Drop, CollectionLogEntry, PersonalBestEntry, CombatAchievementEntry, NotifiedSubmission
+from .submissions import Drop, CollectionLogEntry, PersonalBestEntry, CombatAchievementEntry, NotifiedSubmission, \
+    PlayerMonthTotal, PlayerMonthItem, PlayerMonthNpc, SpooledBatch
 from .utils import NpcList, ItemList, Webhook
 from .metrics import MetricSnapshot
 from .log import Log
@@ -13,5 +14,6 @@ __all__ = [
     'User', 'Player', 'UserConfiguration',
     'Group', 'GroupConfiguration', 'GroupEmbed', 'Field', 'GroupPatreon', 'Guild',
     'Drop', 'CollectionLogEntry', 'PersonalBestEntry', 'CombatAchievementEntry',
+    'PlayerMonthTotal', 'PlayerMonthItem', 'PlayerMonthNpc', 'SpooledBatch',
     'NpcList', 'ItemList', 'Webhook', 'MetricSnapshot', 'Log', 'get_current_partition'
 ]
\ No newline at end of file
@@ -1,8 +1,17 @@
 # models/base.py
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
 import pymysql
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session as OrmSession, scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
 import os
@@ -16,17 +25,183 @@ if os.getenv("mode") == "dev":
     DB_PASS = os.getenv("DEV_DB_PASSWORD")
     DB_HOST = os.getenv("DEV_DB_HOST")
     DB_PORT = os.getenv("DEV_DB_PORT")
+    DB_REPLICA_HOSTS = os.getenv("DEV_DB_REPLICA_HOSTS")
 else:
     DB_USER = os.getenv("DB_USER")
     DB_PASS = os.getenv("DB_PASSWORD")
     DB_HOST = os.getenv("DB_HOST")
     DB_PORT = os.getenv("DB_PORT")
+    DB_REPLICA_HOSTS = os.getenv("DB_REPLICA_HOSTS")
 
 
 
 # Setup database connection and create tables
-engine = create_engine(f'mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/data', 
-                      pool_size=20, max_overflow=10)
+## DATABASE_URL overrides the MySQL settings, e.g. with SQLite for the benchmark harness
+DATABASE_URL = os.getenv("DATABASE_URL")
+if DATABASE_URL and DATABASE_URL.startswith("sqlite"):
+    # One shared connection, so every session sees the same (possibly in-memory) database
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+else:
+    engine = create_engine(DATABASE_URL or f'mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/data', 
+                          pool_size=20, max_overflow=10)
 Base.metadata.create_all(engine)
 Session = scoped_session(sessionmaker(bind=engine))
-session = Session()
\ No newline at end of file
+session = Session()
+
+## Async engine for code running on the event loop, so a slow query doesn't block
+## the gateway heartbeat and every other handler. Created on first use, so scripts
+## that only need the sync session don't need the async driver.
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+_async_engine: Optional[AsyncEngine] = None
+_async_sessionmaker: Optional[async_sessionmaker] = None
+
+## Optional read replicas for heavy, explicitly read-only paths (lootboards, rankings,
+## /logs, cache rebuilds). DATABASE_REPLICA_URLS takes full URLs; DB_REPLICA_HOSTS takes
+## host[:port] pairs that share the primary's credentials. Without either, every
+## unit of work uses the primary as before.
+DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS")
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", 5))
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 10))
+## How long a lag check may take before that replica is skipped until the next one
+REPLICA_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_CHECK_TIMEOUT", 2))
+## A server reporting no replication status at all is unhealthy (e.g. replication was
+## reset and it has silently become a detached copy) unless this is set, e.g. for a
+## snapshot that is deliberately used as a read-only copy
+REPLICA_ALLOW_STANDALONE = os.getenv("DB_REPLICA_ALLOW_STANDALONE", "0") == "1"
+
+
+def _async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def _create_async_engine(url, pool_size: int = 20) -> AsyncEngine:
+    if url.get_backend_name() == "sqlite":
+        return create_async_engine(url, connect_args={"timeout": 30})
+    return create_async_engine(url, pool_size=pool_size, max_overflow=10, pool_recycle=3600)
+
+
+def _replica_urls() -> List[str]:
+    if DATABASE_REPLICA_URLS:
+        return [url.strip() for url in DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    urls = []
+    for host in (DB_REPLICA_HOSTS or "").split(","):
+        host = host.strip()
+        if host:
+            if ":" not in host:
+                host = f"{host}:{DB_PORT}"
+            urls.append(f"mysql+pymysql://{DB_USER}:{DB_PASS}@{host}/data")
+    return urls
+
+
+class ReplicaSet:
+    """
+    The configured replicas, with their last measured replication lag. Reads are
+    spread round-robin over the replicas within REPLICA_MAX_LAG of the primary;
+    a replica that is lagging, has stopped replicating or can't be reached is
+    skipped until a later check finds it healthy again.
+    """
+    def __init__(self, urls: List[str]):
+        self.engines: List[AsyncEngine] = [_create_async_engine(_async_url(url), pool_size=10) for url in urls]
+        self.lag: Dict[int, Optional[float]] = {index: None for index in range(len(self.engines))}
+        self._checked_at = 0.0
+        self._next = itertools.count()
+
+    async def _measure_lag(self, replica: AsyncEngine) -> Optional[float]:
+        if replica.dialect.name != "mysql":
+            return 0.0
+        async with replica.connect() as connection:
+            try:
+                row = (await connection.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+            except Exception:
+                # MySQL before 8.0.22 / MariaDB
+                row = (await connection.execute(text("SHOW SLAVE STATUS"))).mappings().first()
+        if row is None:
+            # Not replicating at all: a standalone copy never catches up
+            return 0.0 if REPLICA_ALLOW_STANDALONE else None
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return None if lag is None else float(lag)
+
+    async def refresh(self) -> None:
+        if time.monotonic() - self._checked_at < REPLICA_CHECK_INTERVAL:
+            return
+        self._checked_at = time.monotonic()
+        # Concurrently and with a timeout, so an unreachable replica can't stall the
+        # read that happened to trigger the check for a whole connect timeout
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._measure_lag(replica), REPLICA_CHECK_TIMEOUT) for replica in self.engines),
+            return_exceptions=True
+        )
+        for index, lag in enumerate(results):
+            self.lag[index] = None if isinstance(lag, BaseException) else lag
+
+    async def choose(self) -> Optional[AsyncEngine]:
+        """A replica that is currently within the lag tolerance, or None to use the primary"""
+        await self.refresh()
+        healthy = [self.engines[index] for index, lag in self.lag.items() if lag is not None and lag <= REPLICA_MAX_LAG]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+
+replicas: Optional[ReplicaSet] = None
+## When the current task (and any it spawned since) last committed a write, so its
+## own follow-up reads stay on the primary until replicas have caught up
+_last_write: ContextVar[float] = ContextVar("last_write", default=0.0)
+
+
+class RoutingSession(OrmSession):
+    """
+    Sends a read-only unit of work to the replica chosen for it, and everything
+    else (including any write issued within one) to the primary. Once a unit of
+    work has written, its later reads go to the primary too, since no replica
+    can see its uncommitted writes.
+    """
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+        elif self.info.get("replica") is not None and not self.info.get("wrote"):
+            return self.info["replica"]
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_sessionmaker, replicas
+    if _async_engine is None:
+        _async_engine = _create_async_engine(_async_url(os.getenv("ASYNC_DATABASE_URL") or engine.url))
+        _async_sessionmaker = async_sessionmaker(_async_engine, expire_on_commit=False,
+                                                 sync_session_class=RoutingSession)
+        urls = _replica_urls()
+        if urls:
+            replicas = ReplicaSet(urls)
+    return _async_engine
+
+
+@asynccontextmanager
+async def unit_of_work(read_only: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    An async session for a single unit of work. Commits when the block exits
+    cleanly, rolls back if it raises, and returns the connection to the pool.
+
+        async with unit_of_work() as db:
+            player = (await db.execute(select(Player).where(...))).scalars().first()
+
+    With `read_only=True` its reads may be served by a replica, up to
+    REPLICA_MAX_LAG seconds behind the primary; use it only where data that
+    slightly stale is acceptable. Read-only units of work issued shortly after
+    the same task committed a write still read from the primary.
+    """
+    get_async_engine()
+    async with _async_sessionmaker() as db:
+        if read_only and replicas and time.monotonic() - _last_write.get() > REPLICA_MAX_LAG:
+            replica = await replicas.choose()
+            if replica is not None:
+                db.sync_session.info["replica"] = replica.sync_engine
+        try:
+            yield db
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        if db.sync_session.info.get("wrote"):
+            _last_write.set(time.monotonic())
@@ -35,6 +35,8 @@ class Group(Base):
         if not existing_association:
             self.players.append(player)
             session.commit()
+            from cache.player_stats import GroupStatsCache
+            GroupStatsCache.schedule_membership(player.player_id, self.group_id)
 
 @event.listens_for(Group, 'after_insert')    
 def after_group_insert(mapper, connection, target: Group) -> None:
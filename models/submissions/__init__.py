@@ -4,11 +4,17 @@ from .collection_log import CollectionLogEntry
 from .personal_best import PersonalBestEntry
 from .combat_achievement import CombatAchievementEntry
 from .notified_submission import NotifiedSubmission
+from .drop_rollup import PlayerMonthTotal, PlayerMonthItem, PlayerMonthNpc
+from .spooled_batch import SpooledBatch
 
 __all__ = [
     'Drop',
     'CollectionLogEntry',
     'PersonalBestEntry',
     'CombatAchievementEntry',
-    'NotifiedSubmission'
+    'NotifiedSubmission',
+    'PlayerMonthTotal',
+    'PlayerMonthItem',
+    'PlayerMonthNpc',
+    'SpooledBatch'
 ]
\ No newline at end of file
@@ -1,9 +1,8 @@
 # models/submissions/drop.py
-import asyncio
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, String
+from sqlalchemy import Column, Integer, DateTime, Boolean, String
 from sqlalchemy.orm import relationship
-from sqlalchemy import func, event
-from utils.misc import get_current_partition, get_player_cache
+from sqlalchemy import func
+from utils.misc import get_current_partition
 from ..base import Base
 
 class Drop(Base):
@@ -16,23 +15,23 @@ class Drop(Base):
         :param: image_url (nullable)
     """
     __tablename__ = 'drops'
+    # On MySQL the table is RANGE-partitioned by `partition` (see utils.partitions), which
+    # means its primary key is (drop_id, partition) there and it can't take part in foreign
+    # keys; the references below are enforced by the application, not the database.
     drop_id = Column(Integer, primary_key=True, autoincrement=True)
-    item_id = Column(Integer, ForeignKey('items.item_id'), index=True)
-    player_id = Column(Integer, ForeignKey('players.player_id'), index=True, nullable=False)
+    item_id = Column(Integer, index=True)
+    player_id = Column(Integer, nullable=False, index=True)
     date_added = Column(DateTime, index=True, default=func.now())
-    npc_id = Column(Integer, ForeignKey('npc_list.npc_id'), index=True)
+    npc_id = Column(Integer, index=True)
     date_updated = Column(DateTime, onupdate=func.now(), default=func.now())
     value = Column(Integer)
     quantity = Column(Integer)
     image_url = Column(String(150), nullable=True)
     plugin_version = Column(String(10), nullable=True)
-    partition = Column(Integer, default=get_current_partition, index=True)
+    partition = Column(Integer, nullable=False, default=get_current_partition)
     
-    player = relationship("Player", back_populates="drops")
-    notified_drops = relationship("NotifiedSubmission", back_populates="drop")
+    player = relationship("Player", primaryjoin="foreign(Drop.player_id) == Player.player_id",
+                          back_populates="drops")
+    notified_drops = relationship("NotifiedSubmission", primaryjoin="Drop.drop_id == foreign(NotifiedSubmission.drop_id)",
+                                  back_populates="drop")
 
-
-@event.listens_for(Drop, 'after_insert')
-def after_drop_insert(mapper, connection, target):
-    from cogs.qualifier import check_drop
-    asyncio.create_task(check_drop(target))
\ No newline at end of file
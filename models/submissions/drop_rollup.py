@@ -0,0 +1,62 @@
+from sqlalchemy import BigInteger, Column, Index, Integer
+from ..base import Base
+
+
+class PlayerMonthTotal(Base):
+    """
+    A player's loot totals for one month (partition), maintained alongside every
+    batch of drops written by submissions.processor.DropProcessor.
+        :param: player_id
+        :param: partition (YYYYMM)
+        :param: total_value
+        :param: total_drops
+    """
+    __tablename__ = 'player_month_totals'
+    __table_args__ = (
+        # Monthly rankings: WHERE partition = ? ORDER BY total_value DESC
+        Index('ix_player_month_totals_partition_value', 'partition', 'total_value'),
+    )
+    player_id = Column(Integer, primary_key=True, autoincrement=False)
+    partition = Column(Integer, primary_key=True, autoincrement=False)
+    total_value = Column(BigInteger, nullable=False, default=0)
+    total_drops = Column(Integer, nullable=False, default=0)
+
+
+class PlayerMonthItem(Base):
+    """
+    A player's received quantity and value of one item in one month.
+        :param: player_id
+        :param: partition (YYYYMM)
+        :param: item_id
+        :param: quantity
+        :param: value
+    """
+    __tablename__ = 'player_month_items'
+    __table_args__ = (
+        Index('ix_player_month_items_partition_item', 'partition', 'item_id'),
+    )
+    player_id = Column(Integer, primary_key=True, autoincrement=False)
+    partition = Column(Integer, primary_key=True, autoincrement=False)
+    item_id = Column(Integer, primary_key=True, autoincrement=False)
+    quantity = Column(BigInteger, nullable=False, default=0)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class PlayerMonthNpc(Base):
+    """
+    A player's drop count and loot value from one NPC in one month.
+        :param: player_id
+        :param: partition (YYYYMM)
+        :param: npc_id
+        :param: drops
+        :param: value
+    """
+    __tablename__ = 'player_month_npcs'
+    __table_args__ = (
+        Index('ix_player_month_npcs_partition_npc', 'partition', 'npc_id'),
+    )
+    player_id = Column(Integer, primary_key=True, autoincrement=False)
+    partition = Column(Integer, primary_key=True, autoincrement=False)
+    npc_id = Column(Integer, primary_key=True, autoincrement=False)
+    drops = Column(Integer, nullable=False, default=0)
+    value = Column(BigInteger, nullable=False, default=0)
@@ -21,13 +21,15 @@ class NotifiedSubmission(Base):
     edited_by = Column(Integer, ForeignKey('users.user_id'), nullable=True)
     
     # Nullable foreign keys to allow only one relationship to be defined
-    drop_id = Column(Integer, ForeignKey('drops.drop_id'), nullable=True)
+    # No database-level key for drops: partitioned tables can't be referenced by one
+    drop_id = Column(Integer, nullable=True)
     clog_id = Column(Integer, ForeignKey('collection.log_id'), nullable=True)
     ca_id = Column(Integer, ForeignKey('combat_achievement.id'), nullable=True)
     pb_id = Column(Integer, ForeignKey('personal_best.id'), nullable=True)
 
     # Relationships
-    drop = relationship("Drop", back_populates="notified_drops")
+    drop = relationship("Drop", primaryjoin="foreign(NotifiedSubmission.drop_id) == Drop.drop_id",
+                        back_populates="notified_drops")
     clog = relationship("CollectionLogEntry", back_populates="notified_clog")
     ca = relationship("CombatAchievementEntry", back_populates="notified_ca")
     pb = relationship("PersonalBestEntry", back_populates="notified_pb")
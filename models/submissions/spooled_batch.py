@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, String, func
+from ..base import Base
+
+
+class SpooledBatch(Base):
+    """
+    Records that a spooled batch has been committed, written in the same transaction
+    as its rows by submissions.processor.BatchProcessor. A replay after a crash between
+    that commit and deleting the batch's spool segment skips the batch instead of
+    inserting it (and adding it to the rollups) a second time.
+        :param: batch_id: <spool id>:<processor>:<segment>
+    """
+    __tablename__ = 'spooled_batches'
+    batch_id = Column(String(64), primary_key=True)
+    date_added = Column(DateTime, default=func.now())
@@ -35,7 +35,7 @@ class Player(Base):
     cas = relationship("CombatAchievementEntry", back_populates="player")
     clogs = relationship("CollectionLogEntry", back_populates="player")
     user = relationship("User", back_populates="players")
-    drops = relationship("Drop", back_populates="player")
+    drops = relationship("Drop", primaryjoin="Player.player_id == foreign(Drop.player_id)", back_populates="player")
     groups = relationship("Group", secondary=user_group_association, back_populates="players")
 
     def add_group(self, group):
@@ -48,9 +48,22 @@ class Player(Base):
         if not existing_association:
             self.groups.append(group)
             session.commit()
+            from cache.player_stats import GroupStatsCache
+            GroupStatsCache.schedule_membership(self.player_id, group.group_id)
 
 @event.listens_for(Player, 'after_insert')
 def after_player_insert(mapper, connection, target: Player):
-    """Synchronous event handler for player insertions"""
-    player_cache = get_player_cache(target.player_id)
-    player_cache.rebuild_cache_sync()  # Use sync version directly
+    """Seed a new player's cached stats in the background, off the flush that inserted them"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Not on the event loop (e.g. a script); the cache is built on first read instead
+        return
+    loop.create_task(get_player_cache(target.player_id).rebuild_cache())
+
+@event.listens_for(Player.player_name, 'set')
+def on_player_name_change(target: Player, value, oldvalue, initiator):
+    """Drop a renamed player from the identity cache so check_player re-verifies them"""
+    if target.player_id is not None and value != oldvalue:
+        from cache.player_identity import PlayerIdentityCache
+        PlayerIdentityCache().invalidate(player_id=target.player_id)
@@ -0,0 +1,206 @@
+"""
+Bulk import of historical submissions, e.g. from an export or to re-ingest the
+messages missed during an outage.
+
+    python -m submissions.backfill drops.jsonl
+    python -m submissions.backfill export.csv.gz --chunk-size 20000 --verify-new
+
+Each record uses the plugin's field names (see submissions.parser), plus an
+optional `date_added` (ISO 8601 or a unix timestamp) for when it was received.
+Drops name their source in `source_type` (npc, collection_log or combat_achievement).
+Records are streamed through the same validation and NPC/item resolution as
+live submissions and written with chunked Core inserts. The drop aggregates in
+Redis are rebuilt once per affected player at the end instead of per row.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set
+import msgspec
+from models import Player
+from models.base import session
+from submissions.parser import parse_record
+from submissions.processor import (
+    BatchProcessor, DropProcessor, CollectionLogProcessor, CombatAchievementProcessor,
+    PersonalBestProcessor, RejectedSubmission
+)
+from utils.logger import Logger
+
+logger = Logger()
+
+
+def read_records(path: str, file_format: Optional[str] = None) -> Iterator[Mapping[str, Any]]:
+    """Stream records from a JSONL or CSV file (optionally gzip'd) without loading it into memory"""
+    opener = gzip.open if path.endswith(".gz") else open
+    name = path[:-3] if path.endswith(".gz") else path
+    file_format = file_format or ("csv" if name.endswith(".csv") else "jsonl")
+    with opener(path, "rb") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+            return
+        decoder = msgspec.json.Decoder()
+        for line in f:
+            if line.strip():
+                try:
+                    yield decoder.decode(line)
+                except msgspec.DecodeError:
+                    # Counted as malformed rather than aborting the whole import
+                    yield {}
+
+
+def parse_date(value: Any) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)) or str(value).replace(".", "", 1).isdigit():
+        return datetime.fromtimestamp(float(value))
+    return datetime.fromisoformat(str(value))
+
+
+class Backfill:
+    """Validates records, resolves players, and writes rows per table in chunks"""
+    def __init__(self, chunk_size: int = 10000, verify_new: bool = False, dry_run: bool = False):
+        self.chunk_size = chunk_size
+        self.verify_new = verify_new
+        self.dry_run = dry_run
+        self.processors: Dict[str, BatchProcessor] = {
+            "drop": DropProcessor(),
+            "collection_log": CollectionLogProcessor(),
+            "combat_achievement": CombatAchievementProcessor(),
+            "npc_kill": PersonalBestProcessor()
+        }
+        self.chunks: Dict[str, List[Any]] = {submission_type: [] for submission_type in self.processors}
+        self.players: Dict[str, int] = {}
+        self.affected_players: Set[int] = set()
+        self.affected_partitions: Set[int] = set()
+        self.read = 0
+        self.written = 0
+        self.rejected: Counter = Counter()
+        self.started = time.perf_counter()
+        self._last_report = 0.0
+
+    def load_players(self) -> None:
+        """Load every known account hash once, instead of a lookup per record"""
+        rows = session.query(Player.account_hash, Player.player_id).filter(Player.account_hash.isnot(None)).all()
+        session.commit()
+        self.players = {account_hash: player_id for account_hash, player_id in rows}
+
+    async def resolve_player(self, submission) -> Optional[int]:
+        player_id = self.players.get(submission.acc_hash)
+        if player_id is None and self.verify_new:
+            from events import check_player
+            player = await check_player(submission.player, submission.acc_hash)
+            if player:
+                player_id = self.players[submission.acc_hash] = player.player_id
+        return player_id
+
+    async def run(self, records: Iterator[Mapping[str, Any]]) -> None:
+        self.load_players()
+        for record in records:
+            self.read += 1
+            await self.add(record)
+            if time.perf_counter() - self._last_report >= 2:
+                self.report()
+        for submission_type in self.processors:
+            await self.flush(submission_type)
+        await self.rebuild_caches()
+        self.report(final=True)
+
+    async def add(self, record: Mapping[str, Any]) -> None:
+        submission = parse_record(record)
+        if not submission:
+            self.rejected["malformed"] += 1
+            return
+        processor = self.processors.get(submission.type)
+        if not processor:
+            self.rejected[f"unsupported type {submission.type}"] += 1
+            return
+        player_id = await self.resolve_player(submission)
+        if player_id is None:
+            self.rejected["unknown player"] += 1
+            return
+        try:
+            received_at = parse_date(record.get("date_added") or record.get("date")) or datetime.now()
+            row = processor.build_row(submission, player_id, received_at)
+        except (RejectedSubmission, ValueError) as e:
+            # Group by reason rather than by the specific NPC/item
+            self.rejected[re.sub(r"\d+", "#", str(e).split(" (")[0].split(" for ")[0])] += 1
+            return
+        chunk = self.chunks[submission.type]
+        chunk.append(row)
+        if len(chunk) >= self.chunk_size:
+            await self.flush(submission.type)
+
+    async def flush(self, submission_type: str) -> None:
+        rows = self.chunks[submission_type]
+        if not rows:
+            return
+        self.chunks[submission_type] = []
+        processor = self.processors[submission_type]
+        if not self.dry_run:
+            try:
+                # Drops' aggregates are rebuilt once at the end instead; the other types'
+                # set/hash updates are idempotent, so they're applied once per chunk
+                await processor.write_batch(rows, dispatch=submission_type != "drop")
+            except Exception as e:
+                logger.error("backfill", f"Failed to write {len(rows)} {processor.name}: {e}")
+                self.rejected["write failed"] += len(rows)
+                return
+            if submission_type == "drop":
+                self.affected_players.update(row.player_id for row in rows)
+                self.affected_partitions.update(row.partition for row in rows)
+        self.written += len(rows)
+
+    async def rebuild_caches(self, players_per_rebuild: int = 500) -> None:
+        """Rebuild the drop aggregates of every player that received drops, once each"""
+        if self.dry_run or not self.affected_players:
+            return
+        from cache.player_stats import GroupStatsCache, PlayerStatsCache, leaderboards
+        # The leaderboards and group months only see ingest's increments, so have their
+        # next read rebuild them from the rollups this run has just written
+        await leaderboards.invalidate(self.affected_partitions)
+        await GroupStatsCache.invalidate(self.affected_partitions)
+        print(f"\nRebuilding cached stats for {len(self.affected_players)} players...", file=sys.stderr)
+        player_ids = sorted(self.affected_players)
+        # A chunk at a time, as rebuild_many buffers a whole chunk's pipeline
+        for start in range(0, len(player_ids), players_per_rebuild):
+            await PlayerStatsCache.rebuild_many(player_ids[start:start + players_per_rebuild])
+
+    def report(self, final: bool = False) -> None:
+        self._last_report = time.perf_counter()
+        elapsed = self._last_report - self.started
+        rate = self.read / elapsed if elapsed else 0
+        line = (f"read {self.read:,} | written {self.written:,} | rejected {sum(self.rejected.values()):,} "
+                f"| {rate:,.0f} rows/s | {elapsed:,.1f}s")
+        if not final:
+            print(f"\r{line}", end="", file=sys.stderr, flush=True)
+            return
+        print(f"\r{line}", file=sys.stderr)
+        for reason, count in self.rejected.most_common():
+            print(f"  {count:>10,}  {reason}", file=sys.stderr)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from cache.npc_registry import NpcRegistry
+    from cache.item_catalogue import ItemCatalogue
+    NpcRegistry().load()
+    ItemCatalogue().load()
+    backfill = Backfill(args.chunk_size, args.verify_new, args.dry_run)
+    await backfill.run(read_records(args.path, args.format))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import historical submissions from a JSONL or CSV file")
+    parser.add_argument("path", help="JSONL or CSV file, optionally gzip'd (.gz)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per insert statement")
+    parser.add_argument("--verify-new", action="store_true",
+                        help="Verify unknown account hashes against WiseOldMan instead of skipping them")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and count without writing")
+    asyncio.run(main(parser.parse_args()))
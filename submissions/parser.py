@@ -0,0 +1,116 @@
+from typing import Any, Dict, Mapping, Optional
+import interactions
+import msgspec
+
+
+class Submission(msgspec.Struct, frozen=True, gc=False):
+    """
+    A single plugin submission, parsed once and handed to every downstream stage.
+
+    :param: type: Submission type (drop, collection_log, combat_achievement, npc_kill)
+    :param: source_type: What a drop came from (npc, collection_log, combat_achievement)
+    :param: player: The player's display name, exactly as submitted
+    :param: acc_hash: The RuneLite account hash used to authenticate the player
+    :param: item / item_id: Item name and ID (drops and collection log slots)
+    :param: npc: Source NPC name (drops, collection log slots and personal bests)
+    :param: value / quantity: Drop value and quantity
+    :param: reported_slots: Total collection log slots at the time of submission
+    :param: task_name: Completed combat achievement task
+    :param: kill_time / personal_best / new_pb: Kill time, current PB and whether it was beaten
+    """
+    type: str
+    player: str
+    acc_hash: str
+    item: Optional[str] = None
+    item_id: Optional[int] = None
+    npc: Optional[str] = None
+    value: int = 0
+    quantity: int = 1
+    plugin_version: Optional[str] = None
+    image_url: Optional[str] = None
+    reported_slots: Optional[int] = None
+    task_name: Optional[str] = None
+    kill_time: Optional[int] = None
+    personal_best: Optional[int] = None
+    new_pb: Optional[bool] = None
+    source_type: Optional[str] = None
+
+
+## Values of a drop's second "type" field, naming what the drop came from
+SOURCE_TYPES = ("npc", "collection_log", "combat_achievement")
+
+## Maps the field names sent by the plugin onto Submission attributes
+FIELD_NAMES: Dict[str, str] = {
+    "type": "type",
+    "player": "player",
+    "acc_hash": "acc_hash",
+    "item": "item",
+    "id": "item_id",
+    "source": "npc",
+    "value": "value",
+    "quantity": "quantity",
+    "p_v": "plugin_version",
+    "reported_slots": "reported_slots",
+    "slots": "reported_slots",
+    "task": "task_name",
+    "task_name": "task_name",
+    "kill_time": "kill_time",
+    "time": "kill_time",
+    "personal_best": "personal_best",
+    "best_time": "personal_best",
+    "new_pb": "new_pb",
+    "is_pb": "new_pb",
+    "image_url": "image_url",
+    "source_type": "source_type",
+}
+
+
+def parse_embed(embed: interactions.Embed) -> Optional[Submission]:
+    """
+    Walk a DropTracker embed's fields once and build a Submission from them.
+
+    Drop embeds carry two "type" fields: the first is the submission type used
+    for dispatch, and a later one names the drop's source (see SOURCE_TYPES).
+
+    Returns None if the embed is missing a required field (type, player or
+    acc_hash) or if any field has a value of the wrong type.
+    """
+    values = {}
+    player_name = None
+    for field in embed.fields:
+        attr = FIELD_NAMES.get(field.name)
+        if attr == "type":
+            if "type" not in values:
+                values["type"] = field.value
+            elif field.value in SOURCE_TYPES and "source_type" not in values:
+                values["source_type"] = field.value
+        elif attr:
+            values[attr] = field.value
+        elif field.name == "player_name":
+            player_name = field.value
+    if player_name and "player" not in values:
+        values["player"] = player_name
+    if embed.image and "image_url" not in values:
+        values["image_url"] = embed.image.url
+    return _build(values)
+
+
+def parse_record(record: Mapping[str, Any]) -> Optional[Submission]:
+    """Build a Submission from a decoded JSON/CSV record using the plugin's field names"""
+    values = {}
+    for key, value in record.items():
+        attr = FIELD_NAMES.get(key)
+        if attr and value not in (None, ""):
+            # Account hashes are numeric in RuneLite but stored as strings
+            values[attr] = str(value) if attr == "acc_hash" else value
+    if "player" not in values and record.get("player_name"):
+        values["player"] = record["player_name"]
+    return _build(values)
+
+
+def _build(values: Dict[str, Any]) -> Optional[Submission]:
+    try:
+        # strict=False lets msgspec coerce the embed's string values into ints/bools
+        return msgspec.convert(values, Submission, strict=False)
+    except msgspec.ValidationError:
+        return None
@@ -1,122 +1,453 @@
-import interactions
-from models import Player, Drop
-from models.base import session
-from typing import List, Dict
-from collections import deque
-from utils.misc import get_current_partition, get_player_cache
-from utils.num import get_npc_id
+import asyncio
+import hashlib
+import socket
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime
+from sqlalchemy import delete, insert, select, Table
+from models import Drop, CollectionLogEntry, CombatAchievementEntry, PersonalBestEntry, SpooledBatch
+from models.base import unit_of_work
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Dict, NamedTuple, Optional, Set, Type
+from utils.misc import get_partition
+from cache.npc_registry import NpcRegistry
 from utils.logger import Logger
+from cache.item_catalogue import ItemCatalogue
+from cache.player_identity import PlayerIdentity
 from cache.player_stats import PlayerStatsCache
+from cache.stats import StatsTracker
+from submissions import rollups
+from submissions.parser import SOURCE_TYPES, Submission
+from submissions.spool import Spool
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 logger = Logger()
-default_batch_size = int(os.getenv("BATCH_SIZE", 5))
+stats = StatsTracker()
+item_catalogue = ItemCatalogue()
+npc_registry = NpcRegistry()
+default_batch_size = int(os.getenv("BATCH_SIZE", 250))
+default_flush_interval = int(os.getenv("FLUSH_INTERVAL_MS", 500)) / 1000
+spool_dir = os.getenv("SPOOL_DIR", "data/spool")
+spool_fsync_interval = int(os.getenv("SPOOL_FSYNC_MS", 50)) / 1000
+## How long a batch that failed to write waits in its spool segment before it's retried
+spool_retry_interval = int(os.getenv("SPOOL_RETRY_MS", 5000)) / 1000
 
-class DropProcessor:
-    def __init__(self, batch_size: int = default_batch_size):
+
+class RejectedSubmission(ValueError):
+    """A submission that failed validation and can't be stored"""
+
+
+def _resolve_npc(submission: Submission) -> int:
+    npc_id = npc_registry.get_id(submission.npc)
+    if not npc_id:
+        raise RejectedSubmission(f"Could not find NPC ID for {submission.npc}")
+    return int(npc_id)
+
+
+class DropRow(NamedTuple):
+    """A parsed drop, ready to be written with a Core insert into `drops`"""
+    item_id: int
+    player_id: int
+    npc_id: int
+    value: int
+    quantity: int
+    image_url: Optional[str]
+    plugin_version: Optional[str]
+    partition: int
+    date_added: datetime
+
+
+class CollectionLogRow(NamedTuple):
+    """A new collection log slot, ready to be inserted into `collection`"""
+    item_id: int
+    npc_id: int
+    player_id: int
+    reported_slots: Optional[int]
+    image_url: Optional[str]
+    plugin_version: Optional[str]
+    date_added: datetime
+
+
+class CombatAchievementRow(NamedTuple):
+    """A completed combat achievement task, ready to be inserted into `combat_achievement`"""
+    player_id: int
+    task_name: str
+    image_url: Optional[str]
+    plugin_version: Optional[str]
+    date_added: datetime
+
+
+class PersonalBestRow(NamedTuple):
+    """A boss kill time, ready to be inserted into `personal_best`"""
+    player_id: int
+    npc_id: int
+    kill_time: int
+    personal_best: int
+    new_pb: bool
+    image_url: Optional[str]
+    plugin_version: Optional[str]
+
+
+class BatchProcessor(ABC):
+    """
+    Buffers parsed submissions across all players and writes them in batches.
+
+    A batch is flushed as soon as `batch_size` rows are pending, or once the
+    oldest pending row has waited `flush_interval` seconds, whichever comes first.
+    Rows keep the order the ingestion queue handed them over in, and the queue
+    shards by account hash, so each player's submissions are written in order.
+    Every accepted row is written to an on-disk spool first, so pending rows
+    survive a crash or restart and are replayed by `replay_spool` at startup.
+    A batch that fails to write stays in its segment and is retried from there
+    every `spool_retry_interval` seconds until it commits.
+    Each batch commits a SpooledBatch marker along with its rows, so a batch that
+    committed just before a crash kept its segment from being deleted isn't
+    written twice on replay.
+
+    Subclasses set `name`, `table` and `row_type`, implement `build_row`, and
+    override `_dispatch_batch` to update whatever is derived from their rows once
+    a batch has committed.
+    """
+    name: str = None
+    metric: str = None
+    table: Table = None
+    row_type: Type[NamedTuple] = None
+
+    def __init__(self, batch_size: int = default_batch_size, flush_interval: float = default_flush_interval):
         self.batch_size = batch_size
-        self.pending_drops: Dict[int, deque] = {}  # player_id -> deque of drops
-        self.session = session
-    
-    async def process_drop(self, embed: interactions.Embed, player_data: Player):
+        self.flush_interval = flush_interval
+        self.pending: List[Any] = []
+        self._oldest_pending: Optional[float] = None
+        self._flush_timer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.spool: Spool = Spool(os.path.join(spool_dir, self.name), self.row_type, spool_fsync_interval)
+        # Identifies this spool, so batch markers from other hosts' spools never collide with its own
+        spool_id = hashlib.sha1(f"{socket.gethostname()}:{os.path.abspath(self.spool.directory)}".encode()).hexdigest()
+        self._batch_prefix = f"{spool_id[:16]}:{self.name}:"
+        # Markers of batches whose segments are gone; deleted with the next write
+        self._stale_batches: List[str] = []
+        self._failed_segments: List[int] = []
+        self._retry_task: Optional[asyncio.Task] = None
+        self.flush_sizes = stats.histogram(f"{self.metric}_flush_size", [1, 5, 10, 25, 50, 100, 250, 500, 1000])
+        self.flush_latency = stats.histogram(f"{self.metric}_flush_latency_ms", [5, 10, 50, 100, 250, 500, 1000, 2500, 5000])
+
+    @abstractmethod
+    def build_row(self, submission: Submission, player_id: int, received_at: datetime):
+        """Validate a submission and convert it into a row, raising RejectedSubmission if it can't be stored"""
+
+    async def process(self, submission: Submission, player: PlayerIdentity):
+        """Validate a verified player's submission and add it to the pending batch"""
         try:
-            player = self.session.merge(player_data)
-            
-            drop_data = await self._parse_embed(embed)
-            if not drop_data:
+            row = self.build_row(submission, int(player.player_id), datetime.now())
+        except RejectedSubmission as e:
+            logger.error(f"process_{self.name}", f"{e}: {submission}")
+            return
+        except Exception as e:
+            logger.error(f"process_{self.name}", f"Error processing submission for player {player.player_id}: {str(e)}")
+            return
+        await self._enqueue(row)
+
+    async def _enqueue(self, row):
+        """Spool a row and add it to the pending batch, flushing if the batch is full"""
+        self.spool.append(row)
+        if not self.pending:
+            self._oldest_pending = time.perf_counter()
+            self._flush_timer = asyncio.create_task(self._flush_after(self.flush_interval))
+        self.pending.append(row)
+
+        if len(self.pending) >= self.batch_size:
+            await self._process_batch()
+
+    async def _flush_after(self, delay: float):
+        """Flush whatever is pending once the oldest row has waited `delay` seconds"""
+        await asyncio.sleep(delay)
+        self._flush_timer = None
+        await self._process_batch()
+
+    async def _process_batch(self):
+        """Write every pending row, across all players, in a single batch"""
+        async with self._flush_lock:
+            if not self.pending:
                 return
-                
-            if player.player_id not in self.pending_drops:
-                self.pending_drops[player.player_id] = deque(maxlen=self.batch_size)
-            # Convert values and create drop
+            if self._flush_timer and self._flush_timer is not asyncio.current_task():
+                self._flush_timer.cancel()
+            self._flush_timer = None
+
+            rows_to_process = self.pending
+            oldest_pending = self._oldest_pending
+            segment = self.spool.rotate()
+            self.pending = []
+            self._oldest_pending = None
+
+            batch_id = self._batch_id(segment)
             try:
-                drop = Drop(
-                    item_id=int(drop_data['item_id']),
-                    value=int(drop_data['value']),
-                    quantity=int(drop_data['quantity']),
-                    npc_id=int(drop_data['npc_id']),
-                    player_id=int(player.player_id),
-                    plugin_version=drop_data.get('plugin_version'),
-                    partition=get_current_partition(),
-                    image_url=embed.image.url if embed.image else None
-                )
-                print("Drop created:", drop)
-                
-                self.pending_drops[player.player_id].append(drop)
-
-                if len(self.pending_drops[player.player_id]) >= self.batch_size:
-                    await self._process_batch(player.player_id)
+                # New rows keep arriving in the fresh buffer while this batch is written
+                await self._write(rows_to_process, batch_id)
+                self.flush_sizes.observe(len(rows_to_process))
+                self.flush_latency.observe((time.perf_counter() - oldest_pending) * 1000)
 
             except Exception as e:
-                logger.error("process_drop", 
-                    f"Drop creation error: {str(e)}. "
-                    f"Player ID: {player.player_id} (type: {type(player.player_id)})")
+                # The batch stays in its spool segment and is retried from there
+                logger.error("process_batch", f"Error writing batch of {len(rows_to_process)} {self.name}: {e}")
+                if segment is not None:
+                    self._failed_segments.append(segment)
+                    if self._retry_task is None or self._retry_task.done():
+                        self._retry_task = asyncio.create_task(self._retry_failed())
                 return
+            self.spool.commit(segment)
+            if batch_id:
+                self._stale_batches.append(batch_id)
+
+        await self._dispatch_batch(rows_to_process)
+
+    async def write_batch(self, rows: List[Any], dispatch: bool = True):
+        """
+        Write already-built rows in one transaction, bypassing the pending batch and the spool
+        (e.g. for an import that is simply rerun if it fails), then run their side effects
+        without notifications unless `dispatch` is False
+        """
+        await self._write(rows)
+        if dispatch:
+            await self._dispatch_batch(rows, notify=False)
+
+    def _batch_id(self, segment: Optional[int]) -> Optional[str]:
+        return None if segment is None else f"{self._batch_prefix}{segment}"
+
+    async def _write(self, rows: List[Any], batch_id: Optional[str] = None):
+        """Insert a batch in one transaction, marking it committed if it came from the spool"""
+        stale = list(self._stale_batches)
+        async with unit_of_work() as db:
+            if stale:
+                await db.execute(delete(SpooledBatch.__table__).where(SpooledBatch.batch_id.in_(stale)))
+            if batch_id:
+                await db.execute(insert(SpooledBatch.__table__).values(batch_id=batch_id))
+            await self._insert(db, rows)
+        del self._stale_batches[:len(stale)]
+
+    async def _insert(self, db: AsyncSession, rows: List[Any]):
+        # A single Core executemany; skips the ORM unit of work, identity map
+        # and per-row events entirely
+        await db.execute(
+            insert(self.table),
+            [row._asdict() for row in rows]
+        )
 
+    async def _retry_failed(self):
+        """Retry the batches that failed to write, oldest first, until every one has committed"""
+        while self._failed_segments:
+            await asyncio.sleep(spool_retry_interval)
+            written = []
+            async with self._flush_lock:
+                while self._failed_segments:
+                    segment = self._failed_segments[0]
+                    rows = self.spool.read(segment)
+                    batch_id = self._batch_id(segment)
+                    try:
+                        # The failed attempt may have committed before its error surfaced
+                        async with unit_of_work() as db:
+                            committed = (await db.execute(
+                                select(SpooledBatch.batch_id).where(SpooledBatch.batch_id == batch_id)
+                            )).first() is not None
+                        if not committed:
+                            await self._write(rows, batch_id)
+                    except Exception as e:
+                        logger.error("process_batch", f"Error retrying {self.name} spool segment {segment}: {e}")
+                        break
+                    self.spool.commit(segment)
+                    self._stale_batches.append(batch_id)
+                    self._failed_segments.pop(0)
+                    written.append(rows)
+            # Nothing was dispatched for these batches when their first attempt failed
+            for rows in written:
+                await self._dispatch_batch(rows)
+
+    async def replay_spool(self) -> int:
+        """Write any rows left in the spool by a crash or restart, returning how many were replayed"""
+        replayed = 0
+        async with self._flush_lock:
+            segments = self.spool.replay()
+            batch_ids = [self._batch_id(segment) for segment, _ in segments]
+            async with unit_of_work() as db:
+                committed = set((await db.execute(
+                    select(SpooledBatch.batch_id).where(SpooledBatch.batch_id.in_(batch_ids))
+                )).scalars()) if batch_ids else set()
+                # Markers left by a crash after their segment was already deleted
+                await db.execute(delete(SpooledBatch.__table__).where(
+                    SpooledBatch.batch_id.startswith(self._batch_prefix, autoescape=True),
+                    SpooledBatch.batch_id.notin_(batch_ids)
+                ))
+            for (segment, rows), batch_id in zip(segments, batch_ids):
+                if batch_id in committed:
+                    # Committed just before a crash kept the segment from being deleted. Its cache
+                    # updates may or may not have run; the caches reconcile from the rollups.
+                    logger.warning("replay_spool", f"Skipping already committed {self.name} spool segment {segment}")
+                elif rows:
+                    try:
+                        await self._write(rows, batch_id)
+                    except Exception as e:
+                        logger.error("replay_spool", f"Error replaying {self.name} spool segment {segment}: {e}")
+                        self.spool.quarantine(segment)
+                        continue
+                    await self._dispatch_batch(rows, notify=False)
+                    replayed += len(rows)
+                self.spool.commit(segment)
+                self._stale_batches.append(batch_id)
+        return replayed
+
+    async def _dispatch_batch(self, rows: List[Any], notify: bool = True):
+        """Run post-insert side effects once for a whole committed batch"""
+        pass
+
+    async def flush_all(self):
+        """Process all remaining rows in the queue"""
+        await self._process_batch()
+
+    def get_stats(self) -> Dict:
+        return {
+            "pending": len(self.pending),
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "flush_size": self.flush_sizes.snapshot(),
+            "flush_latency_ms": self.flush_latency.snapshot()
+        }
+
+
+class DropProcessor(BatchProcessor):
+    name = "drops"
+    metric = "drop"
+    table = Drop.__table__
+    row_type = DropRow
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._notifications: Set[asyncio.Task] = set()
+
+    def build_row(self, submission: Submission, player_id: int, received_at: datetime) -> DropRow:
+        if submission.item_id is None or not submission.npc:
+            raise RejectedSubmission("Missing item id or source in drop submission")
+        if submission.source_type not in SOURCE_TYPES:
+            raise RejectedSubmission(f"Missing or unknown source type in drop submission: {submission.source_type}")
+        if not item_catalogue.is_valid(submission.item_id):
+            # The database no longer enforces the items reference (partitioned tables can't take part
+            # in foreign keys), so this is the only check keeping unnamed items out of drops and the rollups
+            raise RejectedSubmission(f"Unknown item ID {submission.item_id} ({submission.item})")
+        partition, _ = get_partition(received_at)
+        return DropRow(
+            item_id=submission.item_id,
+            player_id=player_id,
+            npc_id=_resolve_npc(submission),
+            value=submission.value,
+            quantity=submission.quantity,
+            image_url=submission.image_url,
+            plugin_version=submission.plugin_version,
+            partition=partition,
+            date_added=received_at
+        )
+
+    async def _insert(self, db: AsyncSession, drops: List[DropRow]):
+        # The rollups commit or roll back with the drops themselves, so they can't drift
+        await db.execute(insert(self.table), [drop._asdict() for drop in drops])
+        await rollups.apply(db, drops)
+
+    async def _dispatch_batch(self, drops: List[DropRow], notify: bool = True):
+        try:
+            await PlayerStatsCache.update_many(drops)
         except Exception as e:
-            logger.error("process_drop", f"Error processing drop: {str(e)}")
-            self.session.rollback()
-    
-    async def _parse_embed(self, embed: interactions.Embed) -> Dict:
-        """Parse embed fields into drop data"""
-        drop_data = {}
-        
-        
-        for field in embed.fields:
-            match field.name:
-                case "source":
-                    npc_name = field.value
-                    npc_id = await get_npc_id(npc_name)
-                    if not npc_id:
-                        logger.error("parse_embed", f"Could not find NPC ID for {npc_name}")
-                        return None
-                    drop_data['npc_id'] = npc_id
-                case "id":
-                    drop_data['item_id'] = int(field.value)
-                case "value":
-                    drop_data['value'] = int(field.value)
-                case "quantity":
-                    drop_data['quantity'] = int(field.value)
-                case "type" if field.value in ["npc", "collection_log", "combat_achievement"]:
-                    drop_data['source_type'] = field.value
-                case "item":
-                    drop_data['item_name'] = field.value
-                case "p_v":
-                    drop_data['plugin_version'] = field.value
-        
-        # Validate we have all required fields
-        required_fields = ['item_id', 'value', 'quantity', 'npc_id', 'source_type']
-        missing_fields = [field for field in required_fields if field not in drop_data]
-        
-        if missing_fields:
-            logger.error("parse_embed", 
-                f"Missing required fields: {missing_fields}. "
-                f"Parsed data: {drop_data}")
-            return None
-        
-        return drop_data
-    
-    async def _process_batch(self, player_id: int):
-        """Process a batch of drops for a player"""
-        if not self.pending_drops.get(player_id):
-            return
-            
-        drops_to_process = list(self.pending_drops[player_id])
-        self.pending_drops[player_id].clear()
-        
+            logger.error("dispatch_batch", f"Error updating stats cache for {len(drops)} drops: {e}")
+        if notify:
+            # Held until done, as the event loop only keeps a weak reference to its tasks
+            task = asyncio.create_task(self.notify_drops(drops))
+            self._notifications.add(task)
+            task.add_done_callback(self._notified)
+
+    def _notified(self, task: asyncio.Task) -> None:
+        self._notifications.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("notify_drops", f"Error checking drops for notifications: {task.exception()}")
+
+    async def notify_drops(self, drops: List[DropRow]):
+        """Check a committed batch against group notification thresholds; stream workers relay it to the bot instead"""
+        from cogs.qualifier import check_drops
+        await check_drops(drops)
+
+
+class CollectionLogProcessor(BatchProcessor):
+    name = "collection_logs"
+    metric = "clog"
+    table = CollectionLogEntry.__table__
+    row_type = CollectionLogRow
+
+    def build_row(self, submission: Submission, player_id: int, received_at: datetime) -> CollectionLogRow:
+        if submission.item_id is None or not submission.npc:
+            raise RejectedSubmission("Missing item id or source in collection log submission")
+        return CollectionLogRow(
+            item_id=submission.item_id,
+            npc_id=_resolve_npc(submission),
+            player_id=player_id,
+            reported_slots=submission.reported_slots,
+            image_url=submission.image_url,
+            plugin_version=submission.plugin_version,
+            date_added=received_at
+        )
+
+    async def _dispatch_batch(self, entries: List[CollectionLogRow], notify: bool = True):
         try:
-            self.session.add_all(drops_to_process)
-            self.session.commit()
-            
+            await PlayerStatsCache.update_collection_logs(entries)
         except Exception as e:
-            logger.error("process_batch", f"Error processing batch for player {player_id}: {e}")
-            self.session.rollback()
-    
-    async def flush_all(self):
-        """Process all remaining drops in the queues"""
-        for player_id in list(self.pending_drops.keys()):
-            if self.pending_drops[player_id]:
-                await self._process_batch(player_id)
\ No newline at end of file
+            logger.error("dispatch_batch", f"Error updating collection log cache for {len(entries)} entries: {e}")
+
+
+class CombatAchievementProcessor(BatchProcessor):
+    name = "combat_achievements"
+    metric = "ca"
+    table = CombatAchievementEntry.__table__
+    row_type = CombatAchievementRow
+
+    def build_row(self, submission: Submission, player_id: int, received_at: datetime) -> CombatAchievementRow:
+        if not submission.task_name:
+            raise RejectedSubmission("Missing task name in combat achievement submission")
+        return CombatAchievementRow(
+            player_id=player_id,
+            task_name=submission.task_name,
+            image_url=submission.image_url,
+            plugin_version=submission.plugin_version,
+            date_added=received_at
+        )
+
+    async def _dispatch_batch(self, entries: List[CombatAchievementRow], notify: bool = True):
+        try:
+            await PlayerStatsCache.update_combat_achievements(entries)
+        except Exception as e:
+            logger.error("dispatch_batch", f"Error updating combat achievement cache for {len(entries)} entries: {e}")
+
+
+class PersonalBestProcessor(BatchProcessor):
+    name = "personal_bests"
+    metric = "pb"
+    table = PersonalBestEntry.__table__
+    row_type = PersonalBestRow
+
+    def build_row(self, submission: Submission, player_id: int, received_at: datetime) -> PersonalBestRow:
+        if submission.kill_time is None or not submission.npc:
+            raise RejectedSubmission("Missing kill time or source in personal best submission")
+        personal_best = submission.personal_best
+        if personal_best is None:
+            personal_best = submission.kill_time
+        return PersonalBestRow(
+            player_id=player_id,
+            npc_id=_resolve_npc(submission),
+            kill_time=submission.kill_time,
+            personal_best=personal_best,
+            new_pb=bool(submission.new_pb),
+            image_url=submission.image_url,
+            plugin_version=submission.plugin_version
+        )
+
+    async def _dispatch_batch(self, entries: List[PersonalBestRow], notify: bool = True):
+        try:
+            await PlayerStatsCache.update_personal_bests(entries)
+        except Exception as e:
+            logger.error("dispatch_batch", f"Error updating personal best cache for {len(entries)} entries: {e}")
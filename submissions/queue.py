@@ -0,0 +1,287 @@
+import asyncio
+import os
+import time
+import uuid
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import msgspec
+from dotenv import load_dotenv
+from cache.dedup import SubmissionDeduplicator
+from cache.stats import StatsTracker
+from submissions.parser import Submission
+from submissions.spool import Spool
+from utils.logger import Logger
+
+load_dotenv()
+
+logger = Logger()
+stats = StatsTracker()
+deduplicator = SubmissionDeduplicator()
+
+default_worker_count = int(os.getenv("INGEST_WORKERS", 8))
+default_queue_size = int(os.getenv("INGEST_QUEUE_SIZE", 2000))
+default_put_timeout = float(os.getenv("INGEST_PUT_TIMEOUT", 2.0))
+spool_dir = os.getenv("SPOOL_DIR", "data/spool")
+## Submissions are only acknowledged once the batched fsync covering them has completed
+intake_fsync_interval = int(os.getenv("INGEST_SPOOL_FSYNC_MS", 10)) / 1000
+## How often handled submissions are deleted from the intake spool
+checkpoint_interval = int(os.getenv("INGEST_CHECKPOINT_MS", 1000)) / 1000
+
+## Outcomes of submitting a submission
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+OVERFLOWED = "overflowed"
+
+
+class SpooledSubmission(msgspec.Struct, frozen=True, gc=False):
+    """A submission as written to the intake spool, with its ordering key and the dedup claim it makes"""
+    key: str
+    submission: Submission
+    dedup_key: Optional[str] = None
+    token: Optional[str] = None
+
+
+class SubmissionQueue:
+    """
+    Bounded ingestion stage sitting between the Discord listener and the processors.
+
+    Submissions are sharded onto a fixed pool of workers by a key (the player's
+    account hash), so that everything a single player submits is handled in the
+    order it arrived while different players are processed in parallel.
+
+    Every submission is written to an intake spool, and fsync'd, before its
+    dedup key is claimed and before `submit` returns, so nothing that was
+    acknowledged (or whose key would suppress a retry) is lost to a crash.
+    Every `checkpoint_interval` seconds the spool's segments whose submissions
+    have all been handled are deleted, after `sync_handled` has made whatever
+    the handler wrote for them durable. Segments left by a crash are requeued
+    by `start`. A crash between the handler's own spool being synced and the
+    next checkpoint means those submissions are handled again after a restart.
+
+    Submissions that arrive before `start` are spooled and held, then queued
+    behind the replayed ones, so nothing overtakes what the last run left.
+
+    When a worker's queue is full, `submit` waits up to `put_timeout` seconds
+    (backpressure) before giving up and counting the submission as overflowed.
+    """
+    def __init__(self, handler: Callable[[Submission], Awaitable[None]],
+                 workers: int = default_worker_count,
+                 max_size: int = default_queue_size,
+                 put_timeout: float = default_put_timeout,
+                 sync_handled: Optional[Callable[[], None]] = None):
+        self.handler = handler
+        self.worker_count = max(1, workers)
+        self.max_size = max_size
+        self.put_timeout = put_timeout
+        self.sync_handled = sync_handled
+        self.spool: Spool = Spool(os.path.join(spool_dir, "intake"), SpooledSubmission, intake_fsync_interval)
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._checkpointer: Optional[asyncio.Task] = None
+        self._started = False
+        self._held: List[Tuple[str, Submission, int]] = []
+        self._outstanding: Dict[int, int] = {}  # spool segment -> submissions not yet handled
+
+        # Counters exposed through get_stats()
+        self.enqueued = 0
+        self.replayed = 0
+        self.processed = 0
+        self.failed = 0
+        self.blocked = 0
+        self.overflowed = 0
+        self.peak_depth = 0
+        self.total_wait = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """
+        Spawn the worker pool, then queue the submissions spooled by the last run ahead of those
+        held since this one started. Call it once whatever the handler depends on is ready.
+        """
+        if self.running:
+            return
+        shard_size = max(1, self.max_size // self.worker_count)
+        self._queues = [asyncio.Queue(maxsize=shard_size) for _ in range(self.worker_count)]
+        self._workers = [
+            asyncio.create_task(self._worker(queue), name=f"submission-worker-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+        await self._replay()
+        while self._held:
+            key, submission, segment = self._held.pop(0)
+            await self._shard_for(key).put((time.perf_counter(), submission, segment))
+        self._started = True
+        self._checkpointer = asyncio.create_task(self._checkpoint_loop())
+        logger.info("SubmissionQueue",
+            f"Started {self.worker_count} ingestion workers (capacity {shard_size * self.worker_count}, "
+            f"{self.replayed} replayed from the spool)")
+
+    async def stop(self) -> None:
+        """Wait for queued submissions to be handled, then cancel the workers"""
+        if not self.running:
+            return
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+        for task in self._workers + [self._checkpointer]:
+            task.cancel()
+        await asyncio.gather(*self._workers, self._checkpointer, return_exceptions=True)
+        self.checkpoint()
+        self._workers = []
+        self._queues = []
+        self._checkpointer = None
+        self._started = False
+
+    def _shard_for(self, key: str) -> asyncio.Queue:
+        # crc32 is stable across processes, unlike hash() on strings
+        return self._queues[zlib.crc32(str(key).encode()) % self.worker_count]
+
+    async def submit(self, key: str, submission: Submission, dedup_key: Optional[str] = None) -> str:
+        """
+        Spool and enqueue a submission.
+
+        Args:
+            key: Ordering key; submissions sharing a key are processed sequentially
+            submission: The payload handed to the handler
+            dedup_key: Claimed once the submission is on disk; already claimed means a duplicate
+
+        Returns:
+            ACCEPTED, DUPLICATE, or OVERFLOWED if the queue stayed full
+        """
+        return (await self.submit_many([(key, submission, dedup_key)]))[0]
+
+    async def submit_many(self, entries: List[Tuple[str, Submission, Optional[str]]]) -> List[str]:
+        """
+        Spool and enqueue (key, submission, dedup_key) entries in order, sharing one fsync.
+        Once an entry overflows, the ones after it are OVERFLOWED too without being claimed.
+        """
+        records = []
+        for key, submission, dedup_key in entries:
+            record = SpooledSubmission(key, submission, dedup_key, uuid.uuid4().hex if dedup_key else None)
+            self.spool.append(record)
+            segment = self.spool.segment
+            self._outstanding[segment] = self._outstanding.get(segment, 0) + 1
+            records.append((record, segment))
+        try:
+            await self.spool.synced()
+        except OSError:
+            for _, segment in records:
+                self._handled(segment)
+            raise
+
+        results = []
+        for record, segment in records:
+            if results and results[-1] == OVERFLOWED:
+                result = OVERFLOWED
+            elif record.dedup_key and await deduplicator.is_duplicate(record.dedup_key, record.token):
+                result = DUPLICATE
+            elif await self._enqueue(record.key, record.submission, segment):
+                result = ACCEPTED
+            else:
+                result = OVERFLOWED
+                if record.dedup_key:
+                    await deduplicator.release(record.dedup_key)
+            if result != ACCEPTED:
+                self._handled(segment)
+            results.append(result)
+        return results
+
+    async def _enqueue(self, key: str, submission: Submission, segment: int) -> bool:
+        if not self._started:
+            if len(self._held) >= self.max_size:
+                self.overflowed += 1
+                stats.increment("denied")
+                return False
+            self._held.append((key, submission, segment))
+            self.enqueued += 1
+            return True
+        queue = self._shard_for(key)
+        item = (time.perf_counter(), submission, segment)
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.blocked += 1
+            try:
+                await asyncio.wait_for(queue.put(item), timeout=self.put_timeout)
+            except asyncio.TimeoutError:
+                self.overflowed += 1
+                stats.increment("denied")
+                return False
+        self.enqueued += 1
+        self.peak_depth = max(self.peak_depth, self.depth())
+        return True
+
+    async def _replay(self) -> None:
+        """Queue the submissions spooled by the last run that it didn't finish handling"""
+        for segment, records in self.spool.replay():
+            self._outstanding[segment] = 0
+            for record in records:
+                if record.dedup_key:
+                    # Our own claim means this delivery was accepted; anyone else's means it's a duplicate
+                    owner = await deduplicator.claimed_by(record.dedup_key)
+                    if owner is None:
+                        if await deduplicator.is_duplicate(record.dedup_key, record.token):
+                            continue
+                    elif owner != record.token:
+                        continue
+                self._outstanding[segment] += 1
+                self.replayed += 1
+                await self._shard_for(record.key).put((time.perf_counter(), record.submission, segment))
+
+    def _handled(self, segment: int) -> None:
+        self._outstanding[segment] -= 1
+
+    def checkpoint(self) -> None:
+        """Delete the intake spool segments whose submissions have all been handled"""
+        self.spool.rotate()
+        done = [segment for segment, outstanding in self._outstanding.items() if outstanding == 0]
+        if not done:
+            return
+        if self.sync_handled:
+            self.sync_handled()
+        for segment in done:
+            self.spool.commit(segment)
+            del self._outstanding[segment]
+
+    async def _checkpoint_loop(self) -> None:
+        while True:
+            await asyncio.sleep(checkpoint_interval)
+            try:
+                self.checkpoint()
+            except Exception as e:
+                logger.error("SubmissionQueue", f"Error checkpointing the intake spool: {e}", e)
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            queued_at, submission, segment = await queue.get()
+            self.total_wait += time.perf_counter() - queued_at
+            try:
+                await self.handler(submission)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("SubmissionQueue", f"Unhandled error while processing submission: {e}", e)
+            finally:
+                self._handled(segment)
+                queue.task_done()
+
+    def depth(self) -> int:
+        """Total number of submissions currently waiting across all shards"""
+        return sum(queue.qsize() for queue in self._queues) + len(self._held)
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        handled = self.processed + self.failed
+        return {
+            "workers": self.worker_count,
+            "capacity": self.max_size,
+            "depth": self.depth(),
+            "peak_depth": self.peak_depth,
+            "enqueued": self.enqueued,
+            "replayed": self.replayed,
+            "processed": self.processed,
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "overflowed": self.overflowed,
+            "avg_wait_ms": (self.total_wait / handled) * 1000 if handled else 0.0
+        }
@@ -0,0 +1,100 @@
+"""
+Durable monthly rollups of `drops`.
+
+Each batch of drops is folded into per player×month totals, and per-item and
+per-NPC breakdowns, by upserting into the rollup tables inside the same
+transaction as the insert into `drops`. The rollups are then the source of
+truth for rebuilding the Redis aggregates and for historical boards: a few
+small indexed reads instead of a scan over a player's entire drop history.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy import Table, insert, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import PlayerMonthTotal, PlayerMonthItem, PlayerMonthNpc
+
+# Rollup table -> (key columns, summed columns)
+ROLLUPS: Dict[Table, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    PlayerMonthTotal.__table__: (("player_id", "partition"), ("total_value", "total_drops")),
+    PlayerMonthItem.__table__: (("player_id", "partition", "item_id"), ("quantity", "value")),
+    PlayerMonthNpc.__table__: (("player_id", "partition", "npc_id"), ("drops", "value")),
+}
+
+
+def aggregate(drops: Iterable[Any]) -> Dict[Table, List[Dict[str, int]]]:
+    """Sum a batch of drops into rollup rows, one per key, so each key is upserted once per batch"""
+    totals = defaultdict(lambda: [0, 0])
+    items = defaultdict(lambda: [0, 0])
+    npcs = defaultdict(lambda: [0, 0])
+    for drop in drops:
+        total = totals[(drop.player_id, drop.partition)]
+        total[0] += drop.value
+        total[1] += 1
+        item = items[(drop.player_id, drop.partition, drop.item_id)]
+        item[0] += drop.quantity
+        item[1] += drop.value
+        if drop.npc_id:
+            npc = npcs[(drop.player_id, drop.partition, drop.npc_id)]
+            npc[0] += 1
+            npc[1] += drop.value
+    rows = {}
+    for table, sums in zip(ROLLUPS, (totals, items, npcs)):
+        key_columns, sum_columns = ROLLUPS[table]
+        rows[table] = [
+            {**dict(zip(key_columns, key)), **dict(zip(sum_columns, values))}
+            for key, values in sums.items()
+        ]
+    return rows
+
+
+def upsert(dialect: str, table: Table):
+    """An INSERT that adds to the summed columns of any rows that already exist, or None if the dialect has none"""
+    _, sum_columns = ROLLUPS[table]
+    if dialect == "mysql":
+        statement = mysql_insert(table)
+        return statement.on_duplicate_key_update(
+            {column: table.c[column] + statement.inserted[column] for column in sum_columns}
+        )
+    if dialect in ("sqlite", "postgresql"):
+        statement = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(table)
+        return statement.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={column: table.c[column] + statement.excluded[column] for column in sum_columns}
+        )
+    return None
+
+
+async def merge(db: AsyncSession, table: Table, rows: List[Dict[str, int]]) -> None:
+    """
+    Portable fallback for `upsert`: add to each existing row, then insert the keys that
+    had none. A concurrent insert of the same key fails the caller's transaction, and
+    with it the batch, which is then retried.
+    """
+    key_columns, sum_columns = ROLLUPS[table]
+    missing = []
+    for row in rows:
+        result = await db.execute(
+            update(table)
+            .where(*(table.c[column] == row[column] for column in key_columns))
+            .values({column: table.c[column] + row[column] for column in sum_columns})
+        )
+        if not result.rowcount:
+            missing.append(row)
+    if missing:
+        await db.execute(insert(table), missing)
+
+
+async def apply(db: AsyncSession, drops: Iterable[Any]) -> None:
+    """Fold a batch of drops into the rollups, within the caller's transaction"""
+    dialect = db.get_bind().dialect.name
+    for table, rows in aggregate(drops).items():
+        if not rows:
+            continue
+        statement = upsert(dialect, table)
+        if statement is not None:
+            await db.execute(statement, rows)
+        else:
+            await merge(db, table, rows)
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import struct
+from typing import Generic, List, Optional, Tuple, Type, TypeVar
+import msgspec
+from utils.logger import Logger
+
+logger = Logger()
+
+T = TypeVar("T")
+
+_LENGTH = struct.Struct(">I")
+_SUFFIX = ".seg"
+
+
+class Spool(Generic[T]):
+    """
+    Append-only write-ahead spool for records that have been accepted but not yet committed.
+
+    Records are msgpack-encoded and length-prefixed, appended to the current
+    segment file and fsync'd in batches every `fsync_interval` seconds. Each
+    flush of the owning processor calls `rotate()` to seal the segment holding
+    exactly the records in that batch, then `commit()` to delete it once the
+    batch is safely in the database. Segments left behind by a crash are read
+    back with `replay()` at startup. Callers that must not acknowledge a record
+    before it is on disk await `synced()`, which shares the next batched fsync.
+    """
+    def __init__(self, directory: str, record_type: Type[T], fsync_interval: float = 0.05):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoder = msgspec.msgpack.Decoder(record_type)
+        self._file = None
+        self._segment: Optional[int] = None
+        self._next_segment = 0
+        self._sync_handle: Optional[asyncio.TimerHandle] = None
+        self._synced: Optional[asyncio.Future] = None
+        self._dirty = False
+
+    @property
+    def segment(self) -> Optional[int]:
+        """The segment being appended to, if one is open"""
+        return self._segment if self._file is not None else None
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}{_SUFFIX}")
+
+    def _existing_segments(self) -> List[int]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(name[:-len(_SUFFIX)]) for name in os.listdir(self.directory) if name.endswith(_SUFFIX))
+
+    def _open_segment(self) -> None:
+        if self._segment is None:
+            os.makedirs(self.directory, exist_ok=True)
+            existing = self._existing_segments()
+            self._next_segment = max(self._next_segment, existing[-1] + 1 if existing else 0)
+        self._segment = self._next_segment
+        self._next_segment += 1
+        self._file = open(self._segment_path(self._segment), "ab")
+
+    def append(self, record: T) -> None:
+        """Append a record to the current segment; it is fsync'd with the next batch"""
+        if self._file is None:
+            self._open_segment()
+        payload = self._encoder.encode(record)
+        self._file.write(_LENGTH.pack(len(payload)) + payload)
+        self._dirty = True
+        if self._sync_handle is None:
+            self._sync_handle = asyncio.get_running_loop().call_later(self.fsync_interval, self.sync)
+
+    def sync(self) -> None:
+        """Flush and fsync everything appended so far"""
+        if self._sync_handle:
+            self._sync_handle.cancel()
+            self._sync_handle = None
+        synced, self._synced = self._synced, None
+        try:
+            if self._file and self._dirty:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._dirty = False
+        except OSError as e:
+            if synced:
+                synced.set_exception(e)
+            raise
+        if synced:
+            synced.set_result(None)
+
+    async def synced(self) -> None:
+        """Wait until everything appended so far has been fsync'd"""
+        if not self._dirty:
+            return
+        if self._synced is None:
+            self._synced = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self._synced)
+
+    def rotate(self) -> Optional[int]:
+        """Seal the current segment and return its number; the next append starts a new one"""
+        if self._file is None:
+            return None
+        self.sync()
+        self._file.close()
+        self._file = None
+        return self._segment
+
+    def commit(self, segment: Optional[int]) -> None:
+        """Delete a sealed segment whose records have been committed"""
+        if segment is None:
+            return
+        try:
+            os.remove(self._segment_path(segment))
+        except FileNotFoundError:
+            pass
+
+    def quarantine(self, segment: int) -> None:
+        """Set aside a segment that can't be committed so it isn't replayed again"""
+        path = self._segment_path(segment)
+        if os.path.exists(path):
+            os.replace(path, path + ".failed")
+
+    def replay(self) -> List[Tuple[int, List[T]]]:
+        """
+        Read back every sealed segment left on disk, oldest first.
+        Must be called before anything new is appended.
+        """
+        segments = []
+        for segment in self._existing_segments():
+            if segment == self._segment:
+                continue
+            segments.append((segment, self.read(segment)))
+        return segments
+
+    def read(self, segment: int) -> List[T]:
+        """Read back the records of a sealed segment"""
+        records = []
+        with open(self._segment_path(segment), "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _LENGTH.size <= len(data):
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            if offset + length > len(data):
+                # Torn write at the tail from a crash mid-append; nothing after it is valid
+                logger.warning("Spool", f"Ignoring truncated record at the end of segment {segment}")
+                break
+            try:
+                records.append(self._decoder.decode(data[offset:offset + length]))
+            except msgspec.DecodeError as e:
+                logger.warning("Spool", f"Skipping undecodable record in segment {segment}: {e}")
+            offset += length
+        return records
@@ -0,0 +1,344 @@
+"""
+Redis Streams ingestion bus.
+
+With INGEST_MODE=stream the Discord listener publishes parsed submissions to a
+set of Redis Streams instead of processing them in-process, and any number of
+worker processes, on any host, consume them through a consumer group:
+
+    python -m submissions.stream --worker-index 0 --worker-count 4
+
+Submissions are sharded onto STREAM_SHARDS streams by account hash (which maps
+1:1 to a player). Each shard is owned by exactly one worker
+(shard % worker_count == worker_index) and its entries are handled strictly in
+order, so a player's submissions are never processed out of order or concurrently.
+Entries are only acknowledged once handled; a restarted worker picks up its own
+unacknowledged entries, and entries left pending by a crashed consumer are
+taken over with XAUTOCLAIM once they've been idle for STREAM_CLAIM_IDLE_MS.
+
+Drops that qualify for notifications are relayed back to the bot process over
+a separate stream, since only it holds the Discord connection.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import msgspec
+from dotenv import load_dotenv
+from redis.exceptions import ResponseError
+from cache import redis_client
+from cache.dedup import SubmissionDeduplicator
+from submissions.parser import Submission
+from submissions.queue import ACCEPTED, DUPLICATE, OVERFLOWED
+from utils.logger import Logger
+
+load_dotenv()
+
+logger = Logger()
+deduplicator = SubmissionDeduplicator()
+
+ingest_mode = os.getenv("INGEST_MODE", "local")
+stream_prefix = os.getenv("STREAM_PREFIX", "ingest")
+stream_shards = int(os.getenv("STREAM_SHARDS", 16))
+stream_group = os.getenv("STREAM_GROUP", "workers")
+stream_maxlen = int(os.getenv("STREAM_MAXLEN", 1000000))
+stream_block_ms = int(os.getenv("STREAM_BLOCK_MS", 1000))
+stream_batch = int(os.getenv("STREAM_BATCH", 100))
+stream_claim_idle_ms = int(os.getenv("STREAM_CLAIM_IDLE_MS", 60000))
+
+_submission_encoder = msgspec.json.Encoder()
+_submission_decoder = msgspec.json.Decoder(Submission)
+
+
+def stream_name(shard: int) -> str:
+    return f"{stream_prefix}:{shard}"
+
+
+def shard_for(key: str, shards: int = stream_shards) -> int:
+    # crc32 is stable across processes and hosts, unlike hash() on strings
+    return zlib.crc32(str(key).encode()) % shards
+
+
+async def _ensure_group(stream: str, group: str) -> None:
+    try:
+        await redis_client.xgroup_create(stream, group, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+class StreamPublisher:
+    """
+    Drop-in replacement for SubmissionQueue on the listener side: `submit`
+    appends the submission to its shard's stream instead of a local queue.
+    """
+    def __init__(self, shards: int = stream_shards, maxlen: int = stream_maxlen):
+        self.shards = shards
+        self.maxlen = maxlen
+        self.published = 0
+        self.failed = 0
+        self.total_publish = 0.0
+        self.last_depth = 0
+        self.peak_depth = 0
+        self._monitor: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return True
+
+    async def start(self) -> None:
+        for shard in range(self.shards):
+            await _ensure_group(stream_name(shard), stream_group)
+        self._monitor = asyncio.create_task(self._monitor_depth())
+        logger.info("StreamPublisher", f"Publishing submissions to {self.shards} streams ({stream_prefix}:*)")
+
+    async def stop(self) -> None:
+        if self._monitor:
+            self._monitor.cancel()
+
+    async def submit(self, key: str, submission: Submission, dedup_key: Optional[str] = None) -> str:
+        """
+        Publish a submission to the stream for its key. The stream is the durable copy, so
+        `dedup_key` is claimed first and released again if Redis rejects the submission.
+        """
+        if dedup_key and await deduplicator.is_duplicate(dedup_key):
+            return DUPLICATE
+        started = time.perf_counter()
+        try:
+            await redis_client.xadd(
+                stream_name(shard_for(key, self.shards)),
+                {"data": _submission_encoder.encode(submission)},
+                maxlen=self.maxlen,
+                approximate=True
+            )
+        except Exception as e:
+            self.failed += 1
+            logger.error("StreamPublisher", f"Failed to publish submission: {e}", e)
+            if dedup_key:
+                await deduplicator.release(dedup_key)
+            return OVERFLOWED
+        self.published += 1
+        self.total_publish += time.perf_counter() - started
+        return ACCEPTED
+
+    async def submit_many(self, entries: List[Tuple[str, Submission, Optional[str]]]) -> List[str]:
+        """Publish (key, submission, dedup_key) entries in order, stopping at the first that fails"""
+        results = []
+        for key, submission, dedup_key in entries:
+            if results and results[-1] == OVERFLOWED:
+                results.append(OVERFLOWED)
+            else:
+                results.append(await self.submit(key, submission, dedup_key))
+        return results
+
+    async def depth(self) -> int:
+        """Entries not yet delivered to a worker, across all shards"""
+        depth = 0
+        for shard in range(self.shards):
+            try:
+                for group in await redis_client.xinfo_groups(stream_name(shard)):
+                    if group["name"] == stream_group:
+                        depth += group.get("lag") or 0
+            except ResponseError:
+                continue
+        return depth
+
+    async def _monitor_depth(self, interval: float = 10) -> None:
+        # get_stats is synchronous (it mirrors SubmissionQueue's), so it reports the last sample
+        while True:
+            try:
+                self.last_depth = await self.depth()
+                self.peak_depth = max(self.peak_depth, self.last_depth)
+            except Exception as e:
+                logger.error("StreamPublisher", f"Failed to measure stream depth: {e}", e)
+            await asyncio.sleep(interval)
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        # Same shape as SubmissionQueue.get_stats so the metrics embed works in either mode
+        return {
+            "workers": self.shards,
+            "capacity": self.maxlen,
+            "depth": self.last_depth,
+            "peak_depth": self.peak_depth,
+            "enqueued": self.published,
+            "processed": self.published,
+            "failed": self.failed,
+            "blocked": 0,
+            "overflowed": self.failed,
+            "avg_wait_ms": (self.total_publish / self.published) * 1000 if self.published else 0.0
+        }
+
+
+class StreamWorker:
+    """
+    Consumes the shards owned by one worker process and hands each submission
+    to `handler`, in order per shard.
+    """
+    def __init__(self, handler: Callable[[Submission], Awaitable[None]],
+                 worker_index: int = 0,
+                 worker_count: int = 1,
+                 consumer: Optional[str] = None,
+                 shards: int = stream_shards):
+        if not 0 <= worker_index < worker_count:
+            raise ValueError(f"worker_index must be between 0 and {worker_count - 1}")
+        self.handler = handler
+        self.streams = [stream_name(shard) for shard in range(shards) if shard % worker_count == worker_index]
+        # Stable per slot, so a restarted worker reads back its own pending entries
+        self.consumer = consumer or f"{socket.gethostname()}-{worker_index}"
+        self.processed = 0
+        self.failed = 0
+        self.reclaimed = 0
+        self._running = False
+
+    async def run(self) -> None:
+        for stream in self.streams:
+            await _ensure_group(stream, stream_group)
+        logger.info("StreamWorker", f"{self.consumer} consuming {len(self.streams)} streams: {', '.join(self.streams)}")
+        self._running = True
+        # Entries this consumer read but never acknowledged before it last stopped, all of
+        # them before any new entry so each player's submissions stay in order
+        while await self._poll(start_id="0"):
+            pass
+        last_claim = 0.0
+        while self._running:
+            if time.monotonic() - last_claim >= stream_claim_idle_ms / 1000:
+                await self._reclaim()
+                last_claim = time.monotonic()
+            await self._poll()
+
+    def stop(self) -> None:
+        self._running = False
+
+    async def _poll(self, start_id: str = ">") -> int:
+        """Handle the next batch of entries from every stream; returns how many there were"""
+        response = await redis_client.xreadgroup(
+            stream_group,
+            self.consumer,
+            {stream: start_id for stream in self.streams},
+            count=stream_batch,
+            block=None if start_id != ">" else stream_block_ms
+        )
+        if not response:
+            return 0
+        # Reads of pending entries ("0") list every stream, with nothing left as []
+        await asyncio.gather(*(self._handle_entries(stream, entries) for stream, entries in response if entries))
+        return sum(len(entries) for _, entries in response)
+
+    async def _reclaim(self) -> None:
+        """Take over entries left pending by consumers that have stopped acknowledging them"""
+        for stream in self.streams:
+            start_id = "0-0"
+            while True:
+                result = await redis_client.xautoclaim(
+                    stream,
+                    stream_group,
+                    self.consumer,
+                    stream_claim_idle_ms,
+                    start_id,
+                    count=stream_batch
+                )
+                start_id, entries = result[0], result[1]
+                if entries:
+                    self.reclaimed += len(entries)
+                    logger.warning("StreamWorker", f"Reclaimed {len(entries)} idle entries from {stream}")
+                    await self._handle_entries(stream, entries)
+                if start_id == "0-0":
+                    break
+
+    async def _handle_entries(self, stream: str, entries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        acked = []
+        for entry_id, fields in entries:
+            # Entries deleted by MAXLEN trimming come back from XAUTOCLAIM without fields
+            if fields and "data" in fields:
+                try:
+                    await self.handler(_submission_decoder.decode(fields["data"]))
+                    self.processed += 1
+                except Exception as e:
+                    # Acknowledged regardless, so a poison entry can't wedge the shard
+                    self.failed += 1
+                    logger.error("StreamWorker", f"Unhandled error while processing {stream} entry {entry_id}: {e}", e)
+            acked.append(entry_id)
+        if acked:
+            await redis_client.xack(stream, stream_group, *acked)
+
+
+class NotificationRelay:
+    """
+    Carries committed drops from worker processes back to the bot process,
+    which checks them against group notification thresholds.
+    """
+    stream = f"{stream_prefix}:notify"
+    group = "notifier"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = None
+
+    async def publish(self, drops: List[Any]) -> None:
+        try:
+            await redis_client.xadd(
+                self.stream,
+                {"data": self._encoder.encode(drops)},
+                maxlen=stream_maxlen,
+                approximate=True
+            )
+        except Exception as e:
+            logger.error("NotificationRelay", f"Failed to relay {len(drops)} drops for notification: {e}", e)
+
+    async def consume(self, handler: Callable[[List[Any]], Awaitable[None]]) -> None:
+        from submissions.processor import DropRow
+        self._decoder = msgspec.json.Decoder(List[DropRow])
+        consumer = socket.gethostname()
+        await _ensure_group(self.stream, self.group)
+        while True:
+            try:
+                response = await redis_client.xreadgroup(
+                    self.group, consumer, {self.stream: ">"},
+                    count=stream_batch, block=stream_block_ms
+                )
+                for _, entries in response or []:
+                    for entry_id, fields in entries:
+                        await handler(self._decoder.decode(fields["data"]))
+                    await redis_client.xack(self.stream, self.group, *(entry_id for entry_id, _ in entries))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("NotificationRelay", f"Error consuming drop notifications: {e}", e)
+                await asyncio.sleep(1)
+
+
+async def run_worker(worker_index: int, worker_count: int, consumer: Optional[str] = None) -> None:
+    # Each worker process spools to its own directory, so several can share a host
+    os.environ["SPOOL_DIR"] = os.path.join(os.getenv("SPOOL_DIR", "data/spool"), f"worker-{worker_index}")
+    from cache.npc_registry import NpcRegistry
+    from cache.item_catalogue import ItemCatalogue
+    from events import process_submission, batch_processors, drop_processor
+
+    NpcRegistry().load()
+    ItemCatalogue().load()
+    drop_processor.notify_drops = NotificationRelay().publish
+    for processor in batch_processors:
+        replayed = await processor.replay_spool()
+        if replayed:
+            logger.info("run_worker", f"Replayed {replayed} spooled {processor.name} from the last run")
+
+    worker = StreamWorker(process_submission, worker_index, worker_count, consumer)
+    try:
+        await worker.run()
+    finally:
+        for processor in batch_processors:
+            await processor.flush_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consume submissions from the Redis Streams ingestion bus")
+    parser.add_argument("--worker-index", type=int, default=int(os.getenv("STREAM_WORKER_INDEX", 0)))
+    parser.add_argument("--worker-count", type=int, default=int(os.getenv("STREAM_WORKER_COUNT", 1)))
+    parser.add_argument("--consumer", default=None, help="Consumer name (defaults to <hostname>-<worker index>)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_worker(args.worker_index, args.worker_count, args.consumer))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# models.base connects at import time; point it at a throwaway SQLite database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("LOG_TO_DATABASE", "0")
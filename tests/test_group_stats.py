@@ -0,0 +1,22 @@
+import asyncio
+import fakeredis
+from cache import player_stats
+from cache.player_stats import GroupStatsCache
+from models import Drop
+
+
+def test_increments_on_an_unbuilt_month_expire(monkeypatch):
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(player_stats, "redis_client", redis)
+    drop = Drop(item_id=4151, npc_id=415, value=2500, quantity=1)
+    keys = GroupStatsCache._get_cache_keys(7, 199001)
+
+    async def run():
+        pipe = redis.pipeline()
+        GroupStatsCache.queue_drop_update(pipe, 199001, drop, [7], 0)
+        await pipe.execute()
+        assert not await redis.exists(keys['built'])
+        for name in ('stats', 'items', 'bosses'):
+            assert 0 < await redis.ttl(keys[name]) <= GroupStatsCache.cache_ttl
+
+    asyncio.run(run())
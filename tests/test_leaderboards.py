@@ -0,0 +1,33 @@
+import asyncio
+import fakeredis
+from sqlalchemy import insert
+from cache import leaderboards as leaderboards_module
+from cache.leaderboards import LootLeaderboards
+from models import PlayerMonthTotal
+from models.base import Base, engine, unit_of_work
+
+
+def test_global_total_follows_rebuilds_and_increments(monkeypatch):
+    Base.metadata.create_all(engine)
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(leaderboards_module, "redis_client", redis)
+    leaderboards = LootLeaderboards()
+    partition = 199001
+
+    async def run():
+        async with unit_of_work() as db:
+            await db.execute(insert(PlayerMonthTotal), [
+                {"player_id": 1, "partition": partition, "total_value": 700, "total_drops": 2},
+                {"player_id": 2, "partition": partition, "total_value": 300, "total_drops": 1},
+            ])
+        # Built from the rollups on the first read
+        assert await leaderboards.get_total(partition) == 1000
+
+        pipe = redis.pipeline()
+        leaderboards.queue_increment(pipe, partition, 2, 250)
+        leaderboards.queue_increment(pipe, partition, 3, 50)
+        await pipe.execute()
+        top = await leaderboards.get_top(partition)
+        assert await leaderboards.get_total(partition) == sum(value for _, value in top) == 1300
+
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+from sqlalchemy import insert
+from models import Player, User
+from models.base import Base, engine, unit_of_work
+from cogs import qualifier
+from utils import message_builder
+
+
+def test_drop_embed_from_player_loaded_for_notifications(monkeypatch):
+    Base.metadata.create_all(engine)
+
+    async def get_rank(player_id, partition, group_id=None):
+        return (1, 5_000_000, 10)
+
+    async def get_member_count(group_id=None):
+        return 3
+
+    async def get_total(partition):
+        return 50_000_000
+
+    monkeypatch.setattr(message_builder.leaderboards, "get_rank", get_rank)
+    monkeypatch.setattr(message_builder.leaderboards, "get_total", get_total)
+    monkeypatch.setattr(message_builder.leaderboards, "get_member_count", get_member_count)
+    monkeypatch.setattr(message_builder, "get_item_name", lambda item_id: "Abyssal whip")
+
+    async def run():
+        async with unit_of_work() as db:
+            user_id = (await db.execute(
+                insert(User).values(discord_id="1234", username="Zezima#1", auth_token="token")
+            )).inserted_primary_key[0]
+            player_id = (await db.execute(
+                insert(Player).values(player_name="Zezima", wom_id=99, user_id=user_id)
+            )).inserted_primary_key[0]
+        # The players' session is closed before any embed is built
+        [player] = await qualifier.load_players([player_id])
+        drop = SimpleNamespace(partition=202601, item_id=4151, value=1_500_000, quantity=1, player_id=player_id)
+        return await message_builder.generate_drop_embed(1, drop, player)
+
+    embed = asyncio.run(run())
+    assert embed.author.name == "Zezima#1"
+    assert "Global Rank: `#1`" in embed.fields[0].value
@@ -0,0 +1,47 @@
+import interactions
+from submissions.parser import parse_embed, parse_record
+
+
+def build_embed(fields):
+    embed = interactions.Embed(title="drop submission")
+    for name, value in fields:
+        embed.add_field(name=name, value=value, inline=True)
+    return embed
+
+
+DROP_FIELDS = [
+    ("type", "drop"),
+    ("player", "Zezima"),
+    ("acc_hash", "123456789"),
+    ("item", "Abyssal whip"),
+    ("id", "4151"),
+    ("source", "Abyssal demon"),
+    ("quantity", "1"),
+    ("value", "1500000"),
+    ("type", "npc"),
+    ("p_v", "3.0"),
+]
+
+
+def test_drop_embed_keeps_dispatch_and_source_types():
+    submission = parse_embed(build_embed(DROP_FIELDS))
+    assert submission.type == "drop"
+    assert submission.source_type == "npc"
+    assert submission.item_id == 4151
+    assert submission.npc == "Abyssal demon"
+    assert submission.value == 1500000
+
+
+def test_drop_embed_without_source_type():
+    fields = [field for field in DROP_FIELDS if field != ("type", "npc")]
+    submission = parse_embed(build_embed(fields))
+    assert submission.type == "drop"
+    assert submission.source_type is None
+
+
+def test_record_source_type():
+    submission = parse_record({"type": "drop", "player": "Zezima", "acc_hash": 123456789,
+                               "id": 4151, "source": "Abyssal demon", "source_type": "npc"})
+    assert submission.type == "drop"
+    assert submission.source_type == "npc"
+    assert submission.acc_hash == "123456789"
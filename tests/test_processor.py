@@ -0,0 +1,40 @@
+import asyncio
+from sqlalchemy import func, select
+from models import PersonalBestEntry
+from models.base import Base, engine, unit_of_work
+from submissions import processor as processors
+from submissions.processor import PersonalBestProcessor, PersonalBestRow
+
+
+def test_failed_batch_is_retried_from_its_spool_segment(monkeypatch, tmp_path):
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(processors, "spool_dir", str(tmp_path))
+    monkeypatch.setattr(processors, "spool_retry_interval", 0.01)
+    processor = PersonalBestProcessor(batch_size=10)
+    write, dispatched, attempts = processor._write, [], []
+
+    async def flaky_write(rows, batch_id=None):
+        attempts.append(batch_id)
+        if len(attempts) == 1:
+            raise ConnectionError("lost connection to the database")
+        await write(rows, batch_id)
+
+    async def dispatch(rows, notify=True):
+        dispatched.extend(rows)
+
+    monkeypatch.setattr(processor, "_write", flaky_write)
+    monkeypatch.setattr(processor, "_dispatch_batch", dispatch)
+
+    async def run():
+        await processor._enqueue(PersonalBestRow(1, 1, 60, 55, False, None, None))
+        await processor.flush_all()
+        assert processor.pending == [] and dispatched == []
+        await processor._retry_task
+        async with unit_of_work() as db:
+            return (await db.execute(select(func.count()).select_from(PersonalBestEntry)
+                                     .where(PersonalBestEntry.kill_time == 60))).scalar()
+
+    assert asyncio.run(run()) == 1
+    assert len(attempts) == 2 and attempts[0] == attempts[1]
+    assert len(dispatched) == 1
+    assert processor.spool.replay() == []
@@ -0,0 +1,111 @@
+import asyncio
+import fakeredis
+import pytest
+from cache import dedup
+from submissions import queue as submission_queue
+from submissions.parser import Submission
+from submissions.queue import ACCEPTED, DUPLICATE, OVERFLOWED, SubmissionQueue
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(submission_queue, "spool_dir", str(tmp_path))
+    monkeypatch.setattr(dedup, "redis_client", fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(submission_queue.deduplicator, "_seen", type(submission_queue.deduplicator._seen)())
+
+
+def drop(player: str, value: int) -> Submission:
+    return Submission(type="drop", player=player, acc_hash=f"hash-{player}", item_id=4151, value=value)
+
+
+def recording_queue(handled: list) -> SubmissionQueue:
+    async def handler(submission):
+        handled.append((submission.player, submission.value))
+    return SubmissionQueue(handler, workers=2)
+
+
+def test_spooled_submissions_are_replayed_after_a_crash():
+    handled = []
+
+    async def run():
+        # Accepted by a run whose workers never got to handle them
+        crashed = recording_queue([])
+        assert await crashed.submit("hash-a", drop("a", 1), "message-1:0") == ACCEPTED
+        assert await crashed.submit("hash-a", drop("a", 2)) == ACCEPTED
+        crashed.spool.rotate()
+
+        restarted = recording_queue(handled)
+        await restarted.start()
+        await restarted.stop()
+        return restarted
+
+    restarted = asyncio.run(run())
+    assert handled == [("a", 1), ("a", 2)]
+    assert restarted.replayed == 2
+    # Everything was handled, so nothing is left to replay
+    assert restarted.spool.replay() == []
+
+
+def test_replay_skips_submissions_claimed_by_another_delivery():
+    handled = []
+
+    async def run():
+        crashed = recording_queue([])
+        await crashed.submit("hash-b", drop("b", 1), "message-2:0")
+        crashed.spool.rotate()
+        # A redelivery on another node won the key before the crashed record was claimed
+        await submission_queue.deduplicator.release("message-2:0")
+        await submission_queue.deduplicator.is_duplicate("message-2:0", "other-node")
+
+        restarted = recording_queue(handled)
+        await restarted.start()
+        assert await restarted.submit("hash-b", drop("b", 1), "message-2:0") == DUPLICATE
+        await restarted.stop()
+
+    asyncio.run(run())
+    assert handled == []
+
+
+def test_submissions_before_start_are_held_behind_the_replay():
+    handled = []
+
+    async def run():
+        async def stuck(submission):
+            await asyncio.Event().wait()
+
+        crashed = SubmissionQueue(stuck, workers=2)
+        await crashed.start()
+        await crashed.submit("hash-c", drop("c", 1))
+        crashed.spool.rotate()
+        for task in crashed._workers + [crashed._checkpointer]:
+            task.cancel()
+
+        restarted = recording_queue(handled)
+        # Arrives while the processors are still replaying, before start()
+        assert await restarted.submit("hash-c", drop("c", 2)) == ACCEPTED
+        await asyncio.sleep(0.05)
+        assert handled == [] and not restarted.running
+        await restarted.start()
+        await restarted.stop()
+
+    asyncio.run(run())
+    assert handled == [("c", 1), ("c", 2)]
+
+
+def test_overflow_releases_the_dedup_key():
+    async def run():
+        async def stuck(submission):
+            await asyncio.Event().wait()
+
+        queue = SubmissionQueue(stuck, workers=1, max_size=1, put_timeout=0.01)
+        await queue.start()
+        # One being handled, one waiting, then the queue is full
+        assert await queue.submit("hash-d", drop("d", 1), "message-3:0") == ACCEPTED
+        await asyncio.sleep(0)
+        assert await queue.submit("hash-d", drop("d", 2), "message-3:1") == ACCEPTED
+        assert await queue.submit("hash-d", drop("d", 3), "message-3:2") == OVERFLOWED
+        # The replay of the dropped message isn't suppressed
+        assert not await submission_queue.deduplicator.is_duplicate("message-3:2")
+        assert await submission_queue.deduplicator.is_duplicate("message-3:1")
+
+    asyncio.run(run())
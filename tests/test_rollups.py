@@ -0,0 +1,30 @@
+import asyncio
+from sqlalchemy import select
+from models import PlayerMonthItem
+from models.base import Base, engine, unit_of_work
+from submissions import rollups
+from submissions.processor import DropRow
+
+
+def test_merge_fallback_adds_to_existing_rows(monkeypatch):
+    Base.metadata.create_all(engine)
+    # As on a dialect without an upsert
+    monkeypatch.setattr(rollups, "upsert", lambda dialect, table: None)
+    partition = 199002
+
+    def drop(item_id, quantity, value):
+        return DropRow(item_id=item_id, player_id=1, npc_id=None, value=value, quantity=quantity,
+                       image_url=None, plugin_version=None, partition=partition, date_added=None)
+
+    async def run():
+        async with unit_of_work() as db:
+            await rollups.apply(db, [drop(4151, 1, 100)])
+        async with unit_of_work() as db:
+            await rollups.apply(db, [drop(4151, 2, 200), drop(11840, 1, 50)])
+        async with unit_of_work() as db:
+            return (await db.execute(
+                select(PlayerMonthItem.item_id, PlayerMonthItem.quantity, PlayerMonthItem.value)
+                .where(PlayerMonthItem.partition == partition).order_by(PlayerMonthItem.item_id)
+            )).all()
+
+    assert asyncio.run(run()) == [(4151, 3, 300), (11840, 1, 50)]
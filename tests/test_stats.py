@@ -0,0 +1,8 @@
+from cache.stats import Histogram
+
+
+def test_percentiles_never_exceed_the_largest_value():
+    histogram = Histogram([10, 100, 1000])
+    histogram.observe(42)
+    snapshot = histogram.snapshot()
+    assert snapshot["p50"] == snapshot["p99"] == snapshot["max"] == 42
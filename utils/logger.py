@@ -1,11 +1,21 @@
-from models.log import Log
-from models.base import session
+import atexit
+import os
+import queue
+import threading
 import traceback
 import time
 from typing import Optional
 
+## Set LOG_TO_DATABASE=0 to only print (e.g. for benchmarks on SQLite, which allows a single writer)
+log_to_database = os.getenv("LOG_TO_DATABASE", "1") == "1"
+
+_writer_lock = threading.Lock()
+
+
 class Logger:
     _instance = None
+    _writer: Optional[threading.Thread] = None
+    _pending: Optional[queue.Queue] = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -14,7 +24,8 @@ class Logger:
     
     def log(self, level: str, source: str, message: str, details: Optional[str] = None) -> None:
         """
-        Log a message to the database
+        Log a message to the database. The entry is written by a background thread, in
+        batches, so this returns without waiting on the database.
         
         Args:
             level: Log level (INFO, WARNING, ERROR, DEBUG)
@@ -22,20 +33,57 @@ class Logger:
             message: Main log message
             details: Optional additional details or stack trace
         """
-        try:
-            log_entry = Log(
-                level=level.upper(),
-                source=source,
-                message=message,
-                details=details,
-                timestamp=int(time.time())
-            )
-            session.add(log_entry)
-            print(f"[{level}] {source}: {message}")
-            session.commit()
-        except Exception as e:
-            print(f"Failed to write log to database: {e}")
-            session.rollback()
+        print(f"[{level}] {source}: {message}")
+        if not log_to_database:
+            return
+        self._start_writer()
+        self._pending.put({
+            "level": level.upper(),
+            "source": source,
+            "message": message,
+            "details": details,
+            "timestamp": int(time.time())
+        })
+    
+    def _start_writer(self) -> None:
+        """
+        Start the thread that writes queued entries to the database, so logging from
+        the event loop never waits on a database round trip
+        """
+        if self._writer is not None:
+            return
+        with _writer_lock:
+            if self._writer is None:
+                self._pending = queue.Queue()
+                self._writer = threading.Thread(target=self._write_entries, name="log-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self._stop_writer)
+    
+    def _write_entries(self) -> None:
+        # Imported here so that importing the logger never pulls in (and cycles back through) the models package
+        from models.base import engine
+        from models.log import Log
+        stopping = False
+        while not stopping:
+            entries = [self._pending.get()]
+            while not self._pending.empty():
+                entries.append(self._pending.get_nowait())
+            if None in entries:
+                stopping = True
+                entries = [entry for entry in entries if entry is not None]
+            if not entries:
+                continue
+            try:
+                # Its own connection; the shared session belongs to the event loop's thread
+                with engine.begin() as connection:
+                    connection.execute(Log.__table__.insert(), entries)
+            except Exception as e:
+                print(f"Failed to write {len(entries)} log(s) to database: {e}")
+    
+    def _stop_writer(self, timeout: float = 5.0) -> None:
+        """Write out whatever is still queued before the process exits"""
+        self._pending.put(None)
+        self._writer.join(timeout)
     
     def info(self, source: str, message: str) -> None:
         self.log("INFO", source, message)
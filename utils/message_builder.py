@@ -3,9 +3,9 @@ from typing import Dict, List, Optional
 import interactions
 from interactions import Embed, Button, ButtonStyle, InteractionType, Message, SlashContext
 
-from utils.rankings import get_global_rankings
+from cache.player_stats import GroupStatsCache, leaderboards
 from models import Log, Drop, Player, User
-from utils.misc import build_wiki_url, get_group_player_ids, get_item_name, get_player_cache
+from utils.misc import build_wiki_url, get_item_name, get_player_cache
 from utils.num import format_number
 
 
@@ -64,6 +64,51 @@ def create_metrics_embed(metrics: dict) -> Embed:
             inline=True
         )
     
+    # Add ingestion queue stats, when the caller provides them
+    if 'ingestion' in metrics:
+        ingestion = metrics['ingestion']
+        embed.add_field(
+            name="Ingestion Queue",
+            value=f"""
+            **Depth:** `{ingestion['depth']}/{ingestion['capacity']}` (peak `{ingestion['peak_depth']}`)
+            **Workers:** `{ingestion['workers']}`
+            **Processed:** `{format_number(ingestion['processed'])}` (`{ingestion['failed']}` failed)
+            **Backpressure:** `{ingestion['blocked']}` blocked, `{ingestion['overflowed']}` overflowed
+            **Avg wait:** `{ingestion['avg_wait_ms']:.1f}ms`
+            **Duplicates suppressed:** `{format_number(ingestion.get('duplicates', 0))}`
+            """.strip(),
+            inline=False
+        )
+    
+    if 'drop_writes' in metrics:
+        writes = metrics['drop_writes']
+        sizes = writes['flush_size']
+        latency = writes['flush_latency_ms']
+        embed.add_field(
+            name="Drop Writes",
+            value=f"""
+            **Pending:** `{writes['pending']}` (flush at `{writes['batch_size']}` or `{writes['flush_interval_ms']}ms`)
+            **Flushes:** `{format_number(sizes['count'])}`
+            **Batch size:** p50 `{sizes['p50']:.0f}` / p99 `{sizes['p99']:.0f}` / max `{sizes['max']:.0f}`
+            **Latency:** p50 `{latency['p50']:.0f}ms` / p99 `{latency['p99']:.0f}ms`
+            """.strip(),
+            inline=False
+        )
+    
+    if 'submission_writes' in metrics:
+        lines = []
+        for name, writes in metrics['submission_writes'].items():
+            lines.append(
+                f"**{name.replace('_', ' ').title()}:** `{writes['pending']}` pending, "
+                f"`{format_number(writes['flush_size']['count'])}` flushes, "
+                f"p99 `{writes['flush_latency_ms']['p99']:.0f}ms`"
+            )
+        embed.add_field(
+            name="Other Submission Writes",
+            value="\n".join(lines),
+            inline=False
+        )
+    
     # Add current period stats
     current_stats = "\n".join([
         f"**{metric_type.title()}:** `{format_number(metrics[metric_type]['current']['hourly'])}`"
@@ -179,10 +224,18 @@ async def generate_lootboard_embed(total_players: int) -> Embed:
     embed.set_thumbnail(url="https://joelhalen.github.io/droptracker-small.gif")
     return embed
 
-async def generate_drop_embed(group_wom_id: int, drop: Drop) -> Embed:
-    """Generate a drop embed with player and group statistics"""
+async def generate_drop_embed(group_wom_id: int, drop: Drop, player: Optional[Player] = None,
+                              group_id: Optional[int] = None) -> Embed:
+    """Generate a drop embed with player and group statistics
+    
+    Args:
+        group_wom_id: WiseOldMan ID of the group the embed is being sent to
+        drop: The drop being announced (an ORM Drop or a batched drop row)
+        player: The player who received the drop; defaults to `drop.player`
+        group_id: The group's ID, for its leaderboard; the global leaderboard is used if omitted
+    """
     # Get player info
-    player: Player = drop.player
+    player: Player = player or drop.player
     raw_display_name = player.player_name
     current_month_str = datetime.now().strftime("%B")
     drop_partition = drop.partition
@@ -201,28 +254,16 @@ async def generate_drop_embed(group_wom_id: int, drop: Drop) -> Embed:
     )
     embed.set_author(name=raw_display_name, icon_url="https://joelhalen.github.io/droptracker-small.gif")
     
-    # Get player stats
-    player_cache = get_player_cache(player.player_id)
-    player_monthly = await player_cache.get_player_stats(drop_partition)
-    player_monthly_total = player_monthly['total'].get("total_value", 0)
-    
-    # Get group stats
-    group_members = await get_group_player_ids(group_wom_id, as_player_ids=True)
-    player_totals = []
-    total_group_value = 0
-    
-    # Calculate group totals and rankings
-    for player_id in group_members:
-        member_cache = get_player_cache(player_id)
-        member_monthly = await member_cache.get_player_stats(drop_partition)
-        member_total = member_monthly['total'].get("total_value", 0)
-        player_totals.append(member_total)
-        total_group_value += member_total
-    
-    # Calculate rankings
-    player_rank = sorted(player_totals, reverse=True).index(player_monthly_total) + 1
-    global_rankings = await get_global_rankings(drop_partition)
-    global_rank = global_rankings.index(player.player_id) + 1
+    # Get player and group stats for the drop's month from the leaderboards and group aggregates
+    global_rank, player_monthly_total, _ = await leaderboards.get_rank(player.player_id, drop_partition)
+    if group_id is not None:
+        player_rank, _, _ = await leaderboards.get_rank(player.player_id, drop_partition, group_id)
+        group_monthly = await GroupStatsCache.get_group_stats(group_id, drop_partition)
+        total_group_value = group_monthly["general"]["total_value"]
+    else:
+        player_rank = global_rank
+        total_group_value = await leaderboards.get_total(drop_partition)
+    group_member_count = await leaderboards.get_member_count(group_id)
     
     # Format stats sections
     player_stats = (
@@ -233,7 +274,7 @@ async def generate_drop_embed(group_wom_id: int, drop: Drop) -> Embed:
     
     group_stats = (
         f"Group total: `{format_number(total_group_value)}`\n"
-        f"Tracked players: `{len(group_members)}`"
+        f"Tracked players: `{group_member_count}`"
     )
     
     # Add fields to embed
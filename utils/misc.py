@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import List, Optional, Tuple, TYPE_CHECKING
 from utils import wiseoldman
 from utils.logger import Logger
-from models.base import session
+from models.base import unit_of_work
 
 logger = Logger()
 
@@ -93,7 +93,9 @@ def are_names_equivalent(name1: str, name2: str) -> bool:
     return norm1.strip() == norm2.strip()
 
 def get_item_name(item_id: int) -> str:
-    return session.query(ItemList).filter(ItemList.item_id == item_id).first().item_name
+    """Look up an item's name from the in-memory item catalogue"""
+    from cache.item_catalogue import ItemCatalogue
+    return ItemCatalogue().get_name(item_id)
 
 def build_wiki_url(item_name: str) -> str:
     item_name = item_name.replace(" ", "_")
@@ -104,7 +106,10 @@ async def get_group_player_ids(group_wom_id: int, as_player_ids: bool = False) -
         Get a list of player WiseOldMan IDs for a specific group
     """
     if as_player_ids:
-        return [player.player_id for player in session.query(Player.player_id).filter(Player.wom_id == group_wom_id).all()]
+        from sqlalchemy import select
+        from models import Player
+        async with unit_of_work(read_only=True) as db:
+            return list((await db.execute(select(Player.player_id).where(Player.wom_id == group_wom_id))).scalars())
     else:
         return await wiseoldman.fetch_group_members(group_wom_id)
         
\ No newline at end of file
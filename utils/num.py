@@ -1,16 +1,15 @@
-from models.base import session
-from models import NpcList
+from cache.npc_registry import NpcRegistry
 from utils.logger import Logger
 
 logger = Logger()
+npc_registry = NpcRegistry()
 
 async def get_npc_id(npc_name: str) -> int:
-    """Get the NPC ID for the passed NPC name"""
+    """Get the NPC ID for the passed NPC name, from the in-memory NPC registry"""
     try:
-        npc = session.query(NpcList).filter(NpcList.npc_name == npc_name).first()
-        return npc.npc_id if npc else None
+        return npc_registry.get_id(npc_name)
     except Exception as e:
-        logger.error(f"get_npc_id", "No stored NPC ID found for {npc_name}", e)
+        logger.error("get_npc_id", f"No stored NPC ID found for {npc_name}", e)
         return None
 
 def format_number(num: float) -> str:   
@@ -0,0 +1,153 @@
+"""
+Maintenance of the monthly RANGE partitions on `drops` (MySQL only).
+
+Each month's drops live in their own partition, p<YYYYMM>, followed by a
+catch-all `pmax`. `maintain_partitions` runs daily from main.py and:
+
+- splits upcoming months out of `pmax` before any rows land in them, so the
+  REORGANIZE only ever touches an empty partition;
+- with DROP_RETENTION_MONTHS set, removes months older than that, either
+  exchanging each into its own `drops_archive_<YYYYMM>` table (the default) or,
+  with DROP_ARCHIVE=0, dropping it outright. Both are metadata operations
+  rather than a DELETE over millions of rows. A run that fails part way through
+  an archive picks up where it stopped on the next run.
+
+It can also be run by hand:
+
+    python -m utils.partitions
+    python -m utils.partitions --retain 24 --no-archive
+"""
+import argparse
+import asyncio
+import os
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from models.base import engine
+from utils.logger import Logger
+from utils.misc import get_partition
+
+load_dotenv()
+
+logger = Logger()
+
+partitions_ahead = int(os.getenv("DROP_PARTITIONS_AHEAD", 2))
+retention_months = int(os.getenv("DROP_RETENTION_MONTHS", 0))  # 0 keeps every month
+archive_expired = os.getenv("DROP_ARCHIVE", "1") != "0"
+
+
+def month_after(partition: int) -> int:
+    year, month = divmod(partition, 100)
+    return (year + 1) * 100 + 1 if month == 12 else partition + 1
+
+
+def months_before(partition: int, months: int) -> int:
+    year, month = divmod(partition, 100)
+    index = year * 12 + (month - 1) - months
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def get_partitions(connection: Connection) -> Dict[str, Optional[int]]:
+    """Partition name -> exclusive upper bound (None for MAXVALUE); empty if `drops` isn't partitioned"""
+    rows = connection.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM INFORMATION_SCHEMA.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'drops' AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    )).all()
+    return {name: None if bound == "MAXVALUE" else int(bound) for name, bound in rows}
+
+
+def ensure_future_partitions(connection: Connection, months_ahead: int = partitions_ahead) -> List[int]:
+    """Split the months up to `months_ahead` from now out of pmax; returns the months created"""
+    partitions = get_partitions(connection)
+    if "pmax" not in partitions:
+        return []
+    bounds = [bound for bound in partitions.values() if bound is not None]
+    current, _ = get_partition()
+    # The first month not yet covered by its own partition
+    month = max(bounds) if bounds else current
+    last = current
+    for _ in range(months_ahead):
+        last = month_after(last)
+    created = []
+    while month <= last:
+        created.append(month)
+        month = month_after(month)
+    if created:
+        definitions = [f"PARTITION p{month} VALUES LESS THAN ({month_after(month)})" for month in created]
+        definitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        connection.execute(text(f"ALTER TABLE drops REORGANIZE PARTITION pmax INTO ({', '.join(definitions)})"))
+    return created
+
+
+def _archive_partitioned(connection: Connection, table: str) -> Optional[bool]:
+    """Whether an archive table is still partitioned; None if it doesn't exist"""
+    count = connection.execute(text(
+        "SELECT COUNT(PARTITION_NAME) FROM INFORMATION_SCHEMA.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table GROUP BY TABLE_NAME"
+    ), {"table": table}).scalar()
+    return None if count is None else count > 0
+
+
+def _partition_empty(connection: Connection, month: int) -> bool:
+    return connection.execute(text(f"SELECT 1 FROM drops PARTITION (p{month}) LIMIT 1")).first() is None
+
+
+def expire_partitions(connection: Connection, retain: int = retention_months,
+                      archive: bool = archive_expired) -> List[int]:
+    """Archive or drop the months more than `retain` months old; returns the months removed"""
+    if retain <= 0:
+        return []
+    current, _ = get_partition()
+    cutoff = months_before(current, retain - 1)
+    expired = [int(name[1:]) for name, bound in get_partitions(connection).items()
+               if name != "pmax" and bound is not None and int(name[1:]) < cutoff]
+    for month in expired:
+        if archive:
+            table = f"drops_archive_{month}"
+            partitioned = _archive_partitioned(connection, table)
+            if partitioned is not None and _partition_empty(connection, month):
+                # Left by a run that failed after the EXCHANGE and before the DROP
+                logger.warning("partitions", f"{table} already holds p{month}; dropping the empty partition")
+            else:
+                # EXCHANGE needs an identical, unpartitioned table; the partition's rows and the
+                # table's (empty) contents swap places without copying anything
+                if partitioned is None:
+                    connection.execute(text(f"CREATE TABLE {table} LIKE drops"))
+                if partitioned is not False:
+                    connection.execute(text(f"ALTER TABLE {table} REMOVE PARTITIONING"))
+                connection.execute(text(f"ALTER TABLE drops EXCHANGE PARTITION p{month} WITH TABLE {table}"))
+        connection.execute(text(f"ALTER TABLE drops DROP PARTITION p{month}"))
+    return expired
+
+
+def _maintain(retain: int, archive: bool) -> None:
+    # DDL commits implicitly on MySQL, so there's nothing to roll back if a step fails
+    with engine.connect() as connection:
+        created = ensure_future_partitions(connection)
+        if created:
+            logger.info("partitions", f"Created drops partitions for {', '.join(map(str, created))}")
+        expired = expire_partitions(connection, retain, archive)
+        if expired:
+            logger.info("partitions", f"{'Archived' if archive else 'Dropped'} drops partitions for "
+                                      f"{', '.join(map(str, expired))}")
+
+
+async def maintain_partitions(retain: int = retention_months, archive: bool = archive_expired) -> None:
+    if engine.dialect.name != "mysql":
+        return
+    try:
+        await asyncio.to_thread(_maintain, retain, archive)
+    except Exception as e:
+        logger.error("partitions", f"Drops partition maintenance failed: {e}", e)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming and expire old monthly partitions of drops")
+    parser.add_argument("--retain", type=int, default=retention_months,
+                        help="Months of drops to keep, including the current one (0 keeps all)")
+    parser.add_argument("--no-archive", action="store_true",
+                        help="Drop expired partitions instead of exchanging them into archive tables")
+    args = parser.parse_args()
+    asyncio.run(maintain_partitions(args.retain, archive_expired and not args.no_archive))
@@ -0,0 +1,158 @@
+"""
+Query-plan regression checks for the queries that read `drops` and its monthly rollups.
+
+Runs EXPLAIN (MySQL) or EXPLAIN QUERY PLAN (SQLite) on each canonical query and
+fails if any of them falls back to a full table scan. Point it at a database
+that has been migrated to head, or let it seed synthetic rows first so the
+optimizer has realistic statistics to work from:
+
+    python -m utils.query_plans
+    python -m utils.query_plans --seed 200000
+    DATABASE_URL=sqlite:///plans.db python -m utils.query_plans --seed 50000 --create
+
+Exits 1 if any plan regressed.
+"""
+import argparse
+import random
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import with_parent
+from sqlalchemy.sql import Select
+from models import Drop, ItemList, NpcList, Player, PlayerMonthItem, PlayerMonthNpc, PlayerMonthTotal
+from models.base import Base, engine
+from cache.leaderboards import LootLeaderboards
+from cache.player_stats import GroupStatsCache, PlayerStatsCache
+from submissions.rollups import ROLLUPS
+from utils.misc import get_partition
+
+PARTITION, _ = get_partition(datetime.now())
+
+## Each canonical query, as issued by the code named in its key
+CANONICAL_QUERIES: Dict[str, Callable[[], Select]] = {
+    # Built by the cache itself, so the checked queries can't drift from the ones it issues
+    "player_stats.rebuild_cache.totals": lambda: PlayerStatsCache._rollup_query(PlayerMonthTotal, [1, 2]),
+    "player_stats.rebuild_cache.items": lambda: PlayerStatsCache._rollup_query(PlayerMonthItem, [1, 2]),
+    "player_stats.rebuild_cache.npcs": lambda: PlayerStatsCache._rollup_query(PlayerMonthNpc, [1, 2]),
+    "group_stats.rebuild.totals": lambda: GroupStatsCache._totals_query(1, PARTITION),
+    "group_stats.rebuild.items": lambda: GroupStatsCache._breakdown_query('items', 1, PARTITION),
+    "group_stats.rebuild.npcs": lambda: GroupStatsCache._breakdown_query('bosses', 1, PARTITION),
+    "leaderboards.rebuild.totals": lambda: LootLeaderboards._totals_query(PARTITION),
+    # The lazy load behind Player.drops; nothing else reads drops, every aggregate comes from the rollups
+    "Player.drops": lambda: select(Drop).where(with_parent(Player(player_id=1), Player.drops)),
+}
+
+## Tables that must never be read with a full scan by the queries above
+CHECKED_TABLES = {"drops", "player_month_totals", "player_month_items", "player_month_npcs"}
+
+
+def explain(connection: Connection, query: Select) -> List[Tuple[str, str, bool]]:
+    """Return (table, access detail, is_full_scan) for each table access in the query's plan"""
+    compiled = query.compile(connection, compile_kwargs={"literal_binds": True})
+    if connection.dialect.name == "sqlite":
+        steps = []
+        for row in connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")):
+            detail = row[-1]
+            words = detail.split()
+            if words[0] in ("SCAN", "SEARCH") and len(words) > 1:
+                # "SCAN drops" reads every row; "SCAN drops USING COVERING INDEX ..." reads only the index
+                full_scan = words[0] == "SCAN" and "INDEX" not in detail
+                steps.append((words[1], detail, full_scan))
+        return steps
+    steps = []
+    for row in connection.execute(text(f"EXPLAIN {compiled}")).mappings():
+        access = row.get("type")
+        detail = f"type={access} key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}"
+        # "index" is a full index scan; only acceptable when it's a covering read of a small index,
+        # which the canonical queries never need
+        steps.append((row.get("table"), detail, access in ("ALL", "index") or row.get("key") is None))
+    return steps
+
+
+def seed(connection: Connection, drop_count: int, players: int = 2000, items: int = 3000, npcs: int = 300) -> None:
+    """Insert synthetic players/items/NPCs/drops spread over 12 months"""
+    rng = random.Random(1)
+    existing_npcs = connection.execute(select(func.count()).select_from(NpcList.__table__)).scalar()
+    if not existing_npcs:
+        connection.execute(insert(NpcList.__table__), [
+            {"npc_id": npc_id, "npc_name": f"Seed NPC {npc_id}"} for npc_id in range(1, npcs + 1)
+        ])
+        connection.execute(insert(ItemList.__table__), [
+            {"item_id": item_id, "item_name": f"Seed item {item_id}", "noted": False}
+            for item_id in range(1, items + 1)
+        ])
+        connection.execute(insert(Player.__table__), [
+            {"player_id": player_id, "player_name": f"Seed {player_id}", "account_hash": f"seed-{player_id}"}
+            for player_id in range(1, players + 1)
+        ])
+    partitions = []
+    year, month = divmod(PARTITION, 100)
+    for _ in range(12):
+        partitions.append(year * 100 + month)
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    chunk = []
+    for _ in range(drop_count):
+        partition = rng.choice(partitions)
+        chunk.append({
+            "item_id": rng.randint(1, items),
+            "player_id": rng.randint(1, players),
+            "npc_id": rng.randint(1, npcs),
+            "value": rng.randint(1, 10_000_000),
+            "quantity": rng.randint(1, 100),
+            "partition": partition,
+            "date_added": datetime(partition // 100, partition % 100, rng.randint(1, 28))
+        })
+        if len(chunk) >= 10000:
+            connection.execute(insert(Drop.__table__), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(insert(Drop.__table__), chunk)
+    # Rollups straight from the seeded drops, as the migration that created them does
+    for table, (key_columns, sum_columns) in ROLLUPS.items():
+        sums = {
+            "total_value": func.sum(Drop.value), "total_drops": func.count(),
+            "quantity": func.sum(Drop.quantity), "value": func.sum(Drop.value), "drops": func.count()
+        }
+        keys = [Drop.__table__.c[column] for column in key_columns]
+        connection.execute(table.insert().from_select(
+            list(key_columns) + list(sum_columns),
+            select(*keys, *(sums[column] for column in sum_columns)).group_by(*keys)
+        ))
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("ANALYZE"))
+    else:
+        connection.execute(text(f"ANALYZE TABLE {', '.join(sorted(CHECKED_TABLES))}"))
+
+
+def check(connection: Connection, verbose: bool = False) -> int:
+    """Print each canonical query's plan, returning the number of regressions"""
+    regressions = 0
+    for name, build in CANONICAL_QUERIES.items():
+        steps = explain(connection, build())
+        failed = [step for step in steps if step[0] in CHECKED_TABLES and step[2]]
+        regressions += bool(failed)
+        print(f"{'FAIL' if failed else 'ok':<5} {name}")
+        for table, detail, full_scan in steps:
+            if verbose or full_scan:
+                print(f"        {table}: {detail}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the drops and rollup queries for full table scans")
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic drops first")
+    parser.add_argument("--create", action="store_true", help="Create missing tables from the models first")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print every plan step")
+    args = parser.parse_args()
+
+    if args.create:
+        Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        if args.seed:
+            seed(connection, args.seed)
+        failures = check(connection, args.verbose)
+    if failures:
+        print(f"{failures} of {len(CANONICAL_QUERIES)} queries regressed to a full scan", file=sys.stderr)
+        sys.exit(1)
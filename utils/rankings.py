@@ -1,27 +1,10 @@
-import asyncio
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
-from models.base import session
-from models import Player
-from utils.misc import get_player_cache
+from utils.misc import get_partition
 
-async def get_global_rankings(partition_date: Optional[datetime] = None) -> List[int]:
-    """Get global rankings of all players based on their total loot value"""
-    if partition_date is None:
-        partition_date = datetime.now()
-        
-    players = session.query(Player.player_id).all()
-    player_totals = []
-    
-    async def get_player_total(player_id: int):
-        cache = get_player_cache(player_id)
-        stats = await cache.get_player_stats(partition_date)
-        if stats and "total" in stats:
-            return (player_id, stats["total"]["total_value"])
-        return (player_id, 0)
-    
-    tasks = [get_player_total(player[0]) for player in players]
-    player_totals = await asyncio.gather(*tasks)
-    
-    rankings = sorted(player_totals, key=lambda x: x[1], reverse=True)
-    return [player_id for player_id, _ in rankings] 
\ No newline at end of file
+async def get_global_rankings(partition: Optional[Union[int, datetime]] = None) -> List[int]:
+    """Get global rankings of all players based on their loot value in a partition (YYYYMM or a date in it)"""
+    from cache.player_stats import leaderboards
+    if partition is None or isinstance(partition, datetime):
+        partition, _ = get_partition(partition)
+    return [player_id for player_id, _ in await leaderboards.get_top(partition)]
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single in-flight call.
+
+    The first caller for a key starts the work; anyone else asking for the same
+    key while it is running awaits the same result (or exception) instead of
+    repeating it. Once the call finishes the key is forgotten, so later calls
+    run again.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.started += 1
+        else:
+            self.shared += 1
+        # Shield so one cancelled waiter doesn't cancel the work for everyone else
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -2,7 +2,8 @@ import os
 import asyncio
 from asynciolimiter import Limiter
 from dotenv import load_dotenv
-from models.base import session
+from sqlalchemy import select
+from models.base import unit_of_work
 import wom
 
 load_dotenv()
@@ -102,9 +103,8 @@ async def fetch_group_members(wom_group_id: int):
     
     if wom_group_id == 1:
         # Fetch all player WOM IDs from the database directly
-        players = session.query(Player.wom_id).all()
-        # Unpack the list of tuples returned by SQLAlchemy
-        user_list = [player.wom_id for player in players] 
+        async with unit_of_work(read_only=True) as db:
+            user_list = list((await db.execute(select(Player.wom_id))).scalars())
         return user_list
     await client.start()
     await limiter.wait()